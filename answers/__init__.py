@@ -27,3 +27,5 @@ Community forum for Questions and Answers.
 """
 
 __version__ = '0.1.7-dev'
+
+default_app_config = 'answers.apps.AnswersConfig'
@@ -0,0 +1,140 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Activity of Questions over time, read from `ActivityRollup` buckets.
+
+Buckets are maintained incrementally by `bulk_increment_counters` for
+votes and followers, and by a post_save receiver for new Questions.
+`rebuild_rollups` recomputes them from the Vote, Follow and Question
+tables (see the ``answers_rebuild_activity`` command).
+"""
+from __future__ import unicode_literals
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDay, TruncHour
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from .backends.queue import iter_chunks
+from .instrumentation import timed
+from .models import ActivityRollup, Follow, Vote, get_question_model
+
+TRUNCATE_FUNCTIONS = {
+    ActivityRollup.HOURLY: TruncHour,
+    ActivityRollup.DAILY: TruncDay,
+}
+
+
+def get_activity(period, start_at, ends_at, question=None):
+    """
+    Returns the activity in buckets of *period* in [start_at, ends_at[
+    for *question*, or site-wide when *question* is ``None``,
+    as a list of dictionaries ordered by bucket.
+    """
+    queryset = ActivityRollup.objects.filter(period=period,
+        bucket__gte=start_at, bucket__lt=ends_at)
+    if question is not None:
+        return list(queryset.filter(question=question).order_by(
+            'bucket').values('bucket', *ActivityRollup.COUNTERS))
+    return list(queryset.values('bucket').annotate(**{field_name: Sum(
+        field_name) for field_name in ActivityRollup.COUNTERS}).order_by(
+        'bucket'))
+
+
+@timed('answers.receivers.on_question_saved')
+def on_question_saved(sender, instance, created, raw=False, **kwargs):
+    #pylint:disable=unused-argument
+    if created and not raw:
+        ActivityRollup.objects.increment({instance.pk: {'nb_questions': 1}},
+            at_time=instance.created_at)
+
+
+def _rollup(question_pks, period):
+    """
+    Returns a dictionary (question pk, bucket) -> counters for *period*
+    computed from the Vote, Follow and Question tables.
+    """
+    trunc = TRUNCATE_FUNCTIONS[period]('created_at', tzinfo=timezone.utc)
+    buckets = {}
+    votes = Vote.objects.filter(question__in=question_pks).annotate(
+        bucket=trunc).values('question', 'bucket').annotate(
+        votes_score=Sum('vote'),
+        nb_upvotes=Sum(Case(When(vote=Vote.UP_VOTE, then=Value(1)),
+            default=Value(0), output_field=IntegerField())),
+        nb_downvotes=Sum(Case(When(vote=Vote.DOWN_VOTE, then=Value(1)),
+            default=Value(0), output_field=IntegerField()))).order_by()
+    follows = Follow.objects.filter(question__in=question_pks).annotate(
+        bucket=trunc).values('question', 'bucket').annotate(
+        nb_followers=Count('pk')).order_by()
+    questions = get_question_model().objects.filter(
+        pk__in=question_pks).annotate(bucket=trunc).values(
+        'bucket', question=F('pk')).annotate(
+        nb_questions=Count('pk')).order_by()
+    for rows in (votes, follows, questions):
+        for row in rows:
+            buckets.setdefault((row.pop('question'), row.pop('bucket')),
+                {}).update(row)
+    return buckets
+
+
+def rebuild_question_rollups(question_pks):
+    """
+    Recomputes the hourly and daily buckets of *question_pks*,
+    leaving the buckets of other Questions untouched, and returns
+    the number of buckets created.
+    """
+    rollups = []
+    for period in TRUNCATE_FUNCTIONS:
+        rollups += [ActivityRollup(question_id=question_pk,
+            period=period, bucket=bucket, **counters)
+            for (question_pk, bucket), counters in _rollup(
+                question_pks, period).items()]
+    with transaction.atomic():
+        ActivityRollup.objects.filter(question__in=question_pks).delete()
+        ActivityRollup.objects.bulk_create(rollups)
+    return len(rollups)
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    Recomputes the hourly and daily buckets of all Questions,
+    *batch_size* Questions at a time, and returns the number
+    of buckets created.
+
+    Votes that changed direction are accounted for at the time
+    they were first cast.
+    """
+    nb_created = 0
+    for chunk in iter_chunks(
+            get_question_model().objects.only('pk'), batch_size):
+        nb_created += rebuild_question_rollups(
+            [question.pk for question in chunk])
+    return nb_created
+
+
+def connect_receivers():
+    post_save.connect(on_question_saved, sender=get_question_model(),
+        dispatch_uid='answers.activity.question_saved')
@@ -23,15 +23,336 @@
 # ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 from __future__ import unicode_literals
 
-from rest_framework import generics, status
+import datetime
+
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 
-from .mixins import QuestionMixin
-from .models import Follow, Vote
-from .serializers import QuestionSummarySerializer
+from .activity import get_activity
+from .cache import get_question_version
+from .mixins import (AnswerListMixin, AnswerMixin, ConditionalGetMixin,
+    PrimaryDatabaseMixin, QuestionListMixin, QuestionMixin,
+    QuestionSearchMixin)
+from .models import (ActivityRollup, Answer, AnswerVote, Follow, Vote,
+    get_question_model)
+from .pagination import KeysetPagination
+from .serializers import (ActivitySerializer, AnswerSerializer,
+    BulkActionResultSerializer, BulkActionSerializer,
+    QuestionSearchSerializer, QuestionSerializer, QuestionSummarySerializer)
+from .throttling import ScopedRateThrottle
+
+
+class SparseQuestionListMixin(QuestionListMixin):
+    """
+    Only loads the text of each Question when it is part of
+    the requested fields.
+    """
+
+    def get_queryset(self):
+        queryset = super(SparseQuestionListMixin, self).get_queryset()
+        requested = self.request.query_params.get('fields', None)
+        if requested and 'text' not in requested.split(','):
+            queryset = queryset.defer('text', 'referer')
+        return queryset
+
+
+class QuestionListAPIView(ConditionalGetMixin, SparseQuestionListMixin,
+                          generics.ListAPIView):
+    """
+    Lists questions
+
+    Returns a page of questions ordered by ``newest`` (default), ``top``
+    score, ``hot`` (trending) or most ``answered``. Use the ``next`` cursor to retrieve
+    the following page and ``fields`` to restrict the fields returned.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         GET /api/?ordering=top&fields=slug,title,votes_score HTTP/1.1
+
+    responds
+
+    .. code-block:: json
+
+        {
+            "next": "http://localhost/api/?ordering=top&cursor=WzEyLCAzXQ",
+            "results": [{
+                "slug": "water-user",
+                "title": "How to reduce water usage?",
+                "votes_score": 12
+            }]
+        }
+    """
+    serializer_class = QuestionSerializer
+    pagination_class = KeysetPagination
+
+
+class QuestionSearchAPIView(ConditionalGetMixin, QuestionSearchMixin,
+                            SparseQuestionListMixin, generics.ListAPIView):
+    """
+    Searches questions
+
+    Returns a page of questions matching 'q', most ``relevance`` first
+    by default. Results can also be ordered like in the list of questions.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         GET /api/search/?q=water&fields=slug,title HTTP/1.1
+
+    responds
+
+    .. code-block:: json
+
+        {
+            "next": null,
+            "results": [{
+                "slug": "water-user",
+                "title": "How to reduce water usage?"
+            }]
+        }
+    """
+    serializer_class = QuestionSearchSerializer
+    pagination_class = KeysetPagination
+
+
+class AnswerListAPIView(ConditionalGetMixin, AnswerListMixin,
+                        generics.ListAPIView):
+    """
+    Lists answers to a question
+
+    Returns a page of answers to the question, the accepted answer first,
+    then by score of the votes and oldest first. Use the ``next`` cursor
+    to retrieve the following page.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         GET /api/water-use/answers/ HTTP/1.1
+
+    responds
+
+    .. code-block:: json
+
+        {
+            "next": "http://localhost/api/water-use/answers/?cursor=WyIy",
+            "results": [{
+                "id": 12,
+                "user_name": "Alice",
+                "comment": "Take shorter showers.",
+                "submit_date": "2020-01-01T00:00:00Z",
+                "votes_score": 3,
+                "is_accepted": true
+            }]
+        }
+    """
+    serializer_class = AnswerSerializer
+    pagination_class = KeysetPagination
+
+    def get_question_pk(self):
+        if not hasattr(self, '_question_pk'):
+            self._question_pk = self.question_model.objects.filter(
+                slug=self.kwargs.get('slug')).values_list(
+                'pk', flat=True).first()
+        return self._question_pk
+
+    def get_etag_parts(self):
+        question_pk = self.get_question_pk()
+        if question_pk is None:
+            return None
+        return [question_pk, get_question_version(question_pk),
+            self.request.GET.get('cursor', '')]
+
+    def get_queryset(self):
+        question_pk = self.get_question_pk()
+        if question_pk is None:
+            raise Http404("No question matches the given query.")
+        return self.get_answers(question_pk)
+
+
+class AnswerUpvoteAPIView(PrimaryDatabaseMixin, AnswerMixin,
+                          generics.GenericAPIView):
+    """
+    Upvotes an answer
+
+    The authenticated user making the request indicates their support
+    for the answer to the question.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         POST /api/water-use/answers/12/upvote/ HTTP/1.1
+
+    responds
+
+    .. code-block:: json
+
+        {
+            "id": 12,
+            "user_name": "Alice",
+            "comment": "Take shorter showers.",
+            "submit_date": "2020-01-01T00:00:00Z",
+            "votes_score": 4,
+            "is_accepted": true
+        }
+    """
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'vote'
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = AnswerSerializer
+
+    def post(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument
+        answer = self.get_object()
+        answer.votes_score += AnswerVote.objects.vote_up(
+            answer, user=request.user)
+        return Response(self.get_serializer(answer).data)
+
+
+class AnswerDownvoteAPIView(PrimaryDatabaseMixin, AnswerMixin,
+                            generics.GenericAPIView):
+    """
+    Downvotes an answer
+
+    The authenticated user making the request indicates their opposition
+    to the answer to the question.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         POST /api/water-use/answers/12/downvote/ HTTP/1.1
+
+    responds
+
+    .. code-block:: json
+
+        {
+            "id": 12,
+            "user_name": "Alice",
+            "comment": "Take shorter showers.",
+            "submit_date": "2020-01-01T00:00:00Z",
+            "votes_score": 2,
+            "is_accepted": true
+        }
+    """
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'vote'
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = AnswerSerializer
+
+    def post(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument
+        answer = self.get_object()
+        answer.votes_score += AnswerVote.objects.vote_down(
+            answer, user=request.user)
+        return Response(self.get_serializer(answer).data)
+
 
+class AcceptAnswerAPIView(PrimaryDatabaseMixin, AnswerMixin,
+                          generics.GenericAPIView):
+    """
+    Accepts an answer
+
+    The author of the question marks the answer as the one that solved
+    the question. A previously accepted answer is no longer accepted.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         POST /api/water-use/answers/12/accept/ HTTP/1.1
+
+    responds
+
+    .. code-block:: json
 
-class FollowAPIView(QuestionMixin, generics.CreateAPIView):
+        {
+            "id": 12,
+            "user_name": "Alice",
+            "comment": "Take shorter showers.",
+            "submit_date": "2020-01-01T00:00:00Z",
+            "votes_score": 3,
+            "is_accepted": true
+        }
+    """
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'vote'
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = AnswerSerializer
+
+    def get_object(self):
+        answer = super(AcceptAnswerAPIView, self).get_object()
+        if answer.question.user_id != self.request.user.pk:
+            raise PermissionDenied(
+                "Only the author of the question can accept an answer.")
+        return answer
+
+    def post(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument
+        answer = self.get_object()
+        Answer.objects.accept(answer)
+        return Response(self.get_serializer(answer).data)
+
+
+class UnacceptAnswerAPIView(AcceptAnswerAPIView):
+    """
+    Unaccepts an answer
+
+    The author of the question removes the accepted mark from the answer.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         POST /api/water-use/answers/12/unaccept/ HTTP/1.1
+
+    responds
+
+    .. code-block:: json
+
+        {
+            "id": 12,
+            "user_name": "Alice",
+            "comment": "Take shorter showers.",
+            "submit_date": "2020-01-01T00:00:00Z",
+            "votes_score": 3,
+            "is_accepted": false
+        }
+    """
+
+    def post(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument
+        answer = self.get_object()
+        Answer.objects.unaccept(answer)
+        return Response(self.get_serializer(answer).data)
+
+
+class FollowAPIView(PrimaryDatabaseMixin, QuestionMixin,
+                    generics.CreateAPIView):
     """
     Follow an answer
 
@@ -55,6 +376,8 @@ class FollowAPIView(QuestionMixin, generics.CreateAPIView):
             "title": "How to reduce water usage?"
         }
     """
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'follow'
     serializer_class = QuestionSummarySerializer
 
     def create(self, request, *args, **kwargs):
@@ -66,11 +389,12 @@ class FollowAPIView(QuestionMixin, generics.CreateAPIView):
             self.get_object()), status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
-        if self.request.user.is_authenticated():
+        if self.request.user.is_authenticated:
             Follow.objects.subscribe(self.get_object(), user=self.request.user)
 
 
-class UnfollowAPIView(QuestionMixin, generics.CreateAPIView):
+class UnfollowAPIView(PrimaryDatabaseMixin, QuestionMixin,
+                      generics.CreateAPIView):
     """
     Unfollow an answer
 
@@ -94,6 +418,8 @@ class UnfollowAPIView(QuestionMixin, generics.CreateAPIView):
             "title": "How to reduce water usage?"
         }
     """
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'follow'
     serializer_class = QuestionSummarySerializer
 
     def create(self, request, *args, **kwargs):
@@ -105,12 +431,13 @@ class UnfollowAPIView(QuestionMixin, generics.CreateAPIView):
             self.get_object()), status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
-        if self.request.user.is_authenticated():
+        if self.request.user.is_authenticated:
             Follow.objects.unsubscribe(
                 self.get_object(), user=self.request.user)
 
 
-class UpvoteAPIView(QuestionMixin, generics.CreateAPIView):
+class UpvoteAPIView(PrimaryDatabaseMixin, QuestionMixin,
+                    generics.CreateAPIView):
     """
     Upvote an answer
 
@@ -134,14 +461,17 @@ class UpvoteAPIView(QuestionMixin, generics.CreateAPIView):
             "title": "How to reduce water usage?"
         }
     """
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'vote'
     serializer_class = QuestionSummarySerializer
 
     def perform_create(self, serializer):
-        if self.request.user.is_authenticated():
+        if self.request.user.is_authenticated:
             Vote.objects.vote_up(self.get_object(), user=self.request.user)
 
 
-class DownvoteAPIView(QuestionMixin, generics.CreateAPIView):
+class DownvoteAPIView(PrimaryDatabaseMixin, QuestionMixin,
+                      generics.CreateAPIView):
     """
     Downvote an answer
 
@@ -165,8 +495,258 @@ class DownvoteAPIView(QuestionMixin, generics.CreateAPIView):
             "title": "How to reduce water usage?"
         }
     """
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'vote'
     serializer_class = QuestionSummarySerializer
 
     def perform_create(self, serializer):
-        if self.request.user.is_authenticated():
+        if self.request.user.is_authenticated:
             Vote.objects.vote_down(self.get_object(), user=self.request.user)
+
+
+class BulkActionAPIView(PrimaryDatabaseMixin,
+                        generics.GenericAPIView):
+    """
+    Follows, unfollows and votes on questions in bulk
+
+    Applies a list of ``follow``, ``unfollow``, ``upvote`` and ``downvote``
+    actions on behalf of the authenticated user making the request.
+    When a list contains more than one follow (resp. vote) action
+    for the same question, the last one wins.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         POST /api/bulk/ HTTP/1.1
+
+    .. code-block:: json
+
+        [{
+            "slug": "water-user",
+            "action": "upvote"
+        }, {
+            "slug": "water-user",
+            "action": "follow"
+        }]
+
+    responds
+
+    .. code-block:: json
+
+        [{
+            "slug": "water-user",
+            "action": "upvote",
+            "status": "applied"
+        }, {
+            "slug": "water-user",
+            "action": "follow",
+            "status": "unchanged"
+        }]
+    """
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'bulk'
+    max_items = 1000
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = BulkActionSerializer
+
+    def post(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument,too-many-locals
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+        if len(items) > self.max_items:
+            raise ValidationError(
+                "cannot apply more than %d actions at once" % self.max_items)
+
+        questions = {question.slug: question
+            for question in get_question_model().objects.filter(
+                slug__in=set([item['slug'] for item in items]))}
+        # Later actions on the same question override earlier ones.
+        follows = {}
+        votes = {}
+        for item in items:
+            question = questions.get(item['slug'], None)
+            if question is None:
+                continue
+            if item['action'] in (BulkActionSerializer.FOLLOW,
+                                  BulkActionSerializer.UNFOLLOW):
+                follows[question] = item['action']
+            else:
+                votes[question] = item['action']
+
+        with transaction.atomic():
+            subscribed = Follow.objects.bulk_subscribe([question
+                for question, action in follows.items()
+                if action == BulkActionSerializer.FOLLOW], user=request.user)
+            unsubscribed = Follow.objects.bulk_unsubscribe([question
+                for question, action in follows.items()
+                if action == BulkActionSerializer.UNFOLLOW],
+                user=request.user)
+            deltas = Vote.objects.bulk_vote({question: (
+                Vote.UP_VOTE if action == BulkActionSerializer.UPVOTE
+                else Vote.DOWN_VOTE) for question, action in votes.items()},
+                user=request.user)
+
+        results = []
+        for item in items:
+            question = questions.get(item['slug'], None)
+            if question is None:
+                item_status = 'not-found'
+            elif item['action'] in (BulkActionSerializer.FOLLOW,
+                                    BulkActionSerializer.UNFOLLOW):
+                changed = (subscribed
+                    if item['action'] == BulkActionSerializer.FOLLOW
+                    else unsubscribed)
+                item_status = ('applied'
+                    if follows[question] == item['action']
+                    and question.pk in changed else 'unchanged')
+            else:
+                item_status = ('applied'
+                    if votes[question] == item['action']
+                    and deltas.get(question.pk) else 'unchanged')
+            results += [{'slug': item['slug'], 'action': item['action'],
+                'status': item_status}]
+        return Response(BulkActionResultSerializer(results, many=True).data)
+
+
+class ActivityMixin(object):
+    """
+    Reads the activity in hourly or daily buckets within
+    a [start_at, ends_at[ range passed in the query parameters.
+    """
+    periods = {name: period for period, name in ActivityRollup.PERIOD_CHOICES}
+    default_ranges = {
+        ActivityRollup.HOURLY: datetime.timedelta(days=2),
+        ActivityRollup.DAILY: datetime.timedelta(days=30),
+    }
+    max_buckets = 1000
+
+    def _get_datetime(self, param):
+        value = self.request.query_params.get(param, None)
+        if not value:
+            return None
+        at_time = parse_datetime(value)
+        if at_time is None:
+            # A date (ex: 2017-01-01) is the start of that day.
+            at_date = parse_date(value)
+            if at_date is None:
+                raise ValidationError(
+                    {param: "invalid date/time '%s'" % value})
+            at_time = datetime.datetime.combine(at_date, datetime.time.min)
+        if timezone.is_naive(at_time):
+            at_time = timezone.make_aware(at_time, timezone.utc)
+        return at_time
+
+    def get_range(self):
+        period_name = self.request.query_params.get('period', 'daily')
+        if period_name not in self.periods:
+            raise ValidationError({'period': "must be one of %s" % ', '.join(
+                sorted(self.periods))})
+        period = self.periods[period_name]
+        ends_at = self._get_datetime('ends_at') or timezone.now()
+        start_at = (self._get_datetime('start_at')
+            or ends_at - self.default_ranges[period])
+        bucket_size = (datetime.timedelta(hours=1)
+            if period == ActivityRollup.HOURLY else datetime.timedelta(days=1))
+        if (ends_at - start_at) > self.max_buckets * bucket_size:
+            raise ValidationError(
+                "cannot return more than %d buckets" % self.max_buckets)
+        return period_name, period, start_at, ends_at
+
+    def get_activity_response(self, question=None):
+        period_name, period, start_at, ends_at = self.get_range()
+        return Response({
+            'period': period_name,
+            'start_at': start_at,
+            'ends_at': ends_at,
+            'results': ActivitySerializer(get_activity(period,
+                start_at, ends_at, question=question), many=True).data
+        })
+
+
+class ActivityAPIView(ActivityMixin, generics.GenericAPIView):
+    """
+    Site-wide activity
+
+    Returns the change in votes and followers, and the number of questions
+    asked, in ``hourly`` or ``daily`` (default) buckets from ``start_at``
+    (defaults to 2 days, respectively 30 days, before ``ends_at``)
+    to ``ends_at`` (defaults to now). A request spans at most 1000 buckets.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         GET /api/activity/?start_at=2017-01-01&ends_at=2017-01-03 HTTP/1.1
+
+    responds
+
+    .. code-block:: json
+
+        {
+            "period": "daily",
+            "start_at": "2017-01-01T00:00:00Z",
+            "ends_at": "2017-01-03T00:00:00Z",
+            "results": [{
+                "bucket": "2017-01-02T00:00:00Z",
+                "votes_score": 3,
+                "nb_upvotes": 4,
+                "nb_downvotes": 1,
+                "nb_followers": 2,
+                "nb_questions": 1
+            }]
+        }
+    """
+    serializer_class = ActivitySerializer
+
+    def get(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument
+        return self.get_activity_response()
+
+
+class QuestionActivityAPIView(ActivityMixin, QuestionMixin,
+                              generics.GenericAPIView):
+    """
+    Activity on a question
+
+    Returns the change in votes and followers of a question in ``hourly``
+    or ``daily`` (default) buckets from ``start_at`` (defaults to 2 days,
+    respectively 30 days, before ``ends_at``) to ``ends_at`` (defaults
+    to now). A request spans at most 1000 buckets.
+
+    **Tags**: answers
+
+    **Examples**
+
+    .. code-block:: http
+
+         GET /api/water-use/activity/?period=hourly HTTP/1.1
+
+    responds
+
+    .. code-block:: json
+
+        {
+            "period": "hourly",
+            "start_at": "2017-01-01T00:00:00Z",
+            "ends_at": "2017-01-03T00:00:00Z",
+            "results": [{
+                "bucket": "2017-01-02T13:00:00Z",
+                "votes_score": 1,
+                "nb_upvotes": 1,
+                "nb_downvotes": 0,
+                "nb_followers": 1,
+                "nb_questions": 0
+            }]
+        }
+    """
+    serializer_class = ActivitySerializer
+
+    def get(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument
+        return self.get_activity_response(question=self.get_object())
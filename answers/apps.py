@@ -0,0 +1,60 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def setup_search_backend(sender, using=None, **kwargs):
+    #pylint:disable=unused-argument
+    from .backends import get_search_backend
+    from .models import get_question_model
+
+    backend = get_search_backend()
+    if hasattr(backend, 'setup'):
+        backend.setup(get_question_model(), using=using)
+
+
+class AnswersConfig(AppConfig):
+    name = 'answers'
+    verbose_name = 'Answers'
+    # Matches answers/migrations on Django versions that default
+    # to big integers.
+    default_auto_field = 'django.db.models.AutoField'
+
+    def ready(self):
+        from .activity import connect_receivers as connect_activity_receivers
+        from .cache import connect_receivers
+        from .notifications import (
+            connect_receivers as connect_notification_receivers)
+        from .ranking import connect_receivers as connect_ranking_receivers
+        from .receivers import connect_receivers as connect_answer_receivers
+        from .related import connect_receivers as connect_related_receivers
+        post_migrate.connect(setup_search_backend, sender=self)
+        connect_receivers()
+        connect_answer_receivers()
+        connect_notification_receivers()
+        connect_ranking_receivers()
+        connect_activity_receivers()
+        connect_related_receivers()
@@ -0,0 +1,277 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Async variants of the follow, vote and search API views, served by an ASGI
+server (see ``testsite/asgi.py``) under the URLs in `answers.urls.async_api`.
+The sync views in `answers.api` stay available.
+
+This module requires Python 3 and Django 3.1 or later, installed
+with the ``async`` extra (``pip install djaodjin-answers[async]``).
+
+Requests are authenticated by the classes in the ``REST_FRAMEWORK``
+``DEFAULT_AUTHENTICATION_CLASSES`` setting, as in the sync views, such
+that token clients are served and session clients must pass a CSRF token.
+Only authenticated users can act on a Question while the sync views
+accept anonymous requests as a no-op. The bodies of POST requests are
+not read, since all the fields of `QuestionSummarySerializer`, which
+the sync views validate, are read-only.
+
+The ORM and the search backend run in a pool of
+``ANSWERS['ASYNC_MAX_WORKERS']`` threads, such that a burst of requests
+is served by a bounded number of threads and database connections.
+Each thread keeps its connections open across calls, even when
+``CONN_MAX_AGE`` is 0, instead of reconnecting for every call.
+"""
+from __future__ import unicode_literals
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.http import Http404, JsonResponse
+from django.utils.translation import ugettext as _
+from django.views.generic import View
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from . import settings
+from .mixins import QuestionSearchMixin
+from .models import Follow, Vote, get_question_model
+from .pagination import InvalidCursor, KeysetPagination, KeysetPaginator
+from .routers import pop_wrote, set_wrote
+from .serializers import QuestionSearchSerializer, QuestionSummarySerializer
+from .throttling import check_rate, get_ident
+
+if django.VERSION < (3, 1):
+    raise ImproperlyConfigured("answers.async_views requires Django 3.1+")
+
+EXECUTOR = ThreadPoolExecutor(max_workers=settings.ASYNC_MAX_WORKERS)
+
+
+def close_unusable_connections():
+    """
+    Closes the connections of the current thread that are unusable,
+    or older than a non-zero ``CONN_MAX_AGE``.
+    """
+    for conn in connections.all():
+        if conn.connection is None:
+            continue
+        if conn.settings_dict['CONN_MAX_AGE'] != 0:
+            conn.close_if_unusable_or_obsolete()
+        elif conn.errors_occurred:
+            if conn.is_usable():
+                conn.errors_occurred = False
+            else:
+                conn.close()
+
+
+def _run(func, args):
+    close_unusable_connections()
+    pop_wrote()
+    return func(*args), pop_wrote()
+
+
+async def run_in_pool(func, *args, request=None):
+    """
+    Runs ``func(*args)`` in the bounded pool of threads.
+
+    When ``func`` writes to the primary database, the client
+    of *request* is pinned to it (see `answers.routers`).
+    """
+    result, wrote = await asyncio.get_running_loop().run_in_executor(
+        EXECUTOR, _run, func, args)
+    if wrote and request is not None:
+        set_wrote(request)
+    return result
+
+
+async def evaluate(queryset):
+    """
+    Returns the list of items in *queryset*.
+    """
+    return await run_in_pool(list, queryset)
+
+
+def _authenticate(request):
+    # Loads the session or token, and the user.
+    return Request(request, authenticators=[authenticator()
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]).user
+
+
+async def authenticate(request):
+    """
+    Returns the user authenticated by the DRF authentication classes,
+    or raises an `APIException` (ex: on a CSRF failure).
+    """
+    return await run_in_pool(_authenticate, request)
+
+
+async def get_question(slug):
+    queryset = get_question_model().objects.filter(slug=slug)
+    question = await run_in_pool(queryset.first)
+    if question is None:
+        raise Http404(_("No question matches the given query."))
+    return question
+
+
+class AsyncView(View):
+    """
+    Class-based view with ``async def`` handlers, also on versions
+    of Django prior to 4.1.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super(AsyncView, cls).as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        async_view.view_class = cls
+        async_view.view_initkwargs = initkwargs
+        # As in DRF views, CSRF is enforced by `SessionAuthentication`.
+        # (`csrf_exempt` would wrap the coroutine in a sync function.)
+        async_view.csrf_exempt = True
+        return async_view
+
+
+class AsyncQuestionActionView(AsyncView):
+    """
+    Acts on the Question identified by ``slug`` on behalf
+    of the authenticated request user.
+
+    Requests over the budget of ``throttle_scope`` are rejected
+    (see `answers.throttling`) before the Question is loaded.
+    """
+    http_method_names = ['post', 'options']
+    throttle_scope = None
+    # The Question is acted on through ``model.objects.<action>``.
+    model = None
+    action = None
+
+    def perform(self, question, user):
+        if self.model is None or self.action is None:
+            raise ImproperlyConfigured("%s requires a definition"\
+                " of 'model' and 'action'" % self.__class__.__name__)
+        getattr(self.model.objects, self.action)(question, user=user)
+
+    async def post(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument
+        try:
+            user = await authenticate(request)
+        except APIException as err:
+            return JsonResponse({'detail': err.detail},
+                status=err.status_code)
+        if not user.is_authenticated:
+            return JsonResponse({'detail': _(
+                "Authentication credentials were not provided.")}, status=403)
+        if self.throttle_scope is not None:
+            wait = await run_in_pool(check_rate,
+                self.throttle_scope, get_ident(request, user=user))
+            if wait is not None:
+                response = JsonResponse({'detail': _(
+                    "Request was throttled.")}, status=429)
+                response['Retry-After'] = '%d' % wait
+                return response
+        question = await get_question(self.kwargs.get('slug'))
+        await run_in_pool(self.perform, question, user, request=request)
+        return JsonResponse(QuestionSummarySerializer(question).data,
+            status=201)
+
+
+class AsyncFollowView(AsyncQuestionActionView):
+    """
+    Follows a question (see `answers.api.FollowAPIView`).
+    """
+    throttle_scope = 'follow'
+    model = Follow
+    action = 'subscribe'
+
+
+class AsyncUnfollowView(AsyncQuestionActionView):
+    """
+    Unfollows a question (see `answers.api.UnfollowAPIView`).
+    """
+    throttle_scope = 'follow'
+    model = Follow
+    action = 'unsubscribe'
+
+
+class AsyncUpvoteView(AsyncQuestionActionView):
+    """
+    Upvotes a question (see `answers.api.UpvoteAPIView`).
+    """
+    throttle_scope = 'vote'
+    model = Vote
+    action = 'vote_up'
+
+
+class AsyncDownvoteView(AsyncQuestionActionView):
+    """
+    Downvotes a question (see `answers.api.DownvoteAPIView`).
+    """
+    throttle_scope = 'vote'
+    model = Vote
+    action = 'vote_down'
+
+
+class AsyncQuestionSearchView(QuestionSearchMixin, AsyncView):
+    """
+    Searches questions (see `answers.api.QuestionSearchAPIView`).
+    """
+    http_method_names = ['get', 'head', 'options']
+    cursor_query_param = KeysetPagination.cursor_query_param
+    page_size = KeysetPagination.page_size
+
+    async def get(self, request, *args, **kwargs):
+        #pylint: disable=unused-argument
+        # The search backend is synchronous.
+        queryset = await run_in_pool(self.get_queryset)
+        paginator = KeysetPaginator(
+            queryset, self.get_ordering(), self.page_size)
+        try:
+            page_queryset = paginator.get_page_queryset(
+                request.GET.get(self.cursor_query_param))
+        except InvalidCursor as err:
+            return JsonResponse(
+                {self.cursor_query_param: ['%s' % err]}, status=400)
+        items, next_cursor = paginator.get_page(await evaluate(page_queryset))
+        next_link = None
+        if next_cursor:
+            next_link = replace_query_param(request.build_absolute_uri(),
+                self.cursor_query_param, next_cursor)
+        return JsonResponse(OrderedDict([
+            ('next', next_link),
+            ('results', QuestionSearchSerializer(items, many=True,
+                context={'request': request}).data)
+        ]))
@@ -0,0 +1,65 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Search backends for Questions.
+
+A search backend implements ``search(model, query, limit=None)``, which
+returns a list of ``(pk, score, snippet)`` tuples, most relevant first.
+``snippet`` is an HTML-safe excerpt of the question with matching terms
+highlighted, or ``None`` if the backend does not compute one.
+
+The backend is selected through ``ANSWERS['SEARCH_BACKEND']``.
+"""
+
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+
+from .. import settings
+
+_SEARCH_BACKEND = None
+
+
+def get_search_backend():
+    """
+    Returns the search backend configured in ``ANSWERS['SEARCH_BACKEND']``.
+    """
+    global _SEARCH_BACKEND #pylint: disable=global-statement
+    if _SEARCH_BACKEND is None:
+        _SEARCH_BACKEND = import_string(settings.SEARCH_BACKEND)()
+    return _SEARCH_BACKEND
+
+
+def reset_search_backend(setting, **kwargs):
+    """
+    Instantiates the search backend again on the next call
+    to `get_search_backend` when ``ANSWERS`` changes.
+    """
+    #pylint:disable=unused-argument,global-statement
+    global _SEARCH_BACKEND
+    if setting == 'ANSWERS':
+        _SEARCH_BACKEND = None
+
+
+setting_changed.connect(reset_search_backend)
@@ -0,0 +1,269 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+In-process full-text search engine for haystack.
+
+The engine stores an inverted index in the database, one row per term
+and document (see `IndexedPosting` and `IndexedDocument`), and ranks
+results with Okapi BM25. A search only loads the postings of the terms
+in the query, with a range scan of the unique index, so its cost grows
+with the number of matching documents, not the size of the corpus.
+Indexing a document only rewrites the rows of that document.
+
+To use it, add the following to your project settings::
+
+    HAYSTACK_CONNECTIONS = {
+        'default': {
+            'ENGINE': 'answers.backends.bm25.BM25Engine',
+        },
+    }
+    HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.RealtimeSignalProcessor'
+"""
+from __future__ import unicode_literals
+
+import heapq
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Sum
+from haystack import connections
+from haystack.backends import BaseEngine, BaseSearchBackend, log_query
+from haystack.backends.simple_backend import SimpleSearchQuery
+from haystack.models import SearchResult
+from haystack.utils import get_identifier, get_model_ct
+
+from ..cache import get_cache
+from ..models import IndexedDocument, IndexedPosting
+
+LOGGER = logging.getLogger(__name__)
+
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'if',
+    'in', 'into', 'is', 'it', 'no', 'not', 'of', 'on', 'or', 'such', 'that',
+    'the', 'their', 'then', 'there', 'these', 'they', 'this', 'to', 'was',
+    'will', 'with'])
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+MAX_TERM_LENGTH = 64
+
+
+def tokenize(text):
+    """
+    Returns the list of terms in *text*.
+    """
+    return [token for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS and len(token) <= MAX_TERM_LENGTH]
+
+
+def get_content_type_id(model_ct):
+    """
+    Returns the id of the content type identified by *model_ct*
+    (i.e. ``app_label.model_name``), cached by `ContentType.objects`.
+    """
+    app_label, model_name = model_ct.split('.')
+    return ContentType.objects.get_by_natural_key(app_label, model_name).pk
+
+
+class BM25SearchBackend(BaseSearchBackend):
+    """
+    Search backend storing postings lists in the database.
+
+    Connection options ``K1`` and ``B`` are the BM25 term frequency
+    saturation and document length normalization parameters.
+    """
+
+    def __init__(self, connection_alias, **connection_options):
+        super(BM25SearchBackend, self).__init__(
+            connection_alias, **connection_options)
+        self.k1 = connection_options.get('K1', 1.2)
+        self.b = connection_options.get('B', 0.75)
+
+    @staticmethod
+    def _get_stats_cache_key(model_ct):
+        return 'answers.bm25.stats.%s' % model_ct
+
+    def get_corpus_stats(self, model_ct):
+        """
+        Returns the number of documents and the average document length
+        for the model identified by *model_ct*.
+        """
+        cache = get_cache()
+        cache_key = self._get_stats_cache_key(model_ct)
+        stats = cache.get(cache_key)
+        if stats is None:
+            aggregates = IndexedDocument.objects.filter(
+                content_type_id=get_content_type_id(model_ct)).aggregate(
+                nb_documents=Count('pk'), total_length=Sum('length'))
+            nb_documents = aggregates['nb_documents']
+            avg_length = (float(aggregates['total_length'] or 0)
+                / nb_documents) if nb_documents else 0.0
+            stats = (nb_documents, avg_length)
+            cache.set(cache_key, stats)
+        return stats
+
+    def _reindex(self, model_ct, documents, removed_pks=None):
+        """
+        Replaces the postings of *documents*, a dictionary
+        pk -> (term frequencies, length), and removes the documents whose
+        pk is in *removed_pks*, with a constant number of queries.
+        """
+        changed_pks = set(documents.keys()) | set(removed_pks or [])
+        if not changed_pks:
+            return
+        content_type_id = get_content_type_id(model_ct)
+        with transaction.atomic():
+            IndexedPosting.objects.filter(content_type_id=content_type_id,
+                object_pk__in=changed_pks).delete()
+            IndexedDocument.objects.filter(content_type_id=content_type_id,
+                object_pk__in=changed_pks).delete()
+            IndexedPosting.objects.bulk_create([
+                IndexedPosting(content_type_id=content_type_id, term=term,
+                    object_pk=pk, frequency=frequency, length=length)
+                for pk, (term_frequencies, length) in documents.items()
+                for term, frequency in term_frequencies.items()])
+            IndexedDocument.objects.bulk_create([
+                IndexedDocument(content_type_id=content_type_id,
+                    object_pk=pk, length=length)
+                for pk, (_, length) in documents.items()])
+        get_cache().delete(self._get_stats_cache_key(model_ct))
+
+    def update(self, index, iterable, commit=True):
+        documents = {}
+        model_ct = None
+        content_field = index.get_content_field()
+        for obj in iterable:
+            if model_ct is None:
+                model_ct = get_model_ct(obj)
+            tokens = tokenize(index.full_prepare(obj).get(content_field, ''))
+            documents.update({obj.pk: (Counter(tokens), len(tokens))})
+        if documents:
+            self._reindex(model_ct, documents)
+
+    def remove(self, obj_or_string, commit=True):
+        self.bulk_remove([obj_or_string], commit=commit)
+
+    def bulk_remove(self, objs_or_strings, commit=True):
+        """
+        Removes all *objs_or_strings* with a constant number of queries
+        per model.
+        """
+        removed_pks = defaultdict(list)
+        for obj_or_string in objs_or_strings:
+            model_ct, pk = get_identifier(obj_or_string).rsplit('.', 1)
+            removed_pks[model_ct] += [int(pk)]
+        for model_ct, pks in removed_pks.items():
+            self._reindex(model_ct, {}, removed_pks=pks)
+
+    def clear(self, models=None, commit=True):
+        documents = IndexedDocument.objects.all()
+        postings = IndexedPosting.objects.all()
+        if models:
+            model_cts = [get_model_ct(model) for model in models]
+            content_type_ids = [get_content_type_id(model_ct)
+                for model_ct in model_cts]
+            documents = documents.filter(content_type_id__in=content_type_ids)
+            postings = postings.filter(content_type_id__in=content_type_ids)
+        else:
+            model_cts = ['%s.%s' % natural_key
+                for natural_key in IndexedDocument.objects.values_list(
+                'content_type__app_label', 'content_type__model').distinct()]
+        with transaction.atomic():
+            documents.delete()
+            postings.delete()
+        cache = get_cache()
+        for model_ct in model_cts:
+            cache.delete(self._get_stats_cache_key(model_ct))
+
+    def score(self, model_ct, terms):
+        """
+        Returns a dictionary pk -> BM25 score of the documents matching
+        at least one of *terms*.
+        """
+        nb_documents, avg_length = self.get_corpus_stats(model_ct)
+        scores = defaultdict(float)
+        if not nb_documents:
+            return scores
+        avg_length = avg_length or 1.0
+        query_frequencies = Counter(terms)
+        postings = defaultdict(list)
+        for term, pk, frequency, length in IndexedPosting.objects.filter(
+                content_type_id=get_content_type_id(model_ct),
+                term__in=query_frequencies.keys()).values_list(
+                'term', 'object_pk', 'frequency', 'length').iterator():
+            postings[term] += [(pk, frequency, length)]
+        for term, term_postings in postings.items():
+            idf = math.log(1.0 + (nb_documents - len(term_postings)
+                + 0.5) / (len(term_postings) + 0.5))
+            weight = idf * query_frequencies[term]
+            for pk, frequency, length in term_postings:
+                scores[pk] += weight * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * (1 - self.b
+                    + self.b * length / avg_length))
+        return scores
+
+    @log_query
+    def search(self, query_string, **kwargs):
+        hits = 0
+        results = []
+        result_class = kwargs.get('result_class') or SearchResult
+        models = kwargs.get('models') or connections[
+            self.connection_alias].get_unified_index().get_indexed_models()
+        start_offset = kwargs.get('start_offset', 0)
+        end_offset = kwargs.get('end_offset', None)
+        terms = tokenize(query_string) if query_string != '*' else []
+        if not terms:
+            return {'results': results, 'hits': hits}
+
+        matches = []
+        for model in models:
+            model_ct = get_model_ct(model)
+            app_label, model_name = model_ct.split('.')
+            for pk, score in self.score(model_ct, terms).items():
+                matches += [(score, app_label, model_name, pk)]
+        hits = len(matches)
+        if end_offset is not None:
+            matches = heapq.nlargest(end_offset, matches)
+        else:
+            matches = sorted(matches, reverse=True)
+        for score, app_label, model_name, pk in matches[start_offset:]:
+            results += [result_class(app_label, model_name, pk, score)]
+        return {'results': results, 'hits': hits}
+
+    def prep_value(self, value):
+        return value
+
+    def more_like_this(self, model_instance, additional_query_string=None,
+                       result_class=None, **kwargs):
+        return {'results': [], 'hits': 0}
+
+
+class BM25Engine(BaseEngine):
+    backend = BM25SearchBackend
+    query = SimpleSearchQuery
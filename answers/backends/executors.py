@@ -0,0 +1,150 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Executors run tasks outside of the request/response cycle.
+
+An executor implements ``submit(task, *args)``, where *task* is the dotted
+path to a module-level function and *args* are JSON-serializable positional
+arguments.
+
+``ThreadPoolExecutor`` runs tasks in a pool of threads local to the process
+once the current transaction commits. Tasks still queued when the process
+exits are lost. ``DatabaseExecutor`` records tasks in the database
+(see `PendingTask`) in the current transaction, and the ``answers_run_tasks``
+command runs them.
+
+The executor is selected through ``ANSWERS['NOTIFICATION_EXECUTOR']``.
+"""
+from __future__ import unicode_literals
+
+import json
+import logging
+import threading
+
+from django.db import close_old_connections, connections, router, transaction
+from django.utils.module_loading import import_string
+
+try:
+    import queue
+except ImportError: # python2
+    import Queue as queue #pylint: disable=import-error
+
+LOGGER = logging.getLogger(__name__)
+
+
+def run_task(task, *args):
+    """
+    Runs the function found at *task* with *args*.
+    """
+    import_string(task)(*args)
+
+
+class ImmediateExecutor(object):
+    """
+    Runs tasks synchronously, in the calling thread. Useful for tests.
+    """
+
+    @staticmethod
+    def submit(task, *args):
+        run_task(task, *args)
+
+
+class ThreadPoolExecutor(object):
+    """
+    Runs tasks in *max_workers* daemon threads after the transaction
+    in which they were submitted commits.
+    """
+    max_workers = 2
+
+    def __init__(self, max_workers=None):
+        if max_workers is not None:
+            self.max_workers = max_workers
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _start_workers(self):
+        with self._lock:
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work,
+                    name='answers-executor-%d' % len(self._workers))
+                worker.daemon = True
+                worker.start()
+                self._workers += [worker]
+
+    def _work(self):
+        while True:
+            task, args = self._queue.get()
+            try:
+                close_old_connections()
+                run_task(task, *args)
+            except Exception: #pylint: disable=broad-except
+                LOGGER.exception("error running task %s%r", task, args)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def submit(self, task, *args):
+        if len(self._workers) < self.max_workers:
+            self._start_workers()
+        transaction.on_commit(lambda: self._queue.put((task, args)))
+
+
+class DatabaseExecutor(object):
+    """
+    Records tasks in the database, to be run by ``answers_run_tasks``.
+    """
+
+    @staticmethod
+    def submit(task, *args):
+        from ..models import PendingTask
+        PendingTask.objects.create(task=task, arguments=json.dumps(args))
+
+
+def run_pending_tasks(batch_size=100):
+    """
+    Runs up to *batch_size* tasks recorded by `DatabaseExecutor`
+    and returns the number of tasks run.
+
+    Each task runs in its own savepoint. Tasks that raise an exception
+    are logged and discarded.
+    """
+    from ..models import PendingTask
+    using = router.db_for_write(PendingTask)
+    with transaction.atomic(using=using):
+        pending = PendingTask.objects.using(using).order_by('pk')
+        if connections[using].features.has_select_for_update_skip_locked:
+            # Multiple workers can run side by side.
+            pending = pending.select_for_update(skip_locked=True)
+        pending = list(pending[:batch_size])
+        for entry in pending:
+            try:
+                with transaction.atomic(using=using):
+                    run_task(entry.task, *json.loads(entry.arguments))
+            except Exception: #pylint: disable=broad-except
+                LOGGER.exception("error running task %s", entry)
+        PendingTask.objects.using(using).filter(
+            pk__in=[entry.pk for entry in pending]).delete()
+    return len(pending)
@@ -0,0 +1,187 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Search backend relying on the full-text index of the database.
+
+On PostgreSQL, a ``search_vector`` tsvector column, maintained by
+a trigger, is added to the Question table and indexed with GIN.
+On SQLite, an FTS5 virtual table mirrors the Question table through
+triggers. In both cases the index is updated in the same transaction
+as the Question rows, and ranking and snippets are computed by
+the database.
+
+The column, index, virtual table and triggers are created after
+``migrate`` (see `answers.apps.AnswersConfig`). To use this backend,
+add the following to your project settings::
+
+    ANSWERS = {
+        'SEARCH_BACKEND': 'answers.backends.fulltext.FullTextSearchBackend'
+    }
+"""
+from __future__ import unicode_literals
+
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Markers for highlighted terms in snippets. Control characters are
+# used such that snippets can be HTML-escaped before markers are replaced.
+START_SEL = '\x02'
+STOP_SEL = '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def highlight(snippet):
+    """
+    Returns an HTML-safe version of *snippet* where terms delimited
+    by `START_SEL` and `STOP_SEL` are highlighted.
+    """
+    if not snippet:
+        return None
+    return mark_safe(escape(snippet).replace(
+        START_SEL, '<b>').replace(STOP_SEL, '</b>'))
+
+
+class FullTextSearchBackend(object):
+    """
+    Searches Questions through the full-text index of the database
+    storing them (PostgreSQL or SQLite with FTS5).
+    """
+    config = 'pg_catalog.english'
+    snippet_nb_words = 16
+
+    @staticmethod
+    def get_connection(model, write=False):
+        if write:
+            return connections[router.db_for_write(model)]
+        return connections[router.db_for_read(model)]
+
+    def setup(self, model, using=None):
+        """
+        Creates the full-text index for *model* if it does not
+        already exist.
+        """
+        connection = (connections[using] if using
+            else self.get_connection(model, write=True))
+        setup_func = getattr(self, 'setup_%s' % connection.vendor, None)
+        if setup_func is None:
+            raise ImproperlyConfigured("%s does not support '%s' databases"
+                % (self.__class__.__name__, connection.vendor))
+        with connection.cursor() as cursor:
+            setup_func(cursor, model._meta.db_table)
+
+    def setup_postgresql(self, cursor, table):
+        cursor.execute("ALTER TABLE %(table)s"
+            " ADD COLUMN IF NOT EXISTS search_vector tsvector" % {
+            'table': table})
+        cursor.execute("CREATE INDEX IF NOT EXISTS %(table)s_search_vector"
+            " ON %(table)s USING GIN (search_vector)" % {'table': table})
+        cursor.execute("DROP TRIGGER IF EXISTS %(table)s_search_vector_update"
+            " ON %(table)s" % {'table': table})
+        cursor.execute("CREATE TRIGGER %(table)s_search_vector_update"
+            " BEFORE INSERT OR UPDATE OF title, text ON %(table)s"
+            " FOR EACH ROW EXECUTE PROCEDURE tsvector_update_trigger("
+            "search_vector, '%(config)s', title, text)" % {
+            'table': table, 'config': self.config})
+        cursor.execute("UPDATE %(table)s SET search_vector = to_tsvector("
+            "'%(config)s', coalesce(title, '') || ' ' || coalesce(text, ''))"
+            " WHERE search_vector IS NULL" % {
+            'table': table, 'config': self.config})
+
+    @staticmethod
+    def setup_sqlite(cursor, table):
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master"
+            " WHERE type='table' AND name=%s", ['%s_fts' % table])
+        exists = cursor.fetchone()[0]
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS %(table)s_fts"
+            " USING fts5(title, text, content='%(table)s', content_rowid='id')"
+            % {'table': table})
+        cursor.execute("CREATE TRIGGER IF NOT EXISTS %(table)s_fts_insert"
+            " AFTER INSERT ON %(table)s BEGIN"
+            " INSERT INTO %(table)s_fts(rowid, title, text)"
+            " VALUES (new.id, new.title, new.text); END" % {'table': table})
+        cursor.execute("CREATE TRIGGER IF NOT EXISTS %(table)s_fts_delete"
+            " AFTER DELETE ON %(table)s BEGIN"
+            " INSERT INTO %(table)s_fts(%(table)s_fts, rowid, title, text)"
+            " VALUES ('delete', old.id, old.title, old.text); END" % {
+            'table': table})
+        cursor.execute("CREATE TRIGGER IF NOT EXISTS %(table)s_fts_update"
+            " AFTER UPDATE OF title, text ON %(table)s BEGIN"
+            " INSERT INTO %(table)s_fts(%(table)s_fts, rowid, title, text)"
+            " VALUES ('delete', old.id, old.title, old.text);"
+            " INSERT INTO %(table)s_fts(rowid, title, text)"
+            " VALUES (new.id, new.title, new.text); END" % {'table': table})
+        if not exists:
+            # Index the rows created before the virtual table.
+            cursor.execute("INSERT INTO %(table)s_fts(%(table)s_fts)"
+                " VALUES ('rebuild')" % {'table': table})
+
+    def search(self, model, query, limit=None):
+        connection = self.get_connection(model)
+        search_func = getattr(self, 'search_%s' % connection.vendor, None)
+        if search_func is None:
+            raise ImproperlyConfigured("%s does not support '%s' databases"
+                % (self.__class__.__name__, connection.vendor))
+        with connection.cursor() as cursor:
+            return [(pk, score, highlight(snippet))
+                for pk, score, snippet in search_func(
+                    cursor, model._meta.db_table, query, limit)]
+
+    def search_postgresql(self, cursor, table, query, limit):
+        # ts_headline is expensive so it is only computed
+        # for the results returned.
+        cursor.execute("SELECT id, rank, ts_headline(%%s, text, query, %%s)"
+            " FROM (SELECT id, text, query,"
+            " ts_rank_cd(search_vector, query) AS rank"
+            " FROM %(table)s, plainto_tsquery(%%s, %%s) AS query"
+            " WHERE search_vector @@ query"
+            " ORDER BY rank DESC%(limit)s) AS matches"
+            " ORDER BY rank DESC" % {
+            'table': table, 'limit': " LIMIT %d" % int(limit) if limit else ""},
+            [self.config, "StartSel=%s, StopSel=%s, MaxWords=%d, MinWords=%d"
+                % (START_SEL, STOP_SEL, self.snippet_nb_words,
+                   self.snippet_nb_words // 2),
+             self.config, query])
+        return cursor.fetchall()
+
+    def search_sqlite(self, cursor, table, query, limit):
+        # Each term is quoted such that the FTS5 query syntax
+        # cannot be injected.
+        terms = TOKEN_RE.findall(query)
+        if not terms:
+            return []
+        cursor.execute("SELECT rowid, -bm25(%(table)s_fts),"
+            " snippet(%(table)s_fts, 1, %%s, %%s, '...', %(nb_words)d)"
+            " FROM %(table)s_fts WHERE %(table)s_fts MATCH %%s"
+            " ORDER BY bm25(%(table)s_fts)%(limit)s" % {
+            'table': table, 'nb_words': self.snippet_nb_words,
+            'limit': " LIMIT %d" % int(limit) if limit else ""},
+            [START_SEL, STOP_SEL,
+             ' '.join(['"%s"' % term for term in terms])])
+        return cursor.fetchall()
@@ -0,0 +1,190 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Queued, batched, updates of haystack indexes.
+
+`QueuedSignalProcessor` records the objects to re-index in a durable
+queue (see `PendingIndexUpdate`) instead of updating the search engine
+in the request. The ``answers_update_index`` command then drains
+the queue in batches, calling the backend once per batch.
+
+To use it, add the following to your project settings::
+
+    HAYSTACK_SIGNAL_PROCESSOR = 'answers.backends.queue.QueuedSignalProcessor'
+"""
+from __future__ import absolute_import, unicode_literals
+
+import logging
+from collections import OrderedDict, defaultdict
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+from haystack import connections
+from haystack.exceptions import NotHandled
+from haystack.signals import BaseSignalProcessor
+from haystack.utils import get_identifier
+
+LOGGER = logging.getLogger(__name__)
+
+
+def iter_chunks(queryset, chunk_size):
+    """
+    Yields the objects in *queryset* in lists of at most *chunk_size*
+    items, paginating on the primary key such that memory stays bounded
+    and each chunk is a single indexed range scan.
+    """
+    last_pk = None
+    queryset = queryset.order_by('pk')
+    while True:
+        chunk = queryset
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size].iterator())
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        yield chunk
+
+
+def bump_questions_version():
+    # Imported lazily because this module is loaded by haystack
+    # before the models are ready.
+    from ..cache import bump_questions_version as bump
+    bump()
+
+
+def enqueue_index_updates(instances, removed=False, using='default'):
+    """
+    Records that the search index entries of *instances* must be updated
+    (or removed when *removed* is ``True``).
+    """
+    from ..models import PendingIndexUpdate
+    PendingIndexUpdate.objects.bulk_create([PendingIndexUpdate(
+        using=using, identifier=get_identifier(instance), removed=removed)
+        for instance in instances])
+
+
+def process_index_updates(batch_size=1000):
+    """
+    Processes up to *batch_size* pending index updates and returns
+    the number of queue entries processed.
+
+    Multiple entries for the same object are coalesced into the latest one.
+    """
+    from ..models import PendingIndexUpdate
+    pending = list(PendingIndexUpdate.objects.order_by('pk')[:batch_size])
+    if not pending:
+        return 0
+    latest = OrderedDict()
+    for entry in pending:
+        latest[(entry.using, entry.identifier)] = entry.removed
+
+    # using -> model -> {pk: identifier}
+    updates = defaultdict(lambda: defaultdict(dict))
+    removes = defaultdict(list)
+    for (using, identifier), removed in latest.items():
+        if removed:
+            removes[using] += [identifier]
+        else:
+            app_label, model_name, pk = identifier.split('.')
+            model = apps.get_model(app_label, model_name)
+            updates[using][model].update({pk: identifier})
+
+    for using, models in updates.items():
+        unified_index = connections[using].get_unified_index()
+        backend = connections[using].get_backend()
+        for model, identifiers in models.items():
+            index = unified_index.get_index(model)
+            objs = list(index.index_queryset(using=using).filter(
+                pk__in=list(identifiers.keys())))
+            if objs:
+                backend.update(index, objs)
+            # Objects deleted, or no longer part of the index queryset,
+            # since the entry was queued.
+            found = set([get_identifier(obj) for obj in objs])
+            removes[using] += [identifier
+                for identifier in identifiers.values()
+                if identifier not in found]
+
+    for using, identifiers in removes.items():
+        backend = connections[using].get_backend()
+        if hasattr(backend, 'bulk_remove'):
+            backend.bulk_remove(identifiers)
+        else:
+            for identifier in identifiers:
+                backend.remove(identifier)
+
+    PendingIndexUpdate.objects.filter(
+        pk__in=[entry.pk for entry in pending]).delete()
+    # Search results may have changed.
+    bump_questions_version()
+    return len(pending)
+
+
+def rebuild_index(using='default', batch_size=1000):
+    """
+    Re-indexes all objects of all indexed models, streaming each index
+    queryset in chunks of *batch_size* objects.
+    """
+    unified_index = connections[using].get_unified_index()
+    backend = connections[using].get_backend()
+    nb_indexed = 0
+    for model in unified_index.get_indexed_models():
+        index = unified_index.get_index(model)
+        backend.clear(models=[model])
+        for chunk in iter_chunks(index.index_queryset(using=using),
+                                 batch_size):
+            backend.update(index, chunk)
+            nb_indexed += len(chunk)
+    bump_questions_version()
+    return nb_indexed
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """
+    Records saved and deleted objects in the `PendingIndexUpdate` queue.
+    """
+
+    def setup(self):
+        post_save.connect(self.handle_save)
+        post_delete.connect(self.handle_delete)
+
+    def teardown(self):
+        post_save.disconnect(self.handle_save)
+        post_delete.disconnect(self.handle_delete)
+
+    def _enqueue(self, sender, instance, removed):
+        for using in self.connection_router.for_write(instance=instance):
+            try:
+                self.connections[using].get_unified_index().get_index(sender)
+            except NotHandled:
+                continue
+            enqueue_index_updates([instance], removed=removed, using=using)
+
+    def handle_save(self, sender, instance, **kwargs):
+        self._enqueue(sender, instance, removed=False)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        self._enqueue(sender, instance, removed=True)
@@ -0,0 +1,194 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Versioned cache keys for Questions.
+
+Each Question has a version number stored in the cache configured
+in ``ANSWERS['CACHE']``. Fragments rendered for a Question are cached
+under keys that include this version, so bumping the version whenever
+the Question, its votes, followers or answers change invalidates all
+fragments at once. Stale fragments are evicted by the cache itself
+after ``ANSWERS['CACHE_TIMEOUT']`` seconds.
+
+A site-wide version, bumped along with any Question version, identifies
+the state of lists of Questions (see `answers.mixins.ConditionalGetMixin`).
+"""
+from __future__ import unicode_literals
+
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from . import settings
+from .instrumentation import timed
+from .models import Follow, Vote, get_question_model, touch_questions
+from .utils import get_answer_model
+
+
+def get_cache():
+    return caches[settings.CACHE]
+
+
+QUESTIONS_VERSION_KEY = 'answers.questions.version'
+
+
+def _get_version_key(question_pk):
+    return 'answers.question.%s.version' % question_pk
+
+
+def _new_version():
+    # Versions restart from a value that was not used before in case
+    # the version key was evicted while fragments were still cached.
+    return int(time.time() * 1000)
+
+
+def get_question_versions(question_pks):
+    """
+    Returns a dictionary pk -> version for all *question_pks*.
+    """
+    cache = get_cache()
+    keys = {_get_version_key(pk): pk for pk in question_pks}
+    versions = {keys[key]: version
+        for key, version in cache.get_many(list(keys.keys())).items()}
+    for key, pk in keys.items():
+        if pk not in versions:
+            version = _new_version()
+            cache.add(key, version, None)
+            versions[pk] = cache.get(key, version)
+    return versions
+
+
+def get_question_version(question_pk):
+    return get_question_versions([question_pk])[question_pk]
+
+
+def get_questions_version():
+    """
+    Returns the site-wide version of the Questions.
+    """
+    cache = get_cache()
+    version = cache.get(QUESTIONS_VERSION_KEY)
+    if version is None:
+        version = _new_version()
+        cache.add(QUESTIONS_VERSION_KEY, version, None)
+        version = cache.get(QUESTIONS_VERSION_KEY, version)
+    return version
+
+
+def bump_questions_version():
+    """
+    Invalidates the site-wide version, for example after the search
+    index or the hot ranking changed.
+    """
+    cache = get_cache()
+    try:
+        cache.incr(QUESTIONS_VERSION_KEY)
+    except ValueError:
+        cache.set(QUESTIONS_VERSION_KEY, _new_version(), None)
+
+
+def attach_question_versions(questions):
+    """
+    Sets the ``cache_version`` attribute of each Question in *questions*
+    with a single round-trip to the cache.
+    """
+    versions = get_question_versions([question.pk for question in questions])
+    for question in questions:
+        question.cache_version = versions[question.pk]
+    return questions
+
+
+def bump_question_versions(question_pks):
+    """
+    Invalidates all fragments cached for *question_pks*.
+    """
+    cache = get_cache()
+    for pk in question_pks:
+        key = _get_version_key(pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+    bump_questions_version()
+
+
+def get_cache_context():
+    """
+    Context variables used by the ``{% cache %}`` tags in the templates.
+    """
+    return {
+        'answers_cache': settings.CACHE,
+        'answers_cache_timeout': settings.CACHE_TIMEOUT
+    }
+
+
+# Versions are bumped once the transaction commits. Otherwise a page
+# rendered in-between would cache the previous state under the new version.
+
+@timed('answers.receivers.invalidate_on_question_relation')
+def invalidate_on_question_relation(sender, instance, **kwargs):
+    #pylint:disable=unused-argument
+    question_pks = [instance.question_id]
+    transaction.on_commit(lambda: bump_question_versions(question_pks))
+
+
+@timed('answers.receivers.invalidate_on_question')
+def invalidate_on_question(sender, instance, **kwargs):
+    #pylint:disable=unused-argument
+    question_pks = [instance.pk]
+    transaction.on_commit(lambda: bump_question_versions(question_pks))
+
+
+@timed('answers.receivers.invalidate_on_answer')
+def invalidate_on_answer(sender, instance, **kwargs):
+    #pylint:disable=unused-argument
+    question_model = get_question_model()
+    if instance.content_type_id == ContentType.objects.get_for_model(
+            question_model).pk:
+        touch_questions(question_model, [instance.object_pk])
+
+
+def connect_receivers():
+    """
+    Invalidates cached fragments whenever a Question or its answers
+    change, and when votes or followers are deleted outside
+    of `VoteManager` and `FollowManager` (ex: along with a User).
+    """
+    question_model = get_question_model()
+    answer_model = get_answer_model()
+    for model in (Vote, Follow):
+        post_delete.connect(invalidate_on_question_relation, sender=model,
+            dispatch_uid='answers_%s_deleted' % model._meta.model_name)
+    post_save.connect(invalidate_on_question, sender=question_model,
+        dispatch_uid='answers_question_saved')
+    post_delete.connect(invalidate_on_question, sender=question_model,
+        dispatch_uid='answers_question_deleted')
+    post_save.connect(invalidate_on_answer, sender=answer_model,
+        dispatch_uid='answers_answer_saved')
+    post_delete.connect(invalidate_on_answer, sender=answer_model,
+        dispatch_uid='answers_answer_deleted')
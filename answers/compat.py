@@ -31,6 +31,12 @@ except ImportError: # django < 1.5
         from django.contrib.auth.models import User
         return User
 
+try:
+    from django.utils.encoding import python_2_unicode_compatible
+except ImportError: # django >= 3.0, python 3 only
+    def python_2_unicode_compatible(klass):
+        return klass
+
 def get_model_class(full_name, settings_meta):
     """
     Returns a model class loaded from *full_name*. *settings_meta* is the name
@@ -29,6 +29,7 @@ Forms used by the answers app.
 from django import forms
 
 from answers.models import Question
+from answers.slugs import save_with_unique_slug
 
 #pylint: disable=no-member
 #pylint: disable=super-on-old-class
@@ -46,7 +47,16 @@ class QuestionCreateForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super(QuestionCreateForm, self).__init__(*args, **kwargs)
-        if self.initial.has_key('user'):
+        if 'user' in self.initial:
             setattr(self.instance, 'user', self.initial['user'])
-        if self.initial.has_key('referer'):
+        if 'referer' in self.initial:
             setattr(self.instance, 'referer', self.initial['referer'])
+
+    def save(self, commit=True):
+        """
+        Saves the Question under a unique slug derived from its title.
+        """
+        question = super(QuestionCreateForm, self).save(commit=False)
+        if commit:
+            save_with_unique_slug(question)
+        return question
@@ -0,0 +1,274 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Opt-in instrumentation of the hot paths of the answers app.
+
+Timers (`timed`) and counters (`increment`) are reported to the sink
+configured in ``ANSWERS['METRICS_SINK']``, instantiated with the keyword
+arguments in ``ANSWERS['METRICS_OPTIONS']``. Available sinks are
+`LoggingSink`, `StatsdSink` and `PrometheusSink`; the latter is exposed
+by including ``answers.urls.metrics`` in the project URLs. Only requests
+accepted by ``ANSWERS['METRICS_PERMISSION']`` (defaults to staff users)
+can read the metrics.
+
+`MetricsMiddleware` records the duration and number of queries
+of each request to an answers view.
+
+When ``ANSWERS['METRICS_SINK']`` is ``None`` (the default), `timed`
+returns the decorated function unchanged and `increment` returns
+immediately, so instrumentation costs nothing. The sink is read once,
+when the modules are loaded.
+"""
+from __future__ import unicode_literals
+
+import logging
+import socket
+import threading
+import timeit
+from contextlib import ExitStack
+from functools import wraps
+
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.module_loading import import_string
+
+from . import settings
+
+LOGGER = logging.getLogger(__name__)
+
+_SINK = None
+
+
+def get_sink():
+    """
+    Returns the sink configured in ``ANSWERS['METRICS_SINK']``,
+    or ``None`` when instrumentation is disabled.
+    """
+    global _SINK #pylint: disable=global-statement
+    if _SINK is None and settings.METRICS_SINK:
+        _SINK = import_string(settings.METRICS_SINK)(
+            **(settings.METRICS_OPTIONS or {}))
+    return _SINK
+
+
+def increment(name, value=1, tags=None):
+    sink = get_sink()
+    if sink is not None:
+        sink.increment(name, value, tags=tags)
+
+
+def timed(name):
+    """
+    Decorator that reports the duration of each call under *name*.
+    """
+    def decorator(func):
+        if not settings.METRICS_SINK:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = timeit.default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                get_sink().timing(
+                    name, (timeit.default_timer() - start) * 1000)
+        return wrapper
+    return decorator
+
+
+class QueryCounter(object):
+    """
+    Counts the queries executed, and the time spent in them, through
+    ``connection.execute_wrapper``.
+    """
+
+    def __init__(self):
+        self.nb_queries = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        #pylint:disable=too-many-arguments,unused-argument
+        start = timeit.default_timer()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += (timeit.default_timer() - start) * 1000
+            self.nb_queries += 1
+
+
+class MetricsMiddleware(object):
+    """
+    Records the duration and number of queries of requests
+    to the answers views, tagged with the name of the URL.
+
+    The middleware only wraps the rest of the chain, so the other
+    middlewares (CSRF checks, ``ATOMIC_REQUESTS``, exception handling, ...)
+    run as usual and their time is included. It should be placed
+    as early as possible in ``MIDDLEWARE``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sink = get_sink()
+        if sink is None:
+            return self.get_response(request)
+        counter = QueryCounter()
+        start = timeit.default_timer()
+        with ExitStack() as stack:
+            # Reads might be routed to a replica (see `answers.routers`).
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(counter))
+            # Template responses are rendered within `get_response`.
+            response = self.get_response(request)
+        duration = (timeit.default_timer() - start) * 1000
+        # The URL is resolved while handling the request.
+        url_name = getattr(getattr(request, 'resolver_match', None),
+            'url_name', None) or ''
+        if url_name.startswith('answers_'):
+            tags = {'view': url_name}
+            sink.timing('answers.request', duration, tags=tags)
+            sink.increment('answers.queries', counter.nb_queries, tags=tags)
+            sink.timing('answers.queries', counter.duration, tags=tags)
+        return response
+
+
+class LoggingSink(object):
+    """
+    Logs metrics to the ``answers.instrumentation`` logger.
+    """
+
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def increment(self, name, value, tags=None):
+        LOGGER.log(self.level, "%s %s%s", name, value, _format_tags(tags))
+
+    def timing(self, name, duration, tags=None):
+        LOGGER.log(self.level, "%s %.3fms%s", name, duration,
+            _format_tags(tags))
+
+
+class StatsdSink(object):
+    """
+    Sends metrics in the statsd line format over UDP. Tags are appended
+    to the metric name.
+    """
+
+    def __init__(self, host='localhost', port=8125, prefix=''):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def _send(self, name, value, kind, tags):
+        if tags:
+            name = '.'.join([name] + [
+                str(tags[key]) for key in sorted(tags)])
+        try:
+            self.socket.sendto(('%s%s:%s|%s' % (
+                self.prefix, name, value, kind)).encode('utf-8'),
+                self.address)
+        except (IOError, OSError):
+            # Metrics are best-effort.
+            pass
+
+    def increment(self, name, value, tags=None):
+        self._send(name, value, 'c', tags)
+
+    def timing(self, name, duration, tags=None):
+        self._send(name, '%.3f' % duration, 'ms', tags)
+
+
+class PrometheusSink(object):
+    """
+    Aggregates metrics in the process and renders them
+    in the Prometheus text exposition format (see `metrics_view`).
+
+    Each process serving requests aggregates its own metrics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.timings = {}
+
+    @staticmethod
+    def _key(name, tags):
+        return (name.replace('.', '_'),
+            tuple(sorted(tags.items())) if tags else ())
+
+    def increment(self, name, value, tags=None):
+        key = self._key(name, tags)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def timing(self, name, duration, tags=None):
+        key = self._key(name, tags)
+        with self.lock:
+            count, total = self.timings.get(key, (0, 0))
+            self.timings[key] = (count + 1, total + duration)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines += ['%s_total%s %s' % (
+                    name, _format_labels(labels), value)]
+            for (name, labels), (count, total) in sorted(
+                    self.timings.items()):
+                lines += ['%s_ms_count%s %d' % (
+                    name, _format_labels(labels), count),
+                    '%s_ms_sum%s %.3f' % (name, _format_labels(labels), total)]
+        return '\n'.join(lines) + '\n'
+
+
+def _format_tags(tags):
+    if not tags:
+        return ''
+    return ' ' + ' '.join(['%s=%s' % item for item in sorted(tags.items())])
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(['%s="%s"' % item for item in labels])
+
+
+def is_staff(request):
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def metrics_view(request):
+    if not import_string(settings.METRICS_PERMISSION)(request):
+        raise PermissionDenied("not allowed to read the metrics")
+    sink = get_sink()
+    if not hasattr(sink, 'render'):
+        raise Http404("metrics are not aggregated in this process")
+    return HttpResponse(sink.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,369 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmarks the answers endpoints against a freshly seeded test database.
+"""
+
+from __future__ import unicode_literals
+
+import io
+import json
+import random
+import timeit
+
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from ... import settings
+from ...activity import rebuild_rollups
+from ...compat import get_user_model
+from ...models import Answer, Follow, Vote, get_question_model
+from ...ranking import decay_hot_scores
+from ...utils import get_answer_model
+
+try:
+    import tracemalloc
+except ImportError: # python2
+    tracemalloc = None
+
+WORDS = ('water', 'energy', 'waste', 'supplier', 'carbon', 'emissions',
+    'reduce', 'usage', 'report', 'target', 'scope', 'audit', 'policy',
+    'plant', 'office', 'travel', 'recycle', 'measure', 'baseline', 'goal')
+
+# Targets of an endpoint
+QUESTION = 'question'
+ANSWER = 'answer'
+# Answer to a question asked by the logged in user
+OWN_ANSWER = 'own-answer'
+
+ENDPOINTS = (
+    # (name, method, url name, target, payload, logged in)
+    # 'POST' sends *payload* as JSON. 'FORM' sends it url-encoded.
+    # The payload of 'POST' on a question is the summary of the question.
+    ('list', 'GET', 'answers_list', None, None, False),
+    ('list-top', 'GET', 'answers_list', None, {'ordering': 'top'}, False),
+    ('list-hot', 'GET', 'answers_list', None, {'ordering': 'hot'}, False),
+    ('list-answered', 'GET', 'answers_list', None,
+        {'ordering': 'answered'}, False),
+    ('search', 'GET', 'answers_search', None, {'q': 'water'}, False),
+    ('detail', 'GET', 'answers_detail', QUESTION, None, False),
+    ('detail-user', 'GET', 'answers_detail', QUESTION, None, True),
+    ('new', 'GET', 'answers_new', None, None, True),
+    ('new-post', 'FORM', 'answers_new', None, {
+        'question-title': "How to reduce water usage?",
+        'question-text': "What are the best practices to reduce water usage?"
+    }, True),
+    ('api-list', 'GET', 'answers_api_list', None, None, False),
+    ('api-search', 'GET', 'answers_api_search', None, {'q': 'water'}, False),
+    ('api-activity', 'GET', 'answers_api_activity', None, None, False),
+    ('api-question-activity', 'GET', 'answers_api_question_activity',
+        QUESTION, None, False),
+    ('api-answers', 'GET', 'answers_api_answers', QUESTION, None, False),
+    ('api-answer-upvote', 'POST', 'answers_api_answer_upvote', ANSWER,
+        None, True),
+    ('api-answer-downvote', 'POST', 'answers_api_answer_downvote', ANSWER,
+        None, True),
+    ('api-answer-accept', 'POST', 'answers_api_answer_accept', OWN_ANSWER,
+        None, True),
+    ('api-answer-unaccept', 'POST', 'answers_api_answer_unaccept',
+        OWN_ANSWER, None, True),
+    ('api-follow', 'POST', 'answers_api_follow', QUESTION, None, True),
+    ('api-unfollow', 'POST', 'answers_api_unfollow', QUESTION, None, True),
+    ('api-upvote', 'POST', 'answers_api_upvote', QUESTION, None, True),
+    ('api-downvote', 'POST', 'answers_api_downvote', QUESTION, None, True),
+    ('api-bulk', 'POST', 'answers_api_bulk', None, None, True),
+)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[int(round(pct / 100.0 * (len(values) - 1)))]
+
+
+class Command(BaseCommand):
+    help = "Seeds a test database with questions, users, votes, follows"\
+        " and answers, then reports the latency (p50, p99), number of"\
+        " queries and peak memory of each answers endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', action='store', type=int,
+            dest='nb_questions', default=1000,
+            help="Number of questions to seed")
+        parser.add_argument('--users', action='store', type=int,
+            dest='nb_users', default=100,
+            help="Number of users to seed")
+        parser.add_argument('--votes', action='store', type=int,
+            dest='nb_votes', default=5,
+            help="Average number of votes per question")
+        parser.add_argument('--follows', action='store', type=int,
+            dest='nb_follows', default=3,
+            help="Average number of followers per question")
+        parser.add_argument('--answers', action='store', type=int,
+            dest='nb_answers', default=3,
+            help="Average number of answers per question")
+        parser.add_argument('--repeat', action='store', type=int,
+            dest='repeat', default=20,
+            help="Number of requests per endpoint")
+        parser.add_argument('--batch-size', action='store', type=int,
+            dest='batch_size', default=1000,
+            help="Number of rows inserted at once while seeding")
+        parser.add_argument('--seed', action='store', type=int,
+            dest='seed', default=0,
+            help="Seed of the random number generator")
+        parser.add_argument('--output', action='store',
+            dest='output', default=None,
+            help="Write the results as JSON to that file")
+        parser.add_argument('--baseline', action='store',
+            dest='baseline', default=None,
+            help="Fail if the results regress compared to the JSON"\
+            " results in that file")
+        parser.add_argument('--tolerance', action='store', type=float,
+            dest='tolerance', default=0.5,
+            help="Relative increase in p50 latency tolerated against"\
+            " the baseline")
+
+    def handle(self, *args, **options):
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        # Each endpoint is requested more times than the budgets allow.
+        throttle_rates = settings.THROTTLE_RATES
+        settings.THROTTLE_RATES = {}
+        try:
+            self.seed(options)
+            results = self.run_endpoints(options['repeat'])
+        finally:
+            settings.THROTTLE_RATES = throttle_rates
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                self.compare(results, json.load(baseline),
+                    options['tolerance'])
+
+    def _bulk_create(self, model, rows, batch_size):
+        batch = []
+        for row in rows:
+            batch += [row]
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+
+    def _sample(self, population, average):
+        return self.random.sample(population, min(len(population),
+            self.random.randint(0, 2 * average)))
+
+    def _text(self, nb_words):
+        return ' '.join([self.random.choice(WORDS) for _ in range(nb_words)])
+
+    def seed(self, options):
+        #pylint:disable=too-many-locals
+        self.random = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        user_model = get_user_model()
+        question_model = get_question_model()
+        answer_model = get_answer_model()
+        now = timezone.now()
+        self.stdout.write("seeding %(nb_questions)d questions and"\
+            " %(nb_users)d users..." % options)
+        self._bulk_create(user_model, (user_model(
+            username='user%d' % idx, email='user%d@example.com' % idx)
+            for idx in range(options['nb_users'])), batch_size)
+        user_pks = list(user_model.objects.order_by(
+            'pk').values_list('pk', flat=True))
+        # The logged in user asks one question out of ten such that
+        # there are answers for them to accept.
+        self._bulk_create(question_model, (question_model(
+            slug='question-%d' % idx, title=self._text(6).capitalize(),
+            text=self._text(40), user_id=(user_pks[0] if idx % 10 == 0
+                else self.random.choice(user_pks)))
+            for idx in range(options['nb_questions'])), batch_size)
+        # `created_at` is set by `auto_now_add` so we spread it afterwards.
+        question_pks = list(question_model.objects.order_by(
+            'pk').values_list('pk', flat=True))
+        self.questions = list(question_model.objects.order_by(
+            'pk').values_list('slug', 'title'))
+        for idx in range(0, len(question_pks), batch_size):
+            chunk = question_pks[idx:idx + batch_size]
+            question_model.objects.filter(pk__in=chunk).update(
+                created_at=now - timezone.timedelta(
+                    hours=len(question_pks) - idx))
+        self._bulk_create(Vote, (Vote(question_id=question_pk,
+            user_id=user_pk, vote=self.random.choice(
+                (Vote.UP_VOTE, Vote.UP_VOTE, Vote.DOWN_VOTE)))
+            for question_pk in question_pks
+            for user_pk in self._sample(user_pks, options['nb_votes'])),
+            batch_size)
+        self._bulk_create(Follow, (Follow(question_id=question_pk,
+            user_id=user_pk) for question_pk in question_pks
+            for user_pk in self._sample(user_pks, options['nb_follows'])),
+            batch_size)
+        content_type = ContentType.objects.get_for_model(question_model)
+        site = Site.objects.get_current()
+        self._bulk_create(answer_model, (answer_model(
+            content_type=content_type, object_pk=str(question_pk), site=site,
+            user_id=user_pk, comment=self._text(30), submit_date=now)
+            for question_pk in question_pks
+            for user_pk in self._sample(user_pks, options['nb_answers'])),
+            batch_size)
+        self.user = user_model.objects.get(pk=user_pks[0])
+
+        self.stdout.write("computing counters, rankings and indexes...")
+        call_command('answers_recount', batch_size=batch_size,
+            stdout=io.StringIO())
+        decay_hot_scores(batch_size=batch_size)
+        rebuild_rollups(batch_size=batch_size)
+        try:
+            from ...backends.queue import rebuild_index
+            rebuild_index(batch_size=batch_size)
+        except Exception as err: #pylint:disable=broad-except
+            self.stderr.write("search index not rebuilt: %s" % err)
+        # `Answer` rows are created by `answers_recount`.
+        answers = Answer.objects.order_by('pk').values_list(
+            'question__slug', 'comment_id')
+        self.answers = {
+            ANSWER: list(answers[:batch_size]),
+            OWN_ANSWER: list(answers.filter(
+                question__user=self.user)[:batch_size])
+        }
+
+    def get_request(self, endpoint, idx):
+        name, method, url_name, target, payload, _ = endpoint
+        kwargs = {}
+        if target == QUESTION:
+            slug, title = self.questions[idx * 7919 % len(self.questions)]
+            kwargs = {'slug': slug}
+            if method == 'POST':
+                payload = {'slug': slug, 'title': title}
+        elif target in (ANSWER, OWN_ANSWER):
+            answers = self.answers[target]
+            if not answers:
+                raise CommandError("%s: no answers were seeded." % name)
+            slug, answer_pk = answers[idx * 7919 % len(answers)]
+            kwargs = {'slug': slug, 'answer': answer_pk}
+        try:
+            url = reverse(url_name, kwargs=kwargs)
+        except NoReverseMatch:
+            raise CommandError("%s: cannot reverse '%s'. Is answers.urls"\
+                " included in ROOT_URLCONF?" % (name, url_name))
+        if name == 'api-bulk':
+            payload = [{'slug': self.questions[
+                (idx * 50 + offset) % len(self.questions)][0],
+                'action': ('upvote', 'downvote', 'follow', 'unfollow')[
+                    offset % 4]} for offset in range(50)]
+        return method, url, payload
+
+    def request(self, client, method, url, payload):
+        if method == 'GET':
+            return client.get(url, payload or {})
+        if method == 'FORM':
+            return client.post(url, payload or {})
+        return client.post(url, json.dumps(payload or {}),
+            content_type='application/json')
+
+    def run_endpoints(self, repeat):
+        anonymous = Client()
+        authenticated = Client()
+        authenticated.force_login(self.user)
+        results = {}
+        for endpoint in ENDPOINTS:
+            name = endpoint[0]
+            client = authenticated if endpoint[5] else anonymous
+            latencies = []
+            nb_queries = []
+            statuses = set([])
+            for idx in range(repeat):
+                method, url, payload = self.get_request(endpoint, idx)
+                with CaptureQueriesContext(connection) as queries:
+                    start = timeit.default_timer()
+                    response = self.request(client, method, url, payload)
+                    latencies += [timeit.default_timer() - start]
+                nb_queries += [len(queries.captured_queries)]
+                statuses |= set([response.status_code])
+            peak_memory = None
+            if tracemalloc is not None:
+                # Measured separately since tracing slows down requests.
+                method, url, payload = self.get_request(endpoint, repeat)
+                tracemalloc.start()
+                self.request(client, method, url, payload)
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            results[name] = {
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'queries': max(nb_queries),
+                'peak_memory_kb': (peak_memory // 1024
+                    if peak_memory is not None else None),
+                'statuses': sorted(statuses),
+            }
+        return results
+
+    def report(self, results):
+        self.stdout.write("%-24s %9s %9s %8s %10s  %s" % (
+            'endpoint', 'p50 (ms)', 'p99 (ms)', 'queries', 'peak (KB)',
+            'statuses'))
+        for endpoint in ENDPOINTS:
+            result = results[endpoint[0]]
+            self.stdout.write("%-24s %9.1f %9.1f %8d %10s  %s" % (
+                endpoint[0], result['p50_ms'], result['p99_ms'],
+                result['queries'], result['peak_memory_kb'],
+                ','.join([str(status) for status in result['statuses']])))
+            if [status for status in result['statuses'] if status >= 400]:
+                self.stderr.write("warning: %s returned %s" % (endpoint[0],
+                    result['statuses']))
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name, None)
+            if previous is None:
+                continue
+            if result['queries'] > previous['queries']:
+                regressions += ["%s: %d queries instead of %d" % (
+                    name, result['queries'], previous['queries'])]
+            if result['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+                regressions += ["%s: p50 of %.1fms instead of %.1fms" % (
+                    name, result['p50_ms'], previous['p50_ms'])]
+            if result['statuses'] != previous['statuses']:
+                regressions += ["%s: returned %s instead of %s" % (
+                    name, result['statuses'], previous['statuses'])]
+        if regressions:
+            raise CommandError("regressions against the baseline:\n%s"
+                % '\n'.join(regressions))
+        self.stdout.write("no regressions against the baseline.")
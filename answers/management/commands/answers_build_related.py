@@ -0,0 +1,61 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Precomputes the related Questions shown on the Question detail page.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from ...related import build_related
+
+
+class Command(BaseCommand):
+    help = "Recomputes the related questions of questions updated since"\
+        " the last run (all questions with --rebuild). Requires numpy"\
+        " and scipy. Run it periodically (ex: every hour)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+            dest='rebuild', default=False,
+            help="Recompute the related questions of all questions")
+        parser.add_argument('--top-k', action='store', type=int,
+            dest='top_k', default=10,
+            help="Number of related questions stored per question")
+        parser.add_argument('--min-score', action='store', type=float,
+            dest='min_score', default=0.05,
+            help="Minimum similarity of related questions (0 to 1)")
+        parser.add_argument('--batch-size', action='store', type=int,
+            dest='batch_size', default=100,
+            help="Number of questions compared to all others at a time")
+
+    def handle(self, *args, **options):
+        try:
+            nb_refreshed = build_related(top_k=options['top_k'],
+                batch_size=options['batch_size'],
+                min_score=options['min_score'], rebuild=options['rebuild'])
+        except ImproperlyConfigured as err:
+            raise CommandError(str(err))
+        self.stdout.write("%d question(s) refreshed." % nb_refreshed)
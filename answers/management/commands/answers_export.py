@@ -0,0 +1,62 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Exports Questions with their votes, followers and answers.
+"""
+
+import io
+import sys
+
+from django.core.management.base import BaseCommand
+
+from ...transfer import iter_records, write_records
+
+
+class Command(BaseCommand):
+    help = "Streams all questions, with their votes, followers and answers,"\
+        " as NDJSON or CSV (see answers.transfer for the format)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-',
+            help="File to write to ('-' for the standard output)")
+        parser.add_argument('--format', action='store',
+            dest='format', choices=('ndjson', 'csv'), default=None,
+            help="Defaults to 'csv' for .csv files, 'ndjson' otherwise")
+        parser.add_argument('--batch-size', action='store', type=int,
+            dest='batch_size', default=1000,
+            help="Number of questions loaded at once")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or (
+            'csv' if output.endswith('.csv') else 'ndjson')
+        records = iter_records(batch_size=options['batch_size'])
+        if output == '-':
+            nb_records = write_records(sys.stdout, records, fmt)
+        else:
+            with io.open(output, 'w', newline='' if fmt == 'csv' else None,
+                         encoding='utf-8') as stream:
+                nb_records = write_records(stream, records, fmt)
+        self.stderr.write("%d question(s) exported." % nb_records)
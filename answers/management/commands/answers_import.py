@@ -0,0 +1,72 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Imports Questions with their votes, followers and answers.
+"""
+
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...transfer import Importer, read_records
+
+
+class Command(BaseCommand):
+    help = "Loads questions, with their votes, followers and answers, from"\
+        " NDJSON or CSV (see answers.transfer for the format) in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-',
+            help="File to read from ('-' for the standard input)")
+        parser.add_argument('--format', action='store',
+            dest='format', choices=('ndjson', 'csv'), default=None,
+            help="Defaults to 'csv' for .csv files, 'ndjson' otherwise")
+        parser.add_argument('--batch-size', action='store', type=int,
+            dest='batch_size', default=1000,
+            help="Number of questions inserted in a single transaction")
+        parser.add_argument('--on-conflict', action='store',
+            dest='on_conflict', choices=('rename', 'skip'), default='rename',
+            help="What to do with questions whose slug is already taken")
+
+    def handle(self, *args, **options):
+        source = options['input']
+        fmt = options['format'] or (
+            'csv' if source.endswith('.csv') else 'ndjson')
+        importer = Importer(batch_size=options['batch_size'],
+            on_conflict=options['on_conflict'])
+        try:
+            if source == '-':
+                importer.run(read_records(sys.stdin, fmt))
+            else:
+                with io.open(source, newline='' if fmt == 'csv' else None,
+                             encoding='utf-8') as stream:
+                    importer.run(read_records(stream, fmt))
+        except (KeyError, ValueError) as err:
+            raise CommandError("invalid record after %d question(s): %s" % (
+                importer.nb_imported, err))
+        self.stdout.write("%d question(s) imported, %d skipped, %d reference(s)"\
+            " to unknown users." % (importer.nb_imported, importer.nb_skipped,
+            importer.nb_unknown_users))
@@ -0,0 +1,144 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Rebuilds the denormalized counters on Question from the Vote, Follow and
+comments tables, and on Answer from the AnswerVote table.
+
+Each counter is assigned a subquery in the UPDATE itself, such that
+votes and follows recorded concurrently (see `bulk_increment_counters`)
+are never overwritten with a stale count.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ...backends.queue import iter_chunks
+from ...cache import bump_question_versions
+from ...models import (Answer, AnswerVote, Follow, Vote,
+    get_question_model, touch_questions)
+from ...utils import count_answers
+
+
+def _aggregate(queryset, field_name, aggregate):
+    """
+    Returns an expression that aggregates the rows of *queryset*
+    whose *field_name* is the row in the outer query.
+    """
+    rows = queryset.filter(**{field_name: OuterRef('pk')}).order_by().values(
+        field_name).annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def _get_vote_counters(vote_model, field_name):
+    return {
+        'votes_score': _aggregate(
+            vote_model.objects.all(), field_name, Sum('vote')),
+        'nb_upvotes': _aggregate(vote_model.objects.filter(
+            vote=Vote.UP_VOTE), field_name, Count('pk')),
+        'nb_downvotes': _aggregate(vote_model.objects.filter(
+            vote=Vote.DOWN_VOTE), field_name, Count('pk'))
+    }
+
+
+def _get_drifted(counters):
+    """
+    Returns a filter on the rows where any of *counters* is out-of-date.
+    """
+    drifted = Q()
+    for field_name, value in counters.items():
+        drifted |= ~Q(**{field_name: value})
+    return drifted
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the vote, follower and answer counters on Question"\
+        " from the Vote, Follow and comments tables, and the vote counters"\
+        " on Answer from the AnswerVote table. Missing Answer rows are"\
+        " created."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', action='store', type=int,
+            dest='batch_size', default=1000,
+            help="Number of questions to recount in a single transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        question_model = get_question_model()
+        nb_updated = 0
+        for questions in iter_chunks(
+                question_model.objects.only('pk'), batch_size):
+            nb_updated += self.recount([question.pk for question in questions])
+        self.stdout.write("%d question(s) updated." % nb_updated)
+        # Comments imported in bulk do not have an Answer.
+        nb_created = Answer.objects.create_missing(batch_size=batch_size)
+        nb_updated = 0
+        for answers in iter_chunks(Answer.objects.only('pk'), batch_size):
+            nb_updated += self.recount_answers(
+                [answer.pk for answer in answers])
+        self.stdout.write("%d answer(s) created, %d answer(s) updated." % (
+            nb_created, nb_updated))
+
+    @staticmethod
+    def recount_answers(answer_pks):
+        """
+        Recomputes the counters of *answer_pks* and returns the number
+        of answers whose counters had drifted.
+        """
+        counters = _get_vote_counters(AnswerVote, 'answer')
+        with transaction.atomic():
+            drifted = dict(Answer.objects.filter(pk__in=answer_pks).filter(
+                _get_drifted(counters)).values_list('pk', 'question_id'))
+            if drifted:
+                Answer.objects.filter(pk__in=drifted.keys()).update(
+                    **counters)
+                touch_questions(get_question_model(), drifted.values())
+        return len(drifted)
+
+    @staticmethod
+    def recount(question_pks):
+        """
+        Recomputes the counters of *question_pks* and returns the number
+        of questions whose counters had drifted.
+        """
+        question_model = get_question_model()
+        counters = _get_vote_counters(Vote, 'question')
+        counters.update({
+            'nb_followers': _aggregate(
+                Follow.objects.all(), 'question', Count('pk')),
+            'nb_answers': count_answers(question_model)
+        })
+        with transaction.atomic():
+            drifted = list(question_model.objects.filter(
+                pk__in=question_pks).filter(_get_drifted(
+                counters)).values_list('pk', flat=True))
+            if drifted:
+                question_model.objects.filter(pk__in=drifted).update(
+                    updated_at=timezone.now(), **counters)
+                transaction.on_commit(
+                    lambda: bump_question_versions(drifted))
+        return len(drifted)
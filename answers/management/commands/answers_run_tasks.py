@@ -0,0 +1,62 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Runs tasks recorded by the database executor.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...backends.executors import run_pending_tasks
+
+
+class Command(BaseCommand):
+    help = "Runs the tasks (ex: notifications) recorded by"\
+        " answers.backends.executors.DatabaseExecutor."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', action='store', type=int,
+            dest='batch_size', default=100,
+            help="Number of tasks run in a single transaction")
+        parser.add_argument('--sleep', action='store', type=int,
+            dest='sleep', default=0,
+            help="Keep polling for tasks, sleeping for that many seconds"\
+            " when there are none")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            nb_processed = 0
+            while True:
+                nb_batch = run_pending_tasks(batch_size=batch_size)
+                if not nb_batch:
+                    break
+                nb_processed += nb_batch
+            if nb_processed:
+                self.stdout.write("%d task(s) run." % nb_processed)
+            if not options['sleep']:
+                break
+            time.sleep(options['sleep'])
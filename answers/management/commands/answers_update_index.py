@@ -0,0 +1,75 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Drains the queue of pending search index updates.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...backends.queue import process_index_updates, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Applies pending search index updates recorded by"\
+        " QueuedSignalProcessor, or rebuilds the index from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', action='store', type=int,
+            dest='batch_size', default=1000,
+            help="Number of objects sent to the search backend at once")
+        parser.add_argument('--rebuild', action='store_true',
+            dest='rebuild', default=False,
+            help="Clear and re-index all objects instead of draining"\
+            " the queue")
+        parser.add_argument('--using', action='store',
+            dest='using', default='default',
+            help="haystack connection to rebuild")
+        parser.add_argument('--sleep', action='store', type=int,
+            dest='sleep', default=0,
+            help="Keep polling the queue, sleeping for that many seconds"\
+            " when it is empty")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['rebuild']:
+            nb_indexed = rebuild_index(
+                using=options['using'], batch_size=batch_size)
+            self.stdout.write("%d object(s) indexed." % nb_indexed)
+            return
+        while True:
+            nb_processed = 0
+            while True:
+                nb_batch = process_index_updates(batch_size=batch_size)
+                if not nb_batch:
+                    break
+                nb_processed += nb_batch
+            if nb_processed:
+                self.stdout.write(
+                    "%d pending update(s) processed." % nb_processed)
+            if not options['sleep']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,211 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('django_comments', '0004_add_object_pk_is_removed_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingIndexUpdate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('using', models.CharField(default='default', help_text='haystack connection alias', max_length=100)),
+                ('identifier', models.CharField(help_text='app_label.model_name.pk', max_length=255)),
+                ('removed', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PendingTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task', models.CharField(help_text='dotted path to the function to run', max_length=255)),
+                ('arguments', models.TextField(default='[]', help_text='JSON-encoded list of positional arguments')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('slug', models.SlugField(help_text='unique identifier for the question. It can be used in a URL.', unique=True)),
+                ('title', models.CharField(help_text='Short description of the question.', max_length=255, verbose_name='Title')),
+                ('referer', models.TextField(blank=True, null=True, verbose_name='Referer')),
+                ('text', models.TextField(help_text='Enter your question here', verbose_name='Text')),
+                ('votes_score', models.IntegerField(default=0, editable=False)),
+                ('nb_upvotes', models.PositiveIntegerField(default=0, editable=False)),
+                ('nb_downvotes', models.PositiveIntegerField(default=0, editable=False)),
+                ('nb_followers', models.PositiveIntegerField(default=0, editable=False)),
+                ('nb_answers', models.PositiveIntegerField(default=0, editable=False)),
+                ('hot_score', models.FloatField(default=0, editable=False)),
+                ('user', models.ForeignKey(db_column='user_id', null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'index_together': {('hot_score', 'id'), ('created_at', 'id'), ('nb_answers', 'created_at', 'id'), ('votes_score', 'created_at', 'id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedDigest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=40)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='answers.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IndexedPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('term', models.CharField(max_length=64)),
+                ('object_pk', models.PositiveIntegerField()),
+                ('frequency', models.PositiveIntegerField()),
+                ('length', models.PositiveIntegerField()),
+            ],
+            options={
+                'unique_together': {('model', 'term', 'object_pk')},
+                'index_together': {('model', 'object_pk')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexedDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_pk', models.PositiveIntegerField()),
+                ('length', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('model', 'object_pk')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Answer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submit_date', models.DateTimeField()),
+                ('is_accepted', models.BooleanField(default=False)),
+                ('votes_score', models.IntegerField(default=0, editable=False)),
+                ('nb_upvotes', models.PositiveIntegerField(default=0, editable=False)),
+                ('nb_downvotes', models.PositiveIntegerField(default=0, editable=False)),
+                ('comment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='answers_answer', to='django_comments.comment')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='answers.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveSmallIntegerField(choices=[(1, 'hourly'), (2, 'daily')])),
+                ('bucket', models.DateTimeField(help_text='start of the bucket (UTC)')),
+                ('votes_score', models.IntegerField(default=0)),
+                ('nb_upvotes', models.IntegerField(default=0)),
+                ('nb_downvotes', models.IntegerField(default=0)),
+                ('nb_followers', models.IntegerField(default=0)),
+                ('nb_questions', models.IntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='answers.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Vote',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vote', models.SmallIntegerField(choices=[(1, '+1'), (-1, '-1')])),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='answers.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'question')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedQuestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('computed_at', models.DateTimeField()),
+                ('score', models.FloatField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related', to='answers.question')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='answers.question')),
+            ],
+            options={
+                'unique_together': {('question', 'related')},
+                'index_together': {('question', 'score')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PendingNotification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.CharField(max_length=32)),
+                ('answer_pk', models.CharField(max_length=64, null=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='answers.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers_pending_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'index_together': {('user', 'created_at')},
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.PositiveSmallIntegerField(choices=[(0, 'immediately'), (1, 'hourly digest'), (2, 'daily digest')], default=0)),
+                ('last_sent_at', models.DateTimeField(editable=False, help_text='when the last digest was sent', null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='answers_notification_preference', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'index_together': {('frequency', 'last_sent_at')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followers', to='answers.question')),
+                ('user', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='follows', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'question')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AnswerVote',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vote', models.SmallIntegerField(choices=[(1, '+1'), (-1, '-1')])),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='answers.answer')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers_answer_votes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'answer')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', '-is_accepted', '-votes_score', 'submit_date', 'id'], name='answers_answer_thread_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activityrollup',
+            unique_together={('question', 'period', 'bucket')},
+        ),
+        migrations.AlterIndexTogether(
+            name='activityrollup',
+            index_together={('period', 'bucket')},
+        ),
+    ]
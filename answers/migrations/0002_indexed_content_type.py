@@ -0,0 +1,84 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def forwards_content_type(apps, schema_editor):
+    """
+    Replaces the ``app_label.model_name`` of each indexed document
+    by the id of its content type.
+    """
+    content_type_model = apps.get_model('contenttypes', 'ContentType')
+    db_alias = schema_editor.connection.alias
+    for model_name in ('IndexedPosting', 'IndexedDocument'):
+        model = apps.get_model('answers', model_name)
+        for model_ct in model.objects.using(db_alias).values_list(
+                'model', flat=True).distinct():
+            app_label, name = model_ct.split('.')
+            content_type, _ = content_type_model.objects.using(
+                db_alias).get_or_create(app_label=app_label, model=name)
+            model.objects.using(db_alias).filter(model=model_ct).update(
+                content_type=content_type)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('answers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexedposting',
+            name='content_type',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype'),
+        ),
+        migrations.AddField(
+            model_name='indexeddocument',
+            name='content_type',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype'),
+        ),
+        migrations.RunPython(forwards_content_type, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='indexedposting',
+            unique_together=set(),
+        ),
+        migrations.AlterIndexTogether(
+            name='indexedposting',
+            index_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='indexeddocument',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='indexedposting',
+            name='model',
+        ),
+        migrations.RemoveField(
+            model_name='indexeddocument',
+            name='model',
+        ),
+        migrations.AlterField(
+            model_name='indexedposting',
+            name='content_type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype'),
+        ),
+        migrations.AlterField(
+            model_name='indexeddocument',
+            name='content_type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='indexedposting',
+            unique_together={('content_type', 'term', 'object_pk')},
+        ),
+        migrations.AlterIndexTogether(
+            name='indexedposting',
+            index_together={('content_type', 'object_pk')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='indexeddocument',
+            unique_together={('content_type', 'object_pk')},
+        ),
+    ]
@@ -23,9 +23,91 @@
 # ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 from __future__ import unicode_literals
 
-from django.db.models import Sum
+import hashlib
 
-from .models import get_question_model
+from django.db.models import Case, IntegerField, TextField, Value, When
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.translation import get_language, ugettext as _
+from django.views.decorators.http import condition
+
+from .backends import get_search_backend
+from .cache import get_questions_version
+from .instrumentation import timed
+from .models import Answer, get_question_model
+from .routers import primary
+from .throttling import check_rate, get_ident
+from .utils import get_answers
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers conditional requests (``If-None-Match``, ``If-Modified-Since``)
+    with ``304 Not Modified`` before the ORM work and rendering of the view.
+
+    By default the ETag is derived from the site-wide version
+    of the Questions (see `answers.cache`) and the query parameters.
+    ETags always vary on the view, the request user and the language.
+    """
+
+    def get_etag_parts(self):
+        return [get_questions_version(), self.request.GET.urlencode()]
+
+    def get_etag(self, request, *args, **kwargs):
+        #pylint:disable=unused-argument
+        parts = self.get_etag_parts()
+        if parts is None:
+            return None
+        parts += [self.__class__.__name__,
+            getattr(request.user, 'pk', None), get_language()]
+        return hashlib.md5(':'.join([
+            str(part) for part in parts]).encode('utf-8')).hexdigest()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        #pylint:disable=unused-argument,no-self-use
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        return condition(etag_func=self.get_etag,
+            last_modified_func=self.get_last_modified)(
+            super(ConditionalGetMixin, self).dispatch)(
+            request, *args, **kwargs)
+
+
+class ThrottleMixin(object):
+    """
+    Rejects unsafe requests over the budget of ``throttle_scope``
+    (see `answers.throttling`) with ``429 Too Many Requests`` before
+    the view does any work.
+    """
+    throttle_scope = None
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def dispatch(self, request, *args, **kwargs):
+        if (self.throttle_scope is not None
+            and request.method not in self.safe_methods):
+            wait = check_rate(self.throttle_scope, get_ident(request))
+            if wait is not None:
+                response = HttpResponse(
+                    _("Too many requests. Please try again later."),
+                    status=429)
+                response['Retry-After'] = '%d' % wait
+                return response
+        return super(ThrottleMixin, self).dispatch(request, *args, **kwargs)
+
+
+class PrimaryDatabaseMixin(object):
+    """
+    Reads from the primary database while handling the request, such that
+    a view reading back what it just wrote does not depend on
+    the replication lag of ``ANSWERS['READ_DATABASE']``
+    (see `answers.routers`).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with primary():
+            return super(PrimaryDatabaseMixin, self).dispatch(
+                request, *args, **kwargs)
 
 
 class QuestionMixin(object):
@@ -36,18 +118,137 @@ class QuestionMixin(object):
     def get_queryset(self):
         return self.model.objects.all()
 
+    @timed('answers.question.context')
     def get_context_data(self, **kwargs):
         context = super(QuestionMixin, self).get_context_data(**kwargs)
         context.update({
-            'nb_followers': self.object.followers.all().count(),
-            'votes_score': self.object.votes.all().annotate(Sum('vote')).get(
-                'sum_vote', 0)
+            'nb_followers': self.object.nb_followers,
+            'votes_score': self.object.votes_score
         })
         if self.request.user.is_authenticated:
-            context.update({
-                'is_following': self.object.followers.filter(
-                    user=self.request.user).exists(),
-                'is_voted': self.object.votes.filter(
+            # `is_following` and `user_vote` are annotated on the queryset
+            # (see `annotate_user_state`) when available.
+            if hasattr(self.object, 'is_following'):
+                is_following = self.object.is_following
+                user_vote = self.object.user_vote
+            else:
+                is_following = self.object.followers.filter(
                     user=self.request.user).exists()
+                user_vote = self.object.votes.filter(
+                    user=self.request.user).values_list(
+                    'vote', flat=True).first()
+            context.update({
+                'is_following': is_following,
+                'is_voted': user_vote is not None,
+                'user_vote': user_vote
             })
         return context
+
+
+class AnswerListMixin(object):
+    """
+    Answers to a Question, the accepted answer first, then by score
+    of the votes and oldest first.
+    """
+    question_model = get_question_model()
+    # The ordering matches the index on `Answer`. ``id`` breaks ties
+    # such that the ordering is total (see `KeysetPaginator`).
+    ordering = ('-is_accepted', '-votes_score', 'submit_date', 'id')
+
+    def get_ordering(self):
+        return self.ordering
+
+    def get_answers(self, question_pk):
+        # Hidden and removed comments are filtered out as in the
+        # ``get_comment_list`` template tag.
+        return Answer.objects.filter(question_id=question_pk,
+            comment__in=get_answers(self.question_model,
+                object_pk=str(question_pk))).select_related(
+            'comment', 'comment__user')
+
+
+class AnswerMixin(object):
+    """
+    The answer ``answer`` (i.e. the pk of a comment) to the Question
+    identified by ``slug``.
+    """
+
+    def get_object(self):
+        return get_object_or_404(Answer.objects.select_related(
+            'comment', 'comment__user', 'question'),
+            question__slug=self.kwargs.get('slug'),
+            comment_id=self.kwargs.get('answer'))
+
+
+class QuestionListMixin(object):
+    """
+    Questions in one of the supported orderings.
+    """
+    model = get_question_model()
+    ordering_param = 'ordering'
+    default_ordering = 'newest'
+    # The last field of each ordering must be unique such that
+    # the ordering is total (see `KeysetPaginator`).
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        'top': ('-votes_score', '-created_at', '-id'),
+        'hot': ('-hot_score', '-id'),
+        'answered': ('-nb_answers', '-created_at', '-id'),
+    }
+
+    def get_ordering_name(self):
+        ordering_name = self.request.GET.get(self.ordering_param)
+        if ordering_name not in self.orderings:
+            ordering_name = self.default_ordering
+        return ordering_name
+
+    def get_ordering(self):
+        return self.orderings[self.get_ordering_name()]
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+
+class QuestionSearchMixin(QuestionListMixin):
+    """
+    Questions matching the search query 'q', ranked by relevance
+    by default.
+    """
+    limit = 100
+    search_param = 'q'
+    default_ordering = 'relevance'
+    orderings = dict(QuestionListMixin.orderings,
+        relevance=('search_rank', 'id'))
+
+    def get_search_query(self):
+        return self.request.GET.get(self.search_param, None)
+
+    @timed('answers.search.backend')
+    def get_search_results(self, query):
+        """
+        Returns a list of ``(pk, score, snippet)`` for Questions matching
+        *query*, most relevant first.
+        """
+        return get_search_backend().search(self.model, query, limit=self.limit)
+
+    def get_queryset(self):
+        query = self.get_search_query()
+        # Without a query, there are no results but the queryset
+        # can still be ordered by relevance.
+        return self.get_results_queryset(
+            self.get_search_results(query) if query else [])
+
+    def get_results_queryset(self, results):
+        """
+        Returns the Questions in *results* (see `get_search_results`).
+        """
+        queryset = super(QuestionSearchMixin, self).get_queryset()
+        # The rank is annotated such that results can be paginated
+        # with a keyset cursor like any other ordering.
+        return queryset.filter(pk__in=[pk for pk, _, _ in results]).annotate(
+            search_rank=Case(*[When(pk=pk, then=Value(rank))
+                for rank, (pk, _, _) in enumerate(results)],
+                default=Value(len(results)), output_field=IntegerField()),
+            snippet=Case(*[When(pk=pk, then=Value(snippet))
+                for pk, _, snippet in results if snippet],
+                default=Value(''), output_field=TextField()))
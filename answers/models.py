@@ -24,16 +24,86 @@
 from __future__ import unicode_literals
 
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.utils.encoding import python_2_unicode_compatible
+from django.db import IntegrityError, connections, models, router, transaction
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from . import settings
-from .compat import get_model_class
+from .compat import get_model_class, python_2_unicode_compatible
+from .instrumentation import timed
+
+
+def increment_counters(question, **deltas):
+    """
+    Atomically adds *deltas* to the denormalized counters of *question*.
+    """
+    bulk_increment_counters(question.__class__, {question.pk: deltas})
+
+
+def _get_increments(model, deltas, lookup='pk'):
+    """
+    Returns the keys in *deltas*, a dictionary key -> {counter: delta},
+    and the expressions that add the deltas to the counters of *model*
+    in a single UPDATE of the rows whose *lookup* field is one of the keys.
+    """
+    counters = {}
+    for key, key_deltas in deltas.items():
+        for field_name, delta in key_deltas.items():
+            if delta:
+                counters.setdefault(field_name, {})[key] = delta
+    keys = set([])
+    for field_deltas in counters.values():
+        keys |= set(field_deltas)
+    updates = {}
+    for field_name, field_deltas in counters.items():
+        values = set(field_deltas.values())
+        if len(values) == 1 and set(field_deltas) == keys:
+            delta = models.Value(values.pop())
+        else:
+            delta = models.Case(*[models.When(then=value, **{lookup: key})
+                for key, value in field_deltas.items()],
+                default=0, output_field=model._meta.get_field(field_name))
+        updates[field_name] = models.F(field_name) + delta
+    return keys, updates
+
+
+def bulk_increment_counters(question_model, deltas):
+    """
+    Atomically adds the counter deltas in *deltas*, a dictionary
+    question pk -> {counter: delta}, to the Questions in a single UPDATE,
+    and records them in the current `ActivityRollup` buckets.
+    """
+    from .cache import bump_question_versions
+
+    question_pks, updates = _get_increments(question_model, deltas)
+    if not updates:
+        return
+    question_model.objects.filter(pk__in=question_pks).update(
+        updated_at=timezone.now(), **updates)
+    ActivityRollup.objects.increment(deltas)
+    # Cached fragments show the counters.
+    transaction.on_commit(lambda: bump_question_versions(question_pks))
+
+
+def touch_questions(question_model, question_pks):
+    """
+    Records a change to *question_pks* that is not reflected
+    in the counters of the Questions, for example on their answers.
+    """
+    from .cache import bump_question_versions
+
+    question_pks = set(question_pks)
+    question_model.objects.filter(pk__in=question_pks).update(
+        updated_at=timezone.now())
+    transaction.on_commit(lambda: bump_question_versions(question_pks))
 
 
 class FollowManager(models.Manager):
 
+    # Maximum number of attempts to record follows when concurrent requests
+    # for the same user and question conflict on the unique constraint.
+    MAX_RETRIES = 3
+
     @staticmethod
     def get_followers(question):
         """
@@ -41,21 +111,79 @@ class FollowManager(models.Manager):
         """
         return get_user_model().objects.filter(follows__question=question)
 
+    @timed('answers.follows.subscribe')
     def subscribe(self, question, user):
         """
         Subscribe a User to changes to a Question.
         """
-        self.get_or_create(user=user, question=question)
+        with transaction.atomic():
+            created = self.get_or_create(user=user, question=question)[1]
+            if created:
+                increment_counters(question, nb_followers=1)
 
+    @timed('answers.follows.unsubscribe')
     def unsubscribe(self, question, user):
         """
         Unsubscribe a User from changes to a Question.
         """
-        try:
-            self.get(user=user, question=question).delete()
-        except models.ObjectDoesNotExist:
-            pass
+        with transaction.atomic():
+            nb_deleted = self.filter(user=user, question=question).delete()[0]
+            if nb_deleted:
+                increment_counters(question, nb_followers=-nb_deleted)
 
+    @timed('answers.follows.bulk_subscribe')
+    def bulk_subscribe(self, questions, user):
+        """
+        Subscribe a User to changes to all *questions* with a constant
+        number of queries. Returns the pks of the Questions the User
+        was not already following.
+        """
+        if not questions:
+            return set([])
+        with transaction.atomic():
+            for attempt in range(self.MAX_RETRIES):
+                question_pks = set([question.pk for question in questions])
+                question_pks -= set(self.select_for_update().filter(
+                    user=user, question__in=question_pks).values_list(
+                    'question', flat=True))
+                try:
+                    with transaction.atomic():
+                        self.bulk_create([Follow(user=user, question=question)
+                            for question in questions
+                            if question.pk in question_pks])
+                    break
+                except IntegrityError:
+                    # A concurrent request followed some of the questions
+                    # in-between. They are locked on the next attempt.
+                    continue
+            else:
+                raise IntegrityError("could not record follows of %s" % user)
+            bulk_increment_counters(get_question_model(), {
+                question_pk: {'nb_followers': 1}
+                for question_pk in question_pks})
+        return question_pks
+
+    @timed('answers.follows.bulk_unsubscribe')
+    def bulk_unsubscribe(self, questions, user):
+        """
+        Unsubscribe a User from changes to all *questions* with a constant
+        number of queries. Returns the pks of the Questions the User
+        was following.
+        """
+        if not questions:
+            return set([])
+        with transaction.atomic():
+            # Locked such that a concurrent request does not delete,
+            # and decrement the counters of, the same rows.
+            follows = dict(self.select_for_update().filter(
+                user=user, question__in=questions).values_list(
+                'pk', 'question'))
+            self.filter(pk__in=follows.keys()).delete()
+            question_pks = set(follows.values())
+            bulk_increment_counters(get_question_model(), {
+                question_pk: {'nb_followers': -1}
+                for question_pk in question_pks})
+        return question_pks
 
 
 @python_2_unicode_compatible
@@ -89,6 +217,9 @@ class Question(models.Model):
     can be associated to a Question.
     """
     created_at = models.DateTimeField(editable=False, auto_now_add=True)
+    # Bumped whenever the Question, its votes, followers or answers
+    # change (see `answers.mixins.ConditionalGetMixin`).
+    updated_at = models.DateTimeField(editable=False, auto_now=True)
     slug = models.SlugField(unique=True, help_text=_(
         "unique identifier for the question. It can be used in a URL."))
     title = models.CharField(verbose_name=_('Title'), max_length=255,
@@ -98,6 +229,25 @@ class Question(models.Model):
     referer = models.TextField(verbose_name=_('Referer'), blank=True, null=True)
     text = models.TextField(verbose_name=_('Text'),
                      help_text=_("Enter your question here"))
+    # Denormalized counters, kept in sync by `VoteManager`, `FollowManager`
+    # and the receivers in `answers.receivers`, and rebuilt
+    # by the `answers_recount` command.
+    votes_score = models.IntegerField(default=0, editable=False)
+    nb_upvotes = models.PositiveIntegerField(default=0, editable=False)
+    nb_downvotes = models.PositiveIntegerField(default=0, editable=False)
+    nb_followers = models.PositiveIntegerField(default=0, editable=False)
+    nb_answers = models.PositiveIntegerField(default=0, editable=False)
+    # Time-decayed popularity (see `answers.ranking`).
+    hot_score = models.FloatField(default=0, editable=False)
+
+    class Meta:
+        # Keyset pagination on the list of questions (see `QuestionListMixin`)
+        index_together = (
+            ('created_at', 'id'),
+            ('votes_score', 'created_at', 'id'),
+            ('hot_score', 'id'),
+            ('nb_answers', 'created_at', 'id'),
+        )
 
     def __str__(self):
         return self.slug
@@ -105,25 +255,184 @@ class Question(models.Model):
 
 class VoteManager(models.Manager):
 
+    # Maximum number of attempts to record a vote when concurrent requests
+    # for the same user and question conflict on the unique constraint.
+    MAX_RETRIES = 3
+    # Name of the foreign key to the object voted on.
+    target_field = 'question'
+
+    def _upsert_postgresql(self, connection, target, user, value):
+        """
+        Inserts or updates the vote in a single statement and returns
+        the previous vote.
+        """
+        opts = self.model._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO %(table)s (%(created_at)s, %(user)s, %(target)s,"
+                " %(vote)s) VALUES (%%s, %%s, %%s, %%s)"
+                " ON CONFLICT (%(user)s, %(target)s) DO UPDATE"
+                " SET %(vote)s = EXCLUDED.%(vote)s"
+                " WHERE %(table)s.%(vote)s <> EXCLUDED.%(vote)s"
+                " RETURNING (xmax = 0)" % {
+                'table': connection.ops.quote_name(opts.db_table),
+                'created_at': opts.get_field('created_at').column,
+                'user': opts.get_field('user').column,
+                'target': opts.get_field(self.target_field).column,
+                'vote': opts.get_field('vote').column},
+                [timezone.now(), user.pk, target.pk, value])
+            row = cursor.fetchone()
+        if row is None:
+            # The row exists and the vote is unchanged: nothing was written.
+            return value
+        # ``xmax = 0`` when the row was inserted. Otherwise an opposite vote
+        # (i.e. ``-value``) was updated.
+        return 0 if row[0] else -value
+
+    def _upsert(self, using, target, user, value):
+        """
+        Inserts or updates the vote, guarding against concurrent inserts,
+        and returns the previous vote.
+        """
+        lookup = {'user': user, self.target_field: target}
+        for attempt in range(self.MAX_RETRIES):
+            # A locking read sees the rows committed by concurrent requests
+            # since the transaction started.
+            previous = self.using(using).select_for_update().filter(
+                **lookup).values_list('vote', flat=True).first()
+            if previous == value:
+                return previous
+            if previous is not None:
+                if self.using(using).filter(vote=previous, **lookup).update(
+                        vote=value):
+                    return previous
+                continue
+            try:
+                with transaction.atomic(using=using):
+                    self.using(using).create(vote=value, **lookup)
+                return 0
+            except IntegrityError:
+                continue
+        raise IntegrityError("could not record vote of %s on %s" % (
+            user, target))
+
+    def _record(self, using, target, user, value):
+        """
+        Records the vote of *user* on *target* and returns the previous vote.
+        """
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            return self._upsert_postgresql(connection, target, user, value)
+        return self._upsert(using, target, user, value)
+
+    @staticmethod
+    def _get_deltas(value, previous):
+        """
+        Returns the changes to the counters of the object voted on
+        when a vote changes from *previous* (0 for no vote) to *value*.
+        """
+        return {
+            'votes_score': value - previous,
+            'nb_upvotes': (value == Vote.UP_VOTE) - (previous == Vote.UP_VOTE),
+            'nb_downvotes': (
+                (value == Vote.DOWN_VOTE) - (previous == Vote.DOWN_VOTE))}
+
+    def _increment(self, targets, deltas):
+        """
+        Adds *deltas*, a dictionary pk -> {counter: delta}, to the counters
+        of *targets*, a dictionary pk -> object voted on.
+        """
+        from .ranking import get_hot_score
+
+        for pk, target_deltas in deltas.items():
+            target_deltas['hot_score'] = get_hot_score(
+                target_deltas['votes_score'], targets[pk].created_at)
+        bulk_increment_counters(get_question_model(), deltas)
+
+    def _record_vote(self, target, user, value):
+        """
+        Records a vote and returns the change in score of *target*.
+
+        No rows are written when the vote is unchanged.
+        """
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            previous = self._record(using, target, user, value)
+            if previous == value:
+                return 0
+            self._increment({target.pk: target},
+                {target.pk: self._get_deltas(value, previous)})
+        return value - previous
+
+    def _record_votes(self, votes, user):
+        """
+        Records the votes of a User, a dictionary object voted on -> vote,
+        with a constant number of queries. Returns a dictionary
+        pk -> change in score.
+        """
+        targets = {target.pk: target for target in votes}
+        values = {target.pk: value for target, value in votes.items()}
+        if not values:
+            return {}
+        target_in = '%s__in' % self.target_field
+        with transaction.atomic():
+            for attempt in range(self.MAX_RETRIES):
+                previous = dict(self.select_for_update().filter(
+                    user=user, **{target_in: values.keys()}).values_list(
+                    self.target_field, 'vote'))
+                try:
+                    with transaction.atomic():
+                        self.bulk_create([self.model(user=user, vote=value,
+                            **{self.target_field: targets[pk]})
+                            for pk, value in values.items()
+                            if pk not in previous])
+                    break
+                except IntegrityError:
+                    # A concurrent request recorded some of the votes
+                    # in-between. They are locked on the next attempt.
+                    continue
+            else:
+                raise IntegrityError("could not record votes of %s" % user)
+            flipped = {}
+            for pk, value in values.items():
+                if previous.get(pk, value) != value:
+                    flipped.setdefault(value, []).append(pk)
+            for value, pks in flipped.items():
+                self.filter(user=user, **{target_in: pks}).update(vote=value)
+            deltas = {pk: self._get_deltas(value, previous.get(pk, 0))
+                for pk, value in values.items()
+                if previous.get(pk, 0) != value}
+            self._increment(targets, deltas)
+        return {pk: value - previous.get(pk, 0)
+            for pk, value in values.items()}
+
+    @timed('answers.votes.vote')
+    def _vote(self, question, user, value):
+        """
+        Records a vote and returns the change in score of *question*.
+        """
+        return self._record_vote(question, user, value)
+
+    @timed('answers.votes.bulk_vote')
+    def bulk_vote(self, votes, user):
+        """
+        Records the votes of a User, a dictionary Question -> vote,
+        with a constant number of queries. Returns a dictionary
+        question pk -> change in score.
+        """
+        return self._record_votes(votes, user)
+
     def vote_up(self, question, user):
         """
-        Vote a Question up by a User.
+        Vote a Question up by a User and returns the change in score.
         """
-        vote, created = self.get_or_create(user=user, question=question,
-            defaults={'vote': Vote.UP_VOTE})
-        if not created:
-            vote.vote = Vote.UP_VOTE
-            vote.save()
+        return self._vote(question, user, Vote.UP_VOTE)
 
     def vote_down(self, question, user):
         """
-        Vote a Question down by a User.
+        Vote a Question down by a User and returns the change in score.
         """
-        vote, created = self.get_or_create(user=user, question=question,
-            defaults={'vote': Vote.DOWN_VOTE})
-        if not created:
-            vote.vote = Vote.DOWN_VOTE
-            vote.save()
+        return self._vote(question, user, Vote.DOWN_VOTE)
 
 
 @python_2_unicode_compatible
@@ -159,3 +468,440 @@ class Vote(models.Model):
     def is_downvote(self):
         return self.vote == self.DOWN_VOTE
 
+
+class AnswerManager(models.Manager):
+
+    @timed('answers.answers.create_missing')
+    def create_missing(self, question_pks=None, batch_size=1000):
+        """
+        Creates the `Answer` of comments posted on Questions (restricted
+        to *question_pks* when specified) that do not have one yet,
+        *batch_size* at a time, and returns the number of answers created.
+        """
+        from django.contrib.contenttypes.models import ContentType
+        from .utils import get_answer_model
+
+        question_model = get_question_model()
+        comments = get_answer_model().objects.filter(
+            content_type=ContentType.objects.get_for_model(question_model),
+            answers_answer__isnull=True).order_by('pk')
+        if question_pks is not None:
+            comments = comments.filter(
+                object_pk__in=[str(pk) for pk in question_pks])
+        to_python = question_model._meta.pk.to_python
+        nb_created = 0
+        last_pk = None
+        while True:
+            batch = comments
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            batch = list(batch.values_list(
+                'pk', 'object_pk', 'submit_date')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            # Comments may refer to Questions that were deleted.
+            existing = set(question_model.objects.filter(
+                pk__in=set([to_python(row[1]) for row in batch])).values_list(
+                'pk', flat=True))
+            answers = [Answer(comment_id=comment_pk,
+                question_id=to_python(object_pk), submit_date=submit_date)
+                for comment_pk, object_pk, submit_date in batch
+                if to_python(object_pk) in existing]
+            self.bulk_create(answers)
+            nb_created += len(answers)
+        return nb_created
+
+    @timed('answers.answers.accept')
+    def accept(self, answer):
+        """
+        Marks *answer* as the accepted answer to its Question.
+        """
+        with transaction.atomic():
+            # Only one answer is accepted per Question.
+            self.filter(question_id=answer.question_id,
+                is_accepted=True).exclude(pk=answer.pk).update(
+                is_accepted=False)
+            self.filter(pk=answer.pk).update(is_accepted=True)
+            touch_questions(get_question_model(), [answer.question_id])
+        answer.is_accepted = True
+
+    @timed('answers.answers.unaccept')
+    def unaccept(self, answer):
+        """
+        Removes the accepted mark from *answer*.
+        """
+        with transaction.atomic():
+            if self.filter(pk=answer.pk, is_accepted=True).update(
+                    is_accepted=False):
+                touch_questions(get_question_model(), [answer.question_id])
+        answer.is_accepted = False
+
+
+@python_2_unicode_compatible
+class Answer(models.Model):
+    """
+    Score and acceptance of an answer (i.e. a comment) to a Question.
+    """
+    objects = AnswerManager()
+
+    comment = models.OneToOneField(settings.COMMENT_MODEL,
+        related_name='answers_answer', on_delete=models.CASCADE)
+    question = models.ForeignKey(settings.QUESTION_MODEL,
+        related_name='answers', on_delete=models.CASCADE)
+    # Copied from the comment such that the answers to a Question
+    # are sorted with a single index.
+    submit_date = models.DateTimeField()
+    is_accepted = models.BooleanField(default=False)
+    # Denormalized counters, kept in sync by `AnswerVoteManager`
+    # and rebuilt by the `answers_recount` command.
+    votes_score = models.IntegerField(default=0, editable=False)
+    nb_upvotes = models.PositiveIntegerField(default=0, editable=False)
+    nb_downvotes = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Keyset pagination on the answers to a Question
+        # (see `AnswerListMixin`). The directions are mixed
+        # so `index_together` cannot be used.
+        indexes = [models.Index(fields=['question', '-is_accepted',
+            '-votes_score', 'submit_date', 'id'],
+            name='answers_answer_thread_idx')]
+
+    def __str__(self):
+        return u'answer %s to %s' % (self.comment_id, self.question_id)
+
+
+class AnswerVoteManager(VoteManager):
+
+    target_field = 'answer'
+
+    def _increment(self, targets, deltas):
+        answer_pks, updates = _get_increments(Answer, deltas)
+        if not updates:
+            return
+        Answer.objects.filter(pk__in=answer_pks).update(**updates)
+        # Answers are shown, and ranked, on the page of their Question.
+        touch_questions(get_question_model(),
+            [targets[pk].question_id for pk in answer_pks])
+
+    @timed('answers.answer_votes.vote')
+    def _vote(self, answer, user, value):
+        """
+        Records a vote and returns the change in score of *answer*.
+        """
+        return self._record_vote(answer, user, value)
+
+    @timed('answers.answer_votes.bulk_vote')
+    def bulk_vote(self, votes, user):
+        """
+        Records the votes of a User, a dictionary Answer -> vote,
+        with a constant number of queries. Returns a dictionary
+        answer pk -> change in score.
+        """
+        return self._record_votes(votes, user)
+
+
+@python_2_unicode_compatible
+class AnswerVote(models.Model):
+    """
+    A vote on an answer by a User.
+    """
+    objects = AnswerVoteManager()
+
+    created_at = models.DateTimeField(editable=False, auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+        related_name='answers_answer_votes', on_delete=models.CASCADE)
+    answer = models.ForeignKey(Answer,
+        related_name='votes', on_delete=models.CASCADE)
+    vote = models.SmallIntegerField(choices=Vote.SCORES)
+
+    class Meta:
+        # One vote per user per answer
+        unique_together = (('user', 'answer'),)
+
+    def __str__(self):
+        return u'%s: %s on %s' % (self.user, self.vote, self.answer)
+
+
+@python_2_unicode_compatible
+class IndexedPosting(models.Model):
+    """
+    Occurrences of a term in a document of the full-text index maintained
+    by `answers.backends.bm25.BM25Engine`.
+
+    There is one row per (term, document) such that re-indexing
+    a document only rewrites the rows of that document. Documents are
+    identified by the integer id of their content type and their pk
+    to keep the rows, and the indexes that lead with them, narrow.
+    """
+    # Leading column of both indexes below.
+    content_type = models.ForeignKey('contenttypes.ContentType',
+        on_delete=models.CASCADE, db_index=False, related_name='+')
+    term = models.CharField(max_length=64)
+    object_pk = models.PositiveIntegerField()
+    frequency = models.PositiveIntegerField()
+    # Copied from `IndexedDocument` such that a search reads
+    # a single table.
+    length = models.PositiveIntegerField()
+
+    class Meta:
+        # The unique index serves searches, the other one
+        # updates of a document.
+        unique_together = (('content_type', 'term', 'object_pk'),)
+        index_together = (('content_type', 'object_pk'),)
+
+    def __str__(self):
+        return u'%s: %s in %s' % (
+            self.content_type_id, self.term, self.object_pk)
+
+
+@python_2_unicode_compatible
+class IndexedDocument(models.Model):
+    """
+    A document in the full-text index maintained
+    by `answers.backends.bm25.BM25Engine`.
+    """
+    content_type = models.ForeignKey('contenttypes.ContentType',
+        on_delete=models.CASCADE, db_index=False, related_name='+')
+    object_pk = models.PositiveIntegerField()
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('content_type', 'object_pk'),)
+
+    def __str__(self):
+        return u'%s.%s' % (self.content_type_id, self.object_pk)
+
+
+@python_2_unicode_compatible
+class PendingIndexUpdate(models.Model):
+    """
+    An object whose entry in a search index must be updated, or removed,
+    by the ``answers_update_index`` command.
+
+    Rows are recorded by `answers.backends.queue.QueuedSignalProcessor`
+    in the same transaction as the change to the object.
+    """
+    created_at = models.DateTimeField(editable=False, auto_now_add=True)
+    using = models.CharField(max_length=100, default='default',
+        help_text=_("haystack connection alias"))
+    identifier = models.CharField(max_length=255,
+        help_text=_("app_label.model_name.pk"))
+    removed = models.BooleanField(default=False)
+
+    def __str__(self):
+        return u'%s %s on %s' % (
+            'remove' if self.removed else 'update', self.identifier, self.using)
+
+
+@python_2_unicode_compatible
+class PendingTask(models.Model):
+    """
+    A task recorded by `answers.backends.executors.DatabaseExecutor`,
+    to be run by the ``answers_run_tasks`` command.
+    """
+    created_at = models.DateTimeField(editable=False, auto_now_add=True)
+    task = models.CharField(max_length=255,
+        help_text=_("dotted path to the function to run"))
+    arguments = models.TextField(default='[]',
+        help_text=_("JSON-encoded list of positional arguments"))
+
+    def __str__(self):
+        return u'%s(%s)' % (self.task, self.arguments)
+
+
+@python_2_unicode_compatible
+class NotificationPreference(models.Model):
+    """
+    How often a User wants to be notified of activity on the Questions
+    they follow. Users without a preference are notified immediately.
+    """
+    IMMEDIATE = 0
+    HOURLY = 1
+    DAILY = 2
+
+    FREQUENCY_CHOICES = (
+        (IMMEDIATE, _("immediately")),
+        (HOURLY, _("hourly digest")),
+        (DAILY, _("daily digest")),
+    )
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL,
+        related_name='answers_notification_preference',
+        on_delete=models.CASCADE)
+    frequency = models.PositiveSmallIntegerField(
+        choices=FREQUENCY_CHOICES, default=IMMEDIATE)
+    last_sent_at = models.DateTimeField(null=True, editable=False,
+        help_text=_("when the last digest was sent"))
+
+    class Meta:
+        index_together = (('frequency', 'last_sent_at'),)
+
+    def __str__(self):
+        return u'%s notified %s' % (self.user, self.get_frequency_display())
+
+
+@python_2_unicode_compatible
+class PendingNotification(models.Model):
+    """
+    An event waiting to be sent to a User as part of a digest
+    by the ``answers_send_digests`` command.
+    """
+    created_at = models.DateTimeField(editable=False, auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+        related_name='answers_pending_notifications',
+        on_delete=models.CASCADE)
+    question = models.ForeignKey(settings.QUESTION_MODEL,
+        related_name='+', on_delete=models.CASCADE)
+    event = models.CharField(max_length=32)
+    answer_pk = models.CharField(max_length=64, null=True)
+
+    class Meta:
+        index_together = (('user', 'created_at'),)
+
+    def __str__(self):
+        return u'%s on %s for %s' % (self.event, self.question, self.user)
+
+
+class ActivityRollupManager(models.Manager):
+
+    # Counters on Question that are also rolled up over time.
+    COUNTERS = ('votes_score', 'nb_upvotes', 'nb_downvotes', 'nb_followers')
+
+    @staticmethod
+    def get_bucket(at_time, period):
+        """
+        Returns the start of the *period* bucket (in UTC) *at_time* falls in.
+        """
+        if timezone.is_aware(at_time):
+            at_time = at_time.astimezone(timezone.utc)
+        bucket = at_time.replace(minute=0, second=0, microsecond=0)
+        if period == ActivityRollup.DAILY:
+            bucket = bucket.replace(hour=0)
+        return bucket
+
+    def _get_rows(self, question_pks, at_time):
+        condition = models.Q()
+        for period, _name in ActivityRollup.PERIOD_CHOICES:
+            condition |= models.Q(
+                period=period, bucket=self.get_bucket(at_time, period))
+        return self.filter(condition, question__in=question_pks)
+
+    def _create_rows(self, question_pks, at_time):
+        """
+        Creates the missing buckets *at_time* for *question_pks*
+        with all counters at zero, in a single INSERT.
+        """
+        # Buckets that already exist, or are created concurrently,
+        # are left untouched.
+        self.bulk_create([ActivityRollup(question_id=question_pk,
+            period=period, bucket=self.get_bucket(at_time, period))
+            for question_pk in sorted(question_pks)
+            for period, _name in ActivityRollup.PERIOD_CHOICES],
+            ignore_conflicts=True)
+
+    @timed('answers.activity.increment')
+    def increment(self, deltas, at_time=None):
+        """
+        Adds *deltas*, a dictionary question pk -> {counter: delta},
+        to the hourly and daily buckets *at_time* (defaults to now).
+
+        Missing buckets are first created with all counters at zero
+        such that the counters are only ever changed through UPDATE.
+        This takes two queries whatever the number of Questions.
+        """
+        if at_time is None:
+            at_time = timezone.now()
+        question_pks, updates = _get_increments(ActivityRollup, {
+            question_pk: {field_name: delta
+                for field_name, delta in question_deltas.items()
+                if field_name in ActivityRollup.COUNTERS}
+            for question_pk, question_deltas in deltas.items()},
+            lookup='question_id')
+        if not updates:
+            return
+        self._create_rows(question_pks, at_time)
+        self._get_rows(question_pks, at_time).update(**updates)
+
+
+@python_2_unicode_compatible
+class ActivityRollup(models.Model):
+    """
+    Changes to the counters of a Question, and whether it was asked,
+    rolled up in hourly and daily buckets.
+
+    Summing a counter over all the buckets of a period gives the value
+    of the counter on the Question (up to counters rebuilt with
+    ``answers_recount``). Site-wide activity is the sum over all
+    Questions in a bucket.
+    """
+    HOURLY = 1
+    DAILY = 2
+
+    PERIOD_CHOICES = (
+        (HOURLY, 'hourly'),
+        (DAILY, 'daily'),
+    )
+
+    COUNTERS = ActivityRollupManager.COUNTERS + ('nb_questions',)
+
+    objects = ActivityRollupManager()
+
+    question = models.ForeignKey(settings.QUESTION_MODEL,
+        related_name='activity', on_delete=models.CASCADE)
+    period = models.PositiveSmallIntegerField(choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField(help_text=_("start of the bucket (UTC)"))
+    votes_score = models.IntegerField(default=0)
+    nb_upvotes = models.IntegerField(default=0)
+    nb_downvotes = models.IntegerField(default=0)
+    nb_followers = models.IntegerField(default=0)
+    nb_questions = models.IntegerField(default=0)
+
+    class Meta:
+        # The unique index serves per-question reads, the other one
+        # site-wide reads (see `answers.api.ActivityAPIView`).
+        unique_together = (('question', 'period', 'bucket'),)
+        index_together = (('period', 'bucket'),)
+
+    def __str__(self):
+        return u'%s %s at %s' % (
+            self.question, self.get_period_display(), self.bucket)
+
+
+@python_2_unicode_compatible
+class RelatedQuestion(models.Model):
+    """
+    A Question similar to *question*, precomputed by
+    the ``answers_build_related`` command (see `answers.related`).
+    """
+    computed_at = models.DateTimeField()
+    question = models.ForeignKey(settings.QUESTION_MODEL,
+        related_name='related', on_delete=models.CASCADE)
+    related = models.ForeignKey(settings.QUESTION_MODEL,
+        related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+
+    class Meta:
+        # The index on (question, score) serves the sidebar of the Question
+        # detail page (see `answers.views.QuestionDetailView`).
+        unique_together = (('question', 'related'),)
+        index_together = (('question', 'score'),)
+
+    def __str__(self):
+        return u'%s related to %s (%.3f)' % (
+            self.related_id, self.question_id, self.score)
+
+
+@python_2_unicode_compatible
+class RelatedDigest(models.Model):
+    """
+    Digest of the title and text of *question* when its related Questions
+    were last computed, such that ``answers_build_related`` only refreshes
+    Questions whose content changed (see `answers.related`).
+    """
+    question = models.OneToOneField(settings.QUESTION_MODEL,
+        related_name='+', on_delete=models.CASCADE)
+    digest = models.CharField(max_length=40)
+
+    def __str__(self):
+        return u'%s: %s' % (self.question_id, self.digest)
@@ -0,0 +1,302 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Notifications of new Questions to the staff, and of new answers
+to the followers of a Question.
+
+When a Question is asked or answered, `notify` submits a single fan-out
+task to the executor configured in ``ANSWERS['NOTIFICATION_EXECUTOR']``,
+so the request returns in constant time whatever the number of recipients.
+The fan-out task expands the recipients in chunks of
+``ANSWERS['NOTIFICATION_BATCH_SIZE']`` and submits one delivery task
+per chunk, which the ``ANSWERS['NOTIFICATION_BACKEND']`` sends.
+
+Users who chose an hourly or daily digest (see `NotificationPreference`)
+are not sent the notification right away. The event is instead recorded
+as a `PendingNotification` and ``answers_send_digests`` later merges all
+the events recorded for a user in a window into a single message.
+
+A notification backend implements ``deliver(event, question, recipients,
+answer=None)`` and ``deliver_digests(digests)``, where *digests* is a list
+of ``(recipient, [(event, question, answer), ...])``. Setting
+``ANSWERS['NOTIFICATION_BACKEND']`` to ``None`` disables notifications.
+"""
+from __future__ import unicode_literals
+
+import datetime
+from collections import OrderedDict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django_comments.signals import comment_was_posted
+
+from . import settings, signals
+from .backends.queue import iter_chunks
+from .compat import get_user_model
+from .instrumentation import timed
+from .models import (Follow, NotificationPreference, PendingNotification,
+    get_question_model)
+from .utils import get_answer_model
+
+QUESTION_NEW = 'question_new'
+ANSWER_NEW = 'answer_new'
+
+DIGEST_WINDOWS = OrderedDict([
+    (NotificationPreference.HOURLY, datetime.timedelta(hours=1)),
+    (NotificationPreference.DAILY, datetime.timedelta(days=1)),
+])
+
+_EXECUTOR = None
+_NOTIFICATION_BACKEND = None
+
+
+def get_executor():
+    """
+    Returns the executor configured in ``ANSWERS['NOTIFICATION_EXECUTOR']``.
+    """
+    global _EXECUTOR #pylint: disable=global-statement
+    if _EXECUTOR is None:
+        _EXECUTOR = import_string(settings.NOTIFICATION_EXECUTOR)()
+    return _EXECUTOR
+
+
+def get_notification_backend():
+    """
+    Returns the backend configured in ``ANSWERS['NOTIFICATION_BACKEND']``,
+    or ``None`` when notifications are disabled.
+    """
+    global _NOTIFICATION_BACKEND #pylint: disable=global-statement
+    if _NOTIFICATION_BACKEND is None and settings.NOTIFICATION_BACKEND:
+        _NOTIFICATION_BACKEND = import_string(settings.NOTIFICATION_BACKEND)()
+    return _NOTIFICATION_BACKEND
+
+
+def get_site_url():
+    """
+    Returns the prefix of the links in notifications, which are sent
+    outside of a request.
+    """
+    if settings.SITE_URL:
+        return settings.SITE_URL.rstrip('/')
+    from django.contrib.sites.models import Site
+    return 'https://%s' % Site.objects.get_current().domain
+
+
+def get_audience(event, question_pk):
+    """
+    Returns the users notified of *event* on a Question: the staff
+    for a new Question (its only follower is the user who asked it),
+    the followers of the Question otherwise.
+    """
+    if event == QUESTION_NEW:
+        user_model = get_user_model()
+        field_names = [field.name for field in user_model._meta.fields]
+        if 'is_staff' not in field_names:
+            return user_model.objects.none()
+        staff = user_model.objects.filter(is_staff=True)
+        if 'is_active' in field_names:
+            staff = staff.filter(is_active=True)
+        return staff
+    return Follow.objects.get_followers(question_pk)
+
+
+def notify(event, question_pk, actor_pk=None, answer_pk=None):
+    """
+    Schedules notifying the audience of *event* (see `get_audience`),
+    except the user who triggered it.
+    """
+    if get_notification_backend() is None:
+        return
+    get_executor().submit(
+        'answers.notifications.fanout', event, question_pk, actor_pk, answer_pk)
+
+
+def fanout(event, question_pk, actor_pk=None, answer_pk=None):
+    """
+    Splits the audience of *event* into chunks and submits
+    a delivery task for each chunk.
+    """
+    recipients = get_audience(event, question_pk).only('pk')
+    if actor_pk is not None:
+        recipients = recipients.exclude(pk=actor_pk)
+    executor = get_executor()
+    for chunk in iter_chunks(recipients, settings.NOTIFICATION_BATCH_SIZE):
+        executor.submit('answers.notifications.deliver', event, question_pk,
+            [recipient.pk for recipient in chunk], answer_pk)
+
+
+def deliver(event, question_pk, recipient_pks, answer_pk=None):
+    """
+    Sends the notification for *event* to the users in *recipient_pks*,
+    or records it for the ones who asked for a digest.
+    """
+    backend = get_notification_backend()
+    question = get_question_model().objects.filter(pk=question_pk).first()
+    if backend is None or question is None:
+        return
+    answer = None
+    if answer_pk is not None:
+        answer = get_answer_model().objects.filter(pk=answer_pk).first()
+        if answer is None:
+            return
+    digested = set(NotificationPreference.objects.filter(
+        user__in=recipient_pks).exclude(
+        frequency=NotificationPreference.IMMEDIATE).values_list(
+        'user', flat=True))
+    if digested:
+        PendingNotification.objects.bulk_create([PendingNotification(
+            user_id=user_pk, question=question, event=event,
+            answer_pk=answer_pk) for user_pk in digested])
+    recipients = get_user_model().objects.filter(
+        pk__in=set(recipient_pks) - digested)
+    backend.deliver(event, question, recipients, answer=answer)
+
+
+def send_digests(batch_size=100, at_time=None):
+    """
+    Sends a digest to each user whose window has elapsed since
+    their last digest and returns the number of digests sent.
+
+    Users are processed *batch_size* at a time: each batch loads all its
+    pending notifications in one query and sends all its messages
+    over one connection.
+    """
+    backend = get_notification_backend()
+    if backend is None:
+        return 0
+    if at_time is None:
+        at_time = timezone.now()
+    nb_sent = 0
+    for frequency, window in DIGEST_WINDOWS.items():
+        due = NotificationPreference.objects.filter(
+            Q(last_sent_at__isnull=True)
+            | Q(last_sent_at__lte=at_time - window),
+            frequency=frequency).annotate(
+            has_pending=Exists(PendingNotification.objects.filter(
+                user=OuterRef('user'), created_at__lte=at_time))).filter(
+            has_pending=True)
+        for chunk in iter_chunks(due, batch_size):
+            with transaction.atomic():
+                nb_sent += _send_digests_batch(backend,
+                    [preference.user_id for preference in chunk], at_time)
+                NotificationPreference.objects.filter(
+                    pk__in=[preference.pk for preference in chunk]).update(
+                    last_sent_at=at_time)
+    return nb_sent
+
+
+def _send_digests_batch(backend, user_pks, at_time):
+    pending = PendingNotification.objects.filter(
+        user__in=user_pks, created_at__lte=at_time)
+    entries = list(pending.select_related('question').order_by(
+        'user', 'created_at', 'pk'))
+    answers = {str(answer.pk): answer
+        for answer in get_answer_model().objects.filter(pk__in=set([
+            entry.answer_pk for entry in entries if entry.answer_pk]))}
+    users = get_user_model().objects.in_bulk(user_pks)
+    digests = OrderedDict()
+    for entry in entries:
+        if entry.answer_pk and entry.answer_pk not in answers:
+            continue # the answer was deleted in the meantime.
+        digests.setdefault(entry.user_id, []).append((entry.event,
+            entry.question, answers.get(entry.answer_pk, None)))
+    backend.deliver_digests([(users[user_pk], items)
+        for user_pk, items in digests.items() if user_pk in users])
+    # Notifications recorded after *entries* were read are left
+    # for the next digest.
+    PendingNotification.objects.filter(
+        pk__in=[entry.pk for entry in entries]).delete()
+    return len(digests)
+
+
+class EmailNotificationBackend(object):
+    """
+    E-mails notifications, one message per recipient, sent over
+    a single connection to the mail server.
+
+    Templates are ``answers/notifications/<event>_subject.txt``
+    and ``answers/notifications/<event>_body.txt``. Links are prefixed
+    with ``site_url`` (see `get_site_url`).
+    """
+    template_prefix = 'answers/notifications/'
+
+    def deliver(self, event, question, recipients, answer=None):
+        context = {'question': question, 'answer': answer,
+            'site_url': get_site_url()}
+        # The content does not depend on the recipient so it is rendered
+        # once per chunk.
+        subject = ' '.join(render_to_string('%s%s_subject.txt' % (
+            self.template_prefix, event), context).splitlines()).strip()
+        body = render_to_string(
+            '%s%s_body.txt' % (self.template_prefix, event), context)
+        send_mass_mail([(subject, body, None, [recipient.email])
+            for recipient in recipients if recipient.email])
+
+    def deliver_digests(self, digests):
+        messages = []
+        site_url = get_site_url()
+        for recipient, notifications in digests:
+            if not recipient.email:
+                continue
+            context = {'recipient': recipient, 'site_url': site_url,
+                'notifications': [{'event': event, 'question': question,
+                    'answer': answer}
+                    for event, question, answer in notifications]}
+            subject = ' '.join(render_to_string(
+                '%sdigest_subject.txt' % self.template_prefix,
+                context).splitlines()).strip()
+            body = render_to_string(
+                '%sdigest_body.txt' % self.template_prefix, context)
+            messages += [(subject, body, None, [recipient.email])]
+        send_mass_mail(messages)
+
+
+@timed('answers.receivers.on_question_new')
+def on_question_new(sender, question, request, **kwargs):
+    #pylint:disable=unused-argument
+    notify(QUESTION_NEW, question.pk, actor_pk=request.user.pk)
+
+
+@timed('answers.receivers.on_comment_posted')
+def on_comment_posted(sender, comment, request, **kwargs):
+    #pylint:disable=unused-argument
+    if (comment.is_public and not comment.is_removed
+        and comment.content_type_id == ContentType.objects.get_for_model(
+            get_question_model()).pk):
+        notify(ANSWER_NEW, comment.object_pk,
+            actor_pk=comment.user_id, answer_pk=comment.pk)
+
+
+def connect_receivers():
+    signals.question_new.connect(on_question_new,
+        dispatch_uid='answers.notifications.question_new')
+    comment_was_posted.connect(on_comment_posted,
+        sender=get_answer_model(),
+        dispatch_uid='answers.notifications.comment_was_posted')
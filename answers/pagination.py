@@ -0,0 +1,224 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from __future__ import unicode_literals
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.http import Http404
+from django.utils.encoding import force_bytes, force_text
+from django.utils.functional import cached_property
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import ValidationError as APIValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values):
+    """
+    Returns an opaque, URL-safe, cursor for a list of keyset *values*.
+    """
+    return force_text(base64.urlsafe_b64encode(force_bytes(json.dumps(
+        [value.isoformat() if hasattr(value, 'isoformat') else value
+         for value in values]))))
+
+
+def decode_cursor(cursor):
+    """
+    Returns the list of keyset values encoded in *cursor*, or raises
+    a ``ValueError`` if the cursor is invalid.
+    """
+    try:
+        values = json.loads(force_text(
+            base64.urlsafe_b64decode(force_bytes(cursor))))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("invalid cursor '%s'" % cursor)
+    if not isinstance(values, list):
+        raise ValueError("invalid cursor '%s'" % cursor)
+    return values
+
+
+class InvalidCursor(Http404):
+    """
+    Raised when a cursor is malformed or does not match the ordering.
+
+    HTML views respond with a 404 while `KeysetPagination` responds
+    with a 400.
+    """
+
+
+class KeysetPaginator(object):
+    """
+    Paginates a queryset by filtering on the values of the last item
+    of the previous page (a.k.a. keyset or seek pagination) instead
+    of using an offset.
+
+    *ordering* is a list of field names, each optionally prefixed by '-'.
+    The last field must be unique (usually ``id``) such that the ordering
+    is total and a page never skips or repeats items.
+    """
+
+    def __init__(self, queryset, ordering, page_size):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.page_size = page_size
+
+    def _to_python(self, field_name, value):
+        try:
+            field = self.queryset.model._meta.get_field(field_name)
+            return field.to_python(value)
+        except FieldDoesNotExist:
+            # annotations
+            return value
+
+    def get_keyset_filter(self, values):
+        """
+        Returns a filter that selects items strictly after *values*
+        in the ordering.
+        """
+        if len(values) != len(self.ordering):
+            raise ValueError("cursor does not match ordering")
+        keyset_filter = None
+        equals = {}
+        for field_name, value in zip(self.ordering, values):
+            descending = field_name.startswith('-')
+            field_name = field_name.lstrip('-')
+            value = self._to_python(field_name, value)
+            clause = Q(**{'%s__%s' % (
+                field_name, 'lt' if descending else 'gt'): value})
+            if equals:
+                clause &= Q(**equals)
+            keyset_filter = (
+                clause if keyset_filter is None else keyset_filter | clause)
+            equals.update({field_name: value})
+        return keyset_filter
+
+    def get_keyset(self, item):
+        return [getattr(item, field_name.lstrip('-'))
+            for field_name in self.ordering]
+
+    def get_page_queryset(self, cursor=None):
+        """
+        Returns the (unevaluated) queryset of the items following *cursor*.
+        """
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(decode_cursor(cursor)))
+            except (TypeError, ValueError, ValidationError):
+                raise InvalidCursor(_("Invalid cursor"))
+        # Fetch one more item to find out if there is a next page.
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, items):
+        """
+        Returns the items of the page and the cursor to the next page
+        (``None`` on the last page) from the evaluated *items*
+        of `get_page_queryset`.
+        """
+        next_cursor = None
+        if len(items) > self.page_size:
+            items = items[:self.page_size]
+            next_cursor = encode_cursor(self.get_keyset(items[-1]))
+        return items, next_cursor
+
+    def paginate(self, cursor=None):
+        """
+        Returns the items following *cursor* and the cursor to the next
+        page (``None`` on the last page).
+        """
+        return self.get_page(list(self.get_page_queryset(cursor)))
+
+
+class KeysetPage(object):
+    """
+    The page of items following *cursor*, only fetched when first accessed
+    such that templates can skip the query when the page is rendered
+    in a cached fragment.
+    """
+
+    def __init__(self, paginator, cursor=None):
+        self.paginator = paginator
+        self.cursor = cursor
+
+    @cached_property
+    def _page(self):
+        return self.paginator.paginate(self.cursor)
+
+    @property
+    def object_list(self):
+        return self._page[0]
+
+    @property
+    def next_cursor(self):
+        return self._page[1]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination for API views relying on `KeysetPaginator`.
+
+    The view must implement ``get_ordering()`` (see `QuestionListMixin`).
+    """
+    page_size = 25
+    cursor_query_param = 'cursor'
+
+    def __init__(self):
+        self.request = None
+        self.next_cursor = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(
+            queryset, view.get_ordering(), self.page_size)
+        try:
+            items, self.next_cursor = paginator.paginate(
+                request.query_params.get(self.cursor_query_param))
+        except InvalidCursor as err:
+            raise APIValidationError(
+                {self.cursor_query_param: [force_text(err)]})
+        return items
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+            self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
@@ -0,0 +1,117 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Materialized "hot" ranking of Questions.
+
+The hot score of a Question is ``points / (age_in_hours + 2) ** gravity``
+where *points* is the score of the votes plus ``ANSWERS['HOT_ANSWER_WEIGHT']``
+for each answer. The score is stored in `Question.hot_score`, an indexed
+column, so listing the hot questions is a single index range scan.
+
+When a vote or an answer lands, the contribution of the new points
+is added to the stored score with the current age of the Question.
+The ``answers_decay_hot`` command periodically recomputes the score
+of Questions created within the last ``ANSWERS['HOT_HORIZON']`` days
+to account for their aging, and resets older ones to zero.
+
+Answers to a Question are ranked by acceptance, then score of their votes,
+then date, with the score stored in `Answer.votes_score`.
+"""
+from __future__ import unicode_literals
+
+import datetime
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, FloatField, When
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from . import settings
+from .backends.queue import iter_chunks
+from .cache import bump_questions_version
+from .instrumentation import timed
+from .models import get_question_model, increment_counters
+from .utils import get_answer_model
+
+
+def get_hot_score(points, created_at, at_time=None):
+    """
+    Returns the hot score of a Question created at *created_at* with
+    *points* at time *at_time* (defaults to now).
+    """
+    if at_time is None:
+        at_time = timezone.now()
+    if created_at < at_time - datetime.timedelta(days=settings.HOT_HORIZON):
+        return 0.0
+    age = max((at_time - created_at).total_seconds() / 3600, 0)
+    return points / (age + 2) ** settings.HOT_GRAVITY
+
+
+@timed('answers.receivers.on_answer_saved')
+def on_answer_saved(sender, instance, created, raw=False, **kwargs):
+    #pylint:disable=unused-argument
+    if (not created or raw or not instance.is_public or instance.is_removed
+        or instance.content_type_id != ContentType.objects.get_for_model(
+            get_question_model()).pk):
+        return
+    question = get_question_model().objects.filter(
+        pk=instance.object_pk).only('pk', 'created_at').first()
+    if question is not None:
+        increment_counters(question, hot_score=get_hot_score(
+            settings.HOT_ANSWER_WEIGHT, question.created_at))
+
+
+def decay_hot_scores(batch_size=1000, at_time=None):
+    """
+    Recomputes the hot score of recent Questions, *batch_size* Questions
+    per UPDATE, and returns the number of Questions updated.
+    """
+    if at_time is None:
+        at_time = timezone.now()
+    question_model = get_question_model()
+    horizon = at_time - datetime.timedelta(days=settings.HOT_HORIZON)
+    nb_updated = question_model.objects.filter(
+        created_at__lt=horizon).exclude(hot_score=0).update(hot_score=0)
+    recent = question_model.objects.filter(created_at__gte=horizon).only(
+        'pk', 'created_at', 'votes_score', 'nb_answers')
+    for chunk in iter_chunks(recent, batch_size):
+        with transaction.atomic():
+            question_model.objects.filter(
+                pk__in=[question.pk for question in chunk]).update(
+                hot_score=Case(*[When(pk=question.pk, then=get_hot_score(
+                    question.votes_score
+                    + settings.HOT_ANSWER_WEIGHT * question.nb_answers,
+                    question.created_at, at_time=at_time))
+                    for question in chunk], output_field=FloatField()))
+        nb_updated += len(chunk)
+    # The order of the hot questions may have changed.
+    bump_questions_version()
+    return nb_updated
+
+
+def connect_receivers():
+    post_save.connect(on_answer_saved, sender=get_answer_model(),
+        dispatch_uid='answers.ranking.answer_saved')
@@ -0,0 +1,81 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Receivers that keep `Answer` rows, and `Question.nb_answers`, in sync
+with the comments posted on Questions.
+
+An `Answer` is created along each comment posted on a Question, such that
+the answers to a Question are ranked with a single index.
+
+Comments can be hidden (``is_public``, ``is_removed``) after they were
+posted, so ``nb_answers`` is recounted in a single UPDATE whenever
+a comment on a Question is saved or deleted.
+"""
+from __future__ import unicode_literals
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_delete, post_save
+
+from .instrumentation import timed
+from .models import Answer, get_question_model
+from .utils import get_answer_model, update_nb_answers
+
+
+def _get_question_pk(comment):
+    """
+    Returns the pk of the Question *comment* was posted on, or ``None``
+    when it was posted on another kind of object.
+    """
+    question_model = get_question_model()
+    if comment.content_type_id != ContentType.objects.get_for_model(
+            question_model).pk:
+        return None
+    return question_model._meta.pk.to_python(comment.object_pk)
+
+
+@timed('answers.receivers.on_comment_saved')
+def on_comment_saved(sender, instance, created, raw=False, **kwargs):
+    #pylint:disable=unused-argument
+    question_pk = _get_question_pk(instance)
+    if raw or question_pk is None:
+        return
+    if created:
+        Answer.objects.create(comment=instance, question_id=question_pk,
+            submit_date=instance.submit_date)
+    update_nb_answers(get_question_model(), [question_pk])
+
+
+@timed('answers.receivers.on_comment_deleted')
+def on_comment_deleted(sender, instance, **kwargs):
+    #pylint:disable=unused-argument
+    question_pk = _get_question_pk(instance)
+    if question_pk is not None:
+        update_nb_answers(get_question_model(), [question_pk])
+
+
+def connect_receivers():
+    post_save.connect(on_comment_saved, sender=get_answer_model(),
+        dispatch_uid='answers.receivers.comment_saved')
+    post_delete.connect(on_comment_deleted, sender=get_answer_model(),
+        dispatch_uid='answers.receivers.comment_deleted')
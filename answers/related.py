@@ -0,0 +1,300 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Precomputed related Questions.
+
+Each Question is represented by the TF-IDF vector of the terms in its title
+and text, where terms in the title count twice. The related Questions are
+the *top_k* Questions with the greatest cosine similarity. They are stored
+in `RelatedQuestion` so that the sidebar of the detail page is a single
+indexed lookup.
+
+Similarities are computed on sparse matrices by batches of Questions,
+``X[batch] . X^T``, where ``X`` is the L2-normalized TF-IDF matrix.
+This requires numpy and scipy, which are only imported when a build runs
+(see the ``answers_build_related`` command).
+
+A build refreshes the Questions whose title or text changed since
+the previous build (as recorded by a `RelatedDigest`), the Questions that
+listed them, and the Questions whose top Questions they would now be part
+of. Votes and answers do not change the content of a Question, so they
+do not trigger a refresh. Inverse document frequencies change slightly
+with each Question, so the scores of Questions not refreshed drift until
+the next full rebuild (``--rebuild``), which refreshes all Questions.
+
+Questions whose list of related Questions changed are touched (see
+`touch_questions`) such that conditional GETs of their detail page
+do not return a stale sidebar. For the same reason, the Questions that
+list a Question are touched when its title or slug changes, or when
+it is deleted, without waiting for the next build.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+from collections import Counter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.signals import post_save, pre_delete
+from django.utils import timezone
+
+from .backends.bm25 import tokenize
+from .instrumentation import timed
+from .models import (RelatedDigest, RelatedQuestion, get_question_model,
+    touch_questions)
+
+# Weight of the terms in the title relative to the terms in the text.
+TITLE_WEIGHT = 2
+
+
+def _import_numpy():
+    try:
+        import numpy
+        import scipy.sparse
+    except ImportError:
+        raise ImproperlyConfigured("related questions require numpy"\
+            " and scipy (pip install numpy scipy)")
+    return numpy, scipy.sparse
+
+
+def _batches(items, batch_size):
+    for idx in range(0, len(items), batch_size):
+        yield items[idx:idx + batch_size]
+
+
+def get_digest(title, text):
+    """
+    Returns the digest of the content of a Question from which
+    its related Questions are computed.
+    """
+    return hashlib.sha1(('%s\n%s' % (title or '', text or '')).encode(
+        'utf-8')).hexdigest()
+
+
+def get_tfidf_matrix(rows):
+    """
+    Returns ``(pks, matrix)`` where row i of *matrix* is the L2-normalized
+    TF-IDF vector of the Question ``pks[i]``, for *rows* an iterable
+    of ``(pk, title, text)``.
+    """
+    numpy, sparse = _import_numpy()
+    pks = []
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    counts = []
+    for pk, title, text in rows:
+        terms = Counter(tokenize(title or '') * TITLE_WEIGHT
+            + tokenize(text or ''))
+        for term, count in terms.items():
+            indices += [vocabulary.setdefault(term, len(vocabulary))]
+            counts += [count]
+        indptr += [len(indices)]
+        pks += [pk]
+    matrix = sparse.csr_matrix((
+        numpy.asarray(counts, dtype=numpy.float64),
+        numpy.asarray(indices, dtype=numpy.int64),
+        numpy.asarray(indptr, dtype=numpy.int64)),
+        shape=(len(pks), len(vocabulary)))
+    # Sublinear term frequencies and smoothed inverse document frequencies.
+    matrix.data = 1 + numpy.log(matrix.data)
+    doc_freqs = numpy.bincount(matrix.indices, minlength=len(vocabulary))
+    idfs = numpy.log((1.0 + len(pks)) / (1.0 + doc_freqs)) + 1
+    matrix = sparse.csr_matrix(matrix.multiply(idfs))
+    norms = numpy.sqrt(numpy.asarray(
+        matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return pks, sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def get_similarities(matrix, row_idxs):
+    """
+    Returns the sparse matrix of similarities between the rows *row_idxs*
+    and all the rows of *matrix*.
+    """
+    return matrix[row_idxs].dot(matrix.T).tocsr()
+
+
+def get_top_related(similarities, row_idxs, top_k, min_score):
+    """
+    Returns for each row in *row_idxs* the list of ``(row, score)``
+    of the *top_k* most similar rows, most similar first, excluding itself
+    and rows with a score less than *min_score*.
+    """
+    numpy, _ = _import_numpy()
+    results = []
+    for idx, row_idx in enumerate(row_idxs):
+        start, end = similarities.indptr[idx], similarities.indptr[idx + 1]
+        cols = similarities.indices[start:end]
+        scores = similarities.data[start:end]
+        keep = (cols != row_idx) & (scores >= min_score)
+        cols, scores = cols[keep], scores[keep]
+        if len(scores) > top_k:
+            top = numpy.argpartition(-scores, top_k)[:top_k]
+            cols, scores = cols[top], scores[top]
+        order = numpy.argsort(-scores, kind='mergesort')
+        results += [list(zip(cols[order].tolist(), scores[order].tolist()))]
+    return results
+
+
+def _get_stale(matrix, pks, changed, top_k, min_score, batch_size):
+    """
+    Returns the pks of Questions whose related Questions must be
+    recomputed when the Questions *changed* were updated.
+    """
+    positions = {pk: idx for idx, pk in enumerate(pks)}
+    stale = set(changed)
+    # Questions that listed a changed Question have a stale score.
+    for chunk in _batches(list(changed), batch_size):
+        stale |= set(RelatedQuestion.objects.filter(
+            related__in=chunk).values_list('question', flat=True))
+    # Questions for which a changed Question now is among the top.
+    changed_idxs = [positions[pk] for pk in changed if pk in positions]
+    for chunk in _batches(changed_idxs, batch_size):
+        similarities = get_similarities(matrix, chunk).tocoo()
+        best = {}
+        for row, col, score in zip(similarities.row.tolist(),
+                similarities.col.tolist(), similarities.data.tolist()):
+            if chunk[row] != col and score >= min_score:
+                best[pks[col]] = max(best.get(pks[col], 0), score)
+        candidates = [pk for pk in best if pk not in stale]
+        for candidates_chunk in _batches(candidates, batch_size):
+            thresholds = {row['question']: (
+                row['min_score'] if row['nb_related'] >= top_k else min_score)
+                for row in RelatedQuestion.objects.filter(
+                    question__in=candidates_chunk).values('question').annotate(
+                    min_score=Min('score'), nb_related=Count('pk'))}
+            stale |= set([pk for pk in candidates_chunk
+                if best[pk] > thresholds.get(pk, min_score)])
+    return stale
+
+
+def _iter_digested(rows, digests):
+    """
+    Yields *rows* of ``(pk, title, text)`` and records the digest
+    of each Question in *digests*.
+    """
+    for pk, title, text in rows:
+        digests[pk] = get_digest(title, text)
+        yield pk, title, text
+
+
+def _save_related(question_pks, related, pks, digests, at_time):
+    """
+    Replaces the related Questions of *question_pks* by *related*
+    (see `get_top_related`), records their *digests* and touches
+    the Questions whose list of related Questions changed.
+    """
+    previous = {question_pk: [] for question_pk in question_pks}
+    for question_pk, related_pk in RelatedQuestion.objects.filter(
+            question__in=question_pks).order_by(
+            'question', '-score').values_list('question', 'related'):
+        previous[question_pk] += [related_pk]
+    changed = [question_pk for question_pk, top in zip(question_pks, related)
+        if previous[question_pk] != [pks[col] for col, _ in top]]
+    with transaction.atomic():
+        RelatedQuestion.objects.filter(question__in=question_pks).delete()
+        RelatedQuestion.objects.bulk_create([RelatedQuestion(
+            question_id=question_pk, related_id=pks[col], score=score,
+            computed_at=at_time)
+            for question_pk, top in zip(question_pks, related)
+            for col, score in top])
+        RelatedDigest.objects.filter(question__in=question_pks).delete()
+        RelatedDigest.objects.bulk_create([RelatedDigest(
+            question_id=question_pk, digest=digests[question_pk])
+            for question_pk in question_pks])
+        if changed:
+            # The sidebar is part of the detail page, and its cached
+            # fragments, of the Question.
+            touch_questions(get_question_model(), changed)
+
+
+def build_related(top_k=10, batch_size=100, min_score=0.05, rebuild=False):
+    """
+    Recomputes the *top_k* related Questions of the Questions whose title
+    or text changed since the previous build (all Questions when *rebuild*
+    is true), *batch_size* Questions at a time, and returns the number
+    of Questions refreshed.
+    """
+    question_model = get_question_model()
+    at_time = timezone.now()
+    digests = {}
+    pks, matrix = get_tfidf_matrix(_iter_digested(
+        question_model.objects.order_by('pk').values_list(
+        'pk', 'title', 'text').iterator(), digests))
+    if rebuild or not RelatedDigest.objects.exists():
+        stale_idxs = list(range(len(pks)))
+    else:
+        previous = dict(RelatedDigest.objects.values_list(
+            'question', 'digest').iterator())
+        changed = set([pk for pk, digest in digests.items()
+            if previous.get(pk) != digest])
+        stale = _get_stale(matrix, pks, changed, top_k, min_score, batch_size)
+        stale_idxs = [idx for idx, pk in enumerate(pks) if pk in stale]
+    for chunk in _batches(stale_idxs, batch_size):
+        _save_related([pks[idx] for idx in chunk], get_top_related(
+            get_similarities(matrix, chunk), chunk, top_k, min_score),
+            pks, digests, at_time)
+    return len(stale_idxs)
+
+
+def touch_listing_questions(question_pk):
+    """
+    Touches the Questions that list *question_pk* among their related
+    Questions, such that their sidebar is rendered again.
+    """
+    listing_pks = list(RelatedQuestion.objects.filter(
+        related=question_pk).values_list('question', flat=True))
+    if listing_pks:
+        touch_questions(get_question_model(), listing_pks)
+
+
+@timed('answers.receivers.related_on_question_saved')
+def on_question_saved(sender, instance, created, raw=False,
+                      update_fields=None, **kwargs):
+    #pylint:disable=unused-argument
+    if created or raw:
+        return
+    # The sidebar only shows the title and a link to the slug. Without
+    # *update_fields*, the listing Questions are touched conservatively.
+    if update_fields is not None and not (
+            set(update_fields) & set(['title', 'slug'])):
+        return
+    touch_listing_questions(instance.pk)
+
+
+@timed('answers.receivers.related_on_question_deleted')
+def on_question_deleted(sender, instance, **kwargs):
+    #pylint:disable=unused-argument
+    # Before the delete cascades to the `RelatedQuestion` rows.
+    touch_listing_questions(instance.pk)
+
+
+def connect_receivers():
+    post_save.connect(on_question_saved, sender=get_question_model(),
+        dispatch_uid='answers.related.question_saved')
+    pre_delete.connect(on_question_deleted, sender=get_question_model(),
+        dispatch_uid='answers.related.question_deleted')
@@ -0,0 +1,166 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Routes reads of Questions, votes, followers and answers to a replica.
+
+Reads done while handling a safe (ex: GET) request go to the database
+alias ``ANSWERS['READ_DATABASE']``, except:
+
+- inside a transaction on the primary database,
+- for ``ANSWERS['REPLICA_PIN_SECONDS']`` seconds after a request that
+  wrote to the primary database, such that users read their own writes
+  (ex: the state of the vote and follow buttons),
+- inside a ``with primary():`` block, as in the views that read back
+  what they write (see `answers.mixins.PrimaryDatabaseMixin`).
+
+All other reads, including the ones done by management commands
+and background tasks, go to the primary database.
+
+To use it, add the following to your project settings::
+
+    DATABASE_ROUTERS = ['answers.routers.ReplicaRouter']
+    MIDDLEWARE += ['answers.routers.ReplicaPinningMiddleware']
+"""
+from __future__ import unicode_literals
+
+import threading
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+from . import settings
+
+PIN_COOKIE_NAME = 'answers_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_LOCAL = threading.local()
+
+
+def is_pinned():
+    return (not getattr(_LOCAL, 'use_replica', False)
+        or getattr(_LOCAL, 'pinned', 0) > 0
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block)
+
+
+@contextmanager
+def primary():
+    """
+    Reads from the primary database inside the block.
+    """
+    _LOCAL.pinned = getattr(_LOCAL, 'pinned', 0) + 1
+    try:
+        yield
+    finally:
+        _LOCAL.pinned -= 1
+
+
+def pop_wrote():
+    """
+    Returns whether the current thread wrote to the primary database
+    since the previous call.
+    """
+    wrote = getattr(_LOCAL, 'wrote', False)
+    _LOCAL.wrote = False
+    return wrote
+
+
+def set_wrote(request):
+    """
+    Records that *request* wrote to the primary database in another thread
+    than the one handling it (see `answers.async_views.run_in_pool`).
+    """
+    request.answers_wrote = True
+
+
+def _is_routed(model):
+    from .models import get_question_model
+    from .utils import get_answer_model
+    return (model._meta.app_label == 'answers'
+        or model in (get_question_model(), get_answer_model()))
+
+
+class ReplicaRouter(object):
+    """
+    Sends reads to ``ANSWERS['READ_DATABASE']`` and writes
+    to the primary database.
+    """
+
+    @staticmethod
+    def db_for_read(model, **hints):
+        #pylint:disable=unused-argument
+        if not settings.READ_DATABASE or not _is_routed(model):
+            return None
+        if is_pinned():
+            return DEFAULT_DB_ALIAS
+        return settings.READ_DATABASE
+
+    @staticmethod
+    def db_for_write(model, **hints):
+        #pylint:disable=unused-argument
+        if not _is_routed(model):
+            return None
+        _LOCAL.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    @staticmethod
+    def allow_relation(obj1, obj2, **hints):
+        #pylint:disable=unused-argument
+        databases = (DEFAULT_DB_ALIAS, settings.READ_DATABASE)
+        if (obj1._state.db in databases and obj2._state.db in databases):
+            return True
+        return None
+
+    @staticmethod
+    def allow_migrate(db, app_label, model_name=None, **hints):
+        #pylint:disable=unused-argument
+        if settings.READ_DATABASE and db == settings.READ_DATABASE:
+            # The replica is populated by replication.
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware(MiddlewareMixin):
+    """
+    Pins the requests to the primary database as described
+    in `answers.routers`.
+    """
+
+    @staticmethod
+    def process_request(request):
+        _LOCAL.wrote = False
+        _LOCAL.use_replica = (request.method in SAFE_METHODS
+            and PIN_COOKIE_NAME not in request.COOKIES)
+
+    @staticmethod
+    def process_response(request, response):
+        #pylint:disable=unused-argument
+        if (getattr(_LOCAL, 'wrote', False)
+            or getattr(request, 'answers_wrote', False)):
+            response.set_cookie(PIN_COOKIE_NAME, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True)
+        _LOCAL.wrote = False
+        _LOCAL.use_replica = False
+        return response
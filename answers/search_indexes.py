@@ -22,18 +22,17 @@
 # OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
 # ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from haystack import __version__ as haystack_version
 from haystack import indexes
 
 from answers.models import Question
 
-if haystack_version[0] < 2:
+try:
+    from haystack.indexes import Indexable
+except ImportError:
     # Dealing with incompatibilities between haystack 1.2+ and 2+
     #http://django-haystack.readthedocs.org/en/latest/migration_from_1_to_2.html
     class Indexable(object):
         pass
-else:
-    from haystack.indexes import Indexable
 
 
 class QuestionIndex(indexes.SearchIndex, Indexable):
@@ -46,7 +45,7 @@ class QuestionIndex(indexes.SearchIndex, Indexable):
         """
         Used when the entire index for model is updated.
         """
-        return self.get_model().objects.all()
+        return self.get_model().objects.order_by('pk')
 
     def get_queryset(self):
         """Haystack 1.X series."""
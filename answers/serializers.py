@@ -29,6 +29,26 @@ from rest_framework import serializers
 from .models import get_question_model
 
 
+class SparseFieldsMixin(object):
+    """
+    Restricts the fields serialized to the comma-separated list passed
+    in the 'fields' query parameter, if any.
+    """
+    fields_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super(SparseFieldsMixin, self).__init__(*args, **kwargs)
+        request = self.context.get('request', None)
+        if request is not None:
+            # Also used outside of DRF views (see `answers.async_views`).
+            params = getattr(request, 'query_params', request.GET)
+            requested = params.get(self.fields_param, None)
+            if requested:
+                requested = set(requested.split(','))
+                for field_name in set(self.fields.keys()) - requested:
+                    self.fields.pop(field_name)
+
+
 class QuestionSummarySerializer(serializers.ModelSerializer):
     #pylint: disable=no-init
     slug = serializers.SlugField(help_text=_(
@@ -40,3 +60,79 @@ class QuestionSummarySerializer(serializers.ModelSerializer):
         model = get_question_model()
         fields = ('slug', 'title')
         read_only_fields = ('slug', 'title')
+
+
+class QuestionSerializer(SparseFieldsMixin, QuestionSummarySerializer):
+    #pylint: disable=no-init
+    nb_answers = serializers.IntegerField(read_only=True,
+        help_text=_("Number of answers to the question."))
+
+    class Meta(QuestionSummarySerializer.Meta):
+        fields = ('slug', 'title', 'text', 'created_at', 'votes_score',
+            'nb_upvotes', 'nb_downvotes', 'nb_followers', 'nb_answers',
+            'hot_score', 'updated_at')
+        read_only_fields = fields
+
+
+class QuestionSearchSerializer(QuestionSerializer):
+    #pylint: disable=no-init
+    snippet = serializers.CharField(read_only=True,
+        help_text=_("HTML excerpt of the question with matching terms"\
+            " highlighted, when supported by the search backend."))
+
+    class Meta(QuestionSerializer.Meta):
+        fields = QuestionSerializer.Meta.fields + ('snippet',)
+        read_only_fields = fields
+
+
+class AnswerSerializer(serializers.Serializer):
+    #pylint: disable=abstract-method
+    id = serializers.IntegerField(source='comment_id', help_text=_(
+        "unique identifier for the answer."))
+    user_name = serializers.CharField(source='comment.name', help_text=_(
+        "name of the user who answered."))
+    comment = serializers.CharField(source='comment.comment', help_text=_(
+        "text of the answer."))
+    submit_date = serializers.DateTimeField(help_text=_(
+        "date/time the answer was submitted."))
+    votes_score = serializers.IntegerField(help_text=_(
+        "score of the votes on the answer."))
+    is_accepted = serializers.BooleanField(help_text=_(
+        "true when the author of the question accepted the answer."))
+
+
+class BulkActionSerializer(serializers.Serializer):
+    #pylint: disable=abstract-method
+    FOLLOW = 'follow'
+    UNFOLLOW = 'unfollow'
+    UPVOTE = 'upvote'
+    DOWNVOTE = 'downvote'
+
+    ACTIONS = (FOLLOW, UNFOLLOW, UPVOTE, DOWNVOTE)
+
+    slug = serializers.SlugField(help_text=_(
+        "unique identifier for the question."))
+    action = serializers.ChoiceField(choices=ACTIONS,
+        help_text=_("one of 'follow', 'unfollow', 'upvote' or 'downvote'."))
+
+
+class BulkActionResultSerializer(BulkActionSerializer):
+    #pylint: disable=abstract-method
+    status = serializers.CharField(help_text=_(
+        "'applied', 'unchanged' or 'not-found'."))
+
+
+class ActivitySerializer(serializers.Serializer):
+    #pylint: disable=abstract-method
+    bucket = serializers.DateTimeField(help_text=_(
+        "start of the hourly or daily bucket"))
+    votes_score = serializers.IntegerField(help_text=_(
+        "change in the score of votes"))
+    nb_upvotes = serializers.IntegerField(help_text=_(
+        "change in the number of up votes"))
+    nb_downvotes = serializers.IntegerField(help_text=_(
+        "change in the number of down votes"))
+    nb_followers = serializers.IntegerField(help_text=_(
+        "change in the number of followers"))
+    nb_questions = serializers.IntegerField(help_text=_(
+        "number of questions asked"))
@@ -27,17 +27,91 @@ Convenience module for access of djaodjin-answers application settings,
 which enforces default settings when the main settings module does not
 contain the appropriate settings.
 """
+import sys
+
 from django.conf import settings
+from django.core.signals import setting_changed
 
-_SETTINGS = {
+_DEFAULTS = {
     'ACCOUNT_MODEL': getattr(settings, 'AUTH_USER_MODEL'),
-    'QUESTION_MODEL': 'answers.Question'
+    'ASYNC_MAX_WORKERS': 10,
+    'CACHE': 'default',
+    'CACHE_TIMEOUT': 300,
+    # Must match the model returned by `django_comments.get_model()`.
+    'COMMENT_MODEL': 'django_comments.Comment',
+    'HOT_ANSWER_WEIGHT': 2,
+    'HOT_GRAVITY': 1.8,
+    'HOT_HORIZON': 30,
+    'METRICS_OPTIONS': {},
+    # Function called with the request that returns `True` when
+    # the request is allowed to read the aggregated metrics.
+    'METRICS_PERMISSION': 'answers.instrumentation.is_staff',
+    'METRICS_SINK': None,
+    'NOTIFICATION_BACKEND': 'answers.notifications.EmailNotificationBackend',
+    'NOTIFICATION_BATCH_SIZE': 500,
+    'NOTIFICATION_EXECUTOR': 'answers.backends.executors.ThreadPoolExecutor',
+    'QUESTION_MODEL': 'answers.Question',
+    'READ_DATABASE': None,
+    'REPLICA_PIN_SECONDS': 10,
+    'SEARCH_BACKEND': 'answers.backends.haystack_search.HaystackSearchBackend',
+    # Prefix of the links in notifications, ex: 'https://example.com'.
+    # Defaults to https:// followed by the domain of the current Site.
+    'SITE_URL': None,
+    'THROTTLE_RATES': {
+        'ask': '10/hour',
+        'bulk': '10/min',
+        'follow': '60/min',
+        'vote': '60/min',
+    },
 }
-_SETTINGS.update(getattr(settings, 'ANSWERS', {}))
+
+
+def _get_settings():
+    answers_settings = dict(_DEFAULTS)
+    answers_settings.update(getattr(settings, 'ANSWERS', {}))
+    return answers_settings
+
+
+_SETTINGS = _get_settings()
 
 
 ACCOUNT_MODEL = _SETTINGS.get('ACCOUNT_MODEL')
+ASYNC_MAX_WORKERS = _SETTINGS.get('ASYNC_MAX_WORKERS')
+CACHE = _SETTINGS.get('CACHE')
+CACHE_TIMEOUT = _SETTINGS.get('CACHE_TIMEOUT')
+COMMENT_MODEL = _SETTINGS.get('COMMENT_MODEL')
+HOT_ANSWER_WEIGHT = _SETTINGS.get('HOT_ANSWER_WEIGHT')
+HOT_GRAVITY = _SETTINGS.get('HOT_GRAVITY')
+HOT_HORIZON = _SETTINGS.get('HOT_HORIZON')
+METRICS_OPTIONS = _SETTINGS.get('METRICS_OPTIONS')
+METRICS_PERMISSION = _SETTINGS.get('METRICS_PERMISSION')
+METRICS_SINK = _SETTINGS.get('METRICS_SINK')
+NOTIFICATION_BACKEND = _SETTINGS.get('NOTIFICATION_BACKEND')
+NOTIFICATION_BATCH_SIZE = _SETTINGS.get('NOTIFICATION_BATCH_SIZE')
+NOTIFICATION_EXECUTOR = _SETTINGS.get('NOTIFICATION_EXECUTOR')
 AUTH_USER_MODEL = getattr(
     settings, 'AUTH_USER_MODEL', 'django.contrib.auth.models.User')
 QUESTION_MODEL = _SETTINGS.get('QUESTION_MODEL')
+READ_DATABASE = _SETTINGS.get('READ_DATABASE')
+REPLICA_PIN_SECONDS = _SETTINGS.get('REPLICA_PIN_SECONDS')
+SEARCH_BACKEND = _SETTINGS.get('SEARCH_BACKEND')
+SITE_URL = _SETTINGS.get('SITE_URL')
+THROTTLE_RATES = _SETTINGS.get('THROTTLE_RATES')
 SLUG_RE = '[a-zA-Z0-9-]+'
+
+
+def reload_settings(setting, **kwargs):
+    """
+    Reloads the settings above when ``ANSWERS`` changes (ex: through
+    ``override_settings`` in tests). Values read when a module is loaded
+    (ex: ``METRICS_SINK`` by `answers.instrumentation.timed`) keep
+    their original value.
+    """
+    #pylint:disable=unused-argument
+    if setting == 'ANSWERS':
+        answers_settings = _get_settings()
+        for key in _DEFAULTS:
+            setattr(sys.modules[__name__], key, answers_settings.get(key))
+
+
+setting_changed.connect(reload_settings)
@@ -0,0 +1,200 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Allocation of unique slugs for Questions.
+
+A slug is derived from the title of a Question. When it is already taken,
+the next free ``-<n>`` suffix is found with a single query on the unique
+index of ``Question.slug``, instead of probing ``-2``, ``-3``, ... one
+query at a time.
+"""
+from __future__ import unicode_literals
+
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, Q
+from django.db.models.functions import Length
+from django.utils.text import slugify
+
+from . import settings
+from .models import get_question_model
+
+# Maximum number of attempts to save a Question when concurrent requests
+# allocate the same slug.
+MAX_RETRIES = 5
+# Room left at the end of the slug for the ``-<n>`` suffix.
+SUFFIX_LENGTH = 7
+# Number of distinct slugs looked up in a single query by `allocate_slugs`.
+BATCH_SIZE = 500
+# Slugs must match the ``slug`` group of the URL patterns in `answers.urls`.
+SLUG_PATTERN = re.compile(r'^%s\Z' % settings.SLUG_RE)
+
+_RESERVED_SLUGS = None
+
+
+def _get_first_segments(patterns, prefix=''):
+    segments = set([])
+    for pattern in patterns:
+        regex = prefix + str(pattern.pattern).lstrip('^')
+        if hasattr(pattern, 'url_patterns'):
+            segments |= _get_first_segments(pattern.url_patterns, regex)
+        else:
+            segment = regex.split('/')[0]
+            if SLUG_PATTERN.match(segment):
+                segments.add(segment)
+    return segments
+
+
+def get_reserved_slugs():
+    """
+    Returns the first path segments of the URL patterns in `answers.urls`.
+    A Question with one of these slugs would be shadowed by the pattern
+    (ex: ``/search/``) and its detail page could never be reached.
+    """
+    #pylint:disable=global-statement
+    global _RESERVED_SLUGS
+    if _RESERVED_SLUGS is None:
+        # Imported here because `answers.urls` depends on this module
+        # through the views and forms.
+        from .urls import urlpatterns
+        _RESERVED_SLUGS = frozenset(_get_first_segments(urlpatterns))
+    return _RESERVED_SLUGS
+
+
+def is_valid_slug(slug):
+    """
+    Returns `True` if *slug* can be used in the URLs of a Question.
+    """
+    return bool(SLUG_PATTERN.match(slug)) and slug not in get_reserved_slugs()
+
+
+def get_slug_base(title, model=None):
+    """
+    Returns the slug derived from *title*, short enough to accomodate
+    a suffix.
+    """
+    if model is None:
+        model = get_question_model()
+    max_length = model._meta.get_field('slug').max_length
+    # `slugify` keeps underscores, which the URL patterns do not accept.
+    base = re.sub(r'[^a-z0-9-]+', '-', slugify(title))
+    base = re.sub(r'-{2,}', '-', base)[:max_length - SUFFIX_LENGTH].strip('-')
+    return base or 'question'
+
+
+def _get_suffix_condition(base):
+    return Q(slug=base) | Q(slug__startswith='%s-' % base,
+        slug__regex=r'^%s-[0-9]+$' % re.escape(base))
+
+
+def _parse_suffix(base, slug):
+    return 1 if slug == base else int(slug[len(base) + 1:])
+
+
+def allocate_slug(base, model=None):
+    """
+    Returns *base*, or *base* followed by the smallest suffix greater
+    than all the suffixes in use, when *base* is taken or reserved
+    by the URL patterns.
+    """
+    if model is None:
+        model = get_question_model()
+    is_reserved = base in get_reserved_slugs()
+    # Among slugs with the same prefix, the longest one, then the greatest
+    # in alphabetical order, has the greatest suffix.
+    last = model.objects.filter(_get_suffix_condition(base)).annotate(
+        is_base_taken=Exists(model.objects.filter(slug=base))).order_by(
+        Length('slug').desc(), '-slug').values_list(
+        'slug', 'is_base_taken').first()
+    if last is None:
+        return '%s-2' % base if is_reserved else base
+    if not last[1] and not is_reserved:
+        return base
+    return '%s-%d' % (base, _parse_suffix(base, last[0]) + 1)
+
+
+def allocate_slugs(bases, model=None, reserved=None):
+    """
+    Returns a list of slugs, unique in the database and across the list,
+    for *bases*. Taken slugs are suffixed as in `allocate_slug`, with one
+    query per `BATCH_SIZE` distinct bases. Slugs in *reserved*, as well
+    as the slugs reserved by the URL patterns, are considered taken even
+    though they are not in the database.
+    """
+    if model is None:
+        model = get_question_model()
+    distinct_bases = list(set(bases))
+    taken = set(reserved or []) | get_reserved_slugs()
+    last_suffixes = {}
+    for idx in range(0, len(distinct_bases), BATCH_SIZE):
+        batch = set(distinct_bases[idx:idx + BATCH_SIZE])
+        condition = Q()
+        for base in batch:
+            condition |= _get_suffix_condition(base)
+        for slug in model.objects.filter(condition).values_list(
+                'slug', flat=True).iterator():
+            # A slug ``a-b-2`` matches bases ``a-b`` and ``a-b-2``.
+            head, _, tail = slug.rpartition('-')
+            for base in [slug] + ([head] if tail.isdigit() else []):
+                if base in batch:
+                    last_suffixes[base] = max(last_suffixes.get(base, 0),
+                        _parse_suffix(base, slug))
+            taken.add(slug)
+    slugs = []
+    for base in bases:
+        slug = base
+        if base in taken:
+            suffix = max(last_suffixes.get(base, 0), 1)
+            while True:
+                suffix += 1
+                slug = '%s-%d' % (base, suffix)
+                # A generated ``a-2`` could collide with a base ``a-2``.
+                if slug not in taken:
+                    break
+            last_suffixes[base] = suffix
+        taken.add(slug)
+        slugs += [slug]
+    return slugs
+
+
+def save_with_unique_slug(question, base=None):
+    """
+    Allocates a slug for *question*, derived from *base* (defaults
+    to the title), and saves it. Retries up to `MAX_RETRIES` times when
+    a concurrent request takes the same slug first.
+    """
+    if base is None:
+        base = get_slug_base(question.title, model=question.__class__)
+    for _ in range(MAX_RETRIES):
+        question.slug = allocate_slug(base, model=question.__class__)
+        try:
+            with transaction.atomic():
+                question.save()
+            return question
+        except IntegrityError:
+            continue
+    raise IntegrityError(
+        "could not allocate a unique slug for '%s'" % base)
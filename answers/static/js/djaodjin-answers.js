@@ -138,6 +138,88 @@
         },
     };
 
+    /** Loads the following pages of answers to a ``Question`` on demand.
+
+        HTML requirements:
+
+        <... class="dj-answers-thread">
+          <div>...</div>
+        </...>
+        <... class="dj-answers-more" data-next="*url to the next page*">
+        </...>
+     */
+    function AnswerThread(el, options){
+        this.element = $(el);
+        this.options = options;
+        this.init();
+    }
+
+    AnswerThread.prototype = {
+        init: function () {
+            var self = this;
+            self.more = $(self.options.more);
+            self.more.click(function() {
+                self.loadMore();
+            });
+        },
+
+        appendAnswer: function (answer) {
+            var self = this;
+            var nbAnswers = self.element.children().length;
+            var item = $("<div><a></a><div><h4><a></a>&nbsp;<span></span>"
+                + "</h4><p></p><small></small></div></div>");
+            item.children("a").attr("name", "c" + answer.id);
+            item.find("h4 a").attr("href", "#c" + answer.id).text(
+                "#" + (nbAnswers + 1));
+            item.find("h4 span").text(answer.user_name);
+            item.find("p").text(answer.comment);
+            item.find("small").text(answer.votes_score + " vote"
+                + (answer.votes_score === 1 ? "" : "s") + " - "
+                + new Date(answer.submit_date).toDateString());
+            if( answer.is_accepted ) {
+                item.addClass("dj-answers-accepted");
+            }
+            self.element.append(item);
+        },
+
+        loadMore: function () {
+            var self = this;
+            var next = self.more.data("next");
+            if( !next ) {
+                return;
+            }
+            self.more.prop("disabled", true);
+            $.ajax({
+                type: "GET",
+                url: next,
+                success: function(data) {
+                    for( var idx = 0; idx < data.results.length; ++idx ) {
+                        self.appendAnswer(data.results[idx]);
+                    }
+                    if( data.next ) {
+                        self.more.data("next", data.next);
+                        self.more.prop("disabled", false);
+                    } else {
+                        self.more.remove();
+                    }
+                },
+                error: function(resp) {
+                    self.more.prop("disabled", false);
+                    showErrorMessages(resp, "error");
+                },
+            });
+        },
+    };
+
+    $.fn.djAnswerThread = function(options) {
+        var opts = $.extend( {}, $.fn.djAnswerThread.defaults, options );
+        return new AnswerThread($(this), opts);
+    };
+
+    $.fn.djAnswerThread.defaults = {
+        more: ".dj-answers-more"
+    };
+
     $.fn.djForumQuestion = function(options) {
         var opts = $.extend( {}, $.fn.djForumQuestion.defaults, options );
         return new ForumQuestion($(this), opts);
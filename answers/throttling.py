@@ -0,0 +1,159 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Rate limiting of writes (votes, follows, new questions, ...).
+
+Each scope has a budget of ``<number>/<period>`` requests (for example
+``30/min``) configured in ``ANSWERS['THROTTLE_RATES']``. Requests are
+counted per user, or per IP address for anonymous requests, in the cache
+configured in ``ANSWERS['CACHE']``.
+
+Counts are kept in a sliding window: the count of the current fixed
+window is added to the count of the previous window, weighted by
+the part of the previous window still covered by the sliding window.
+Like a token bucket with a capacity of <number> refilled at a rate
+of <number> per <period>, short bursts are allowed, and the budget
+is recovered progressively. Checking a request costs a few cache
+operations and no database query.
+"""
+from __future__ import unicode_literals
+
+import math
+import time
+
+from rest_framework.throttling import BaseThrottle
+
+from . import settings
+from .cache import get_cache
+from .instrumentation import increment
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Returns ``(number of requests, period in seconds)`` for *rate*,
+    or ``None`` if *rate* is ``None``.
+    """
+    if rate is None:
+        return None
+    try:
+        nb_requests, period = rate.split('/')
+        return int(nb_requests), PERIODS[period[0]]
+    except (KeyError, IndexError, ValueError):
+        raise ValueError("invalid rate '%s'" % rate)
+
+
+def get_rate(scope):
+    return parse_rate(settings.THROTTLE_RATES.get(scope, None))
+
+
+def get_ident(request, user=None):
+    """
+    Returns the identifier requests are counted against.
+    """
+    if user is None:
+        user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return 'user:%s' % user.pk
+    return 'ip:%s' % request.META.get('REMOTE_ADDR', '')
+
+
+def _get_key(scope, ident, window_idx):
+    return 'answers.throttle.%s.%s.%d' % (scope, ident, window_idx)
+
+
+def check_rate(scope, ident, at_time=None):
+    """
+    Counts a request by *ident* in *scope* and returns ``None`` when it is
+    allowed, or the number of seconds to wait before it would be allowed.
+
+    Rejected requests are not counted.
+    """
+    rate = get_rate(scope)
+    if rate is None:
+        return None
+    nb_requests, period = rate
+    if at_time is None:
+        at_time = time.time()
+    window_idx = int(at_time // period)
+    elapsed = at_time - window_idx * period
+    current_key = _get_key(scope, ident, window_idx)
+    previous_key = _get_key(scope, ident, window_idx - 1)
+    cache = get_cache()
+    counts = cache.get_many([current_key, previous_key])
+    current = counts.get(current_key, 0)
+    previous = counts.get(previous_key, 0)
+    if previous * (period - elapsed) / period + current + 1 > nb_requests:
+        increment('answers.throttle.rejected', tags={'scope': scope})
+        return _get_wait(nb_requests, period, elapsed, current, previous)
+    # The counter must outlive the next window, where it is the previous one.
+    cache.add(current_key, 0, 2 * period)
+    try:
+        cache.incr(current_key)
+    except ValueError:
+        # The key was evicted in-between.
+        cache.set(current_key, 1, 2 * period)
+    return None
+
+
+def _get_wait(nb_requests, period, elapsed, current, previous):
+    if nb_requests == 0:
+        # The scope is closed. Requests are never allowed.
+        return period
+    # The weighted count decreases as the sliding window moves away from
+    # the previous window, then from the current one once it becomes
+    # the previous window.
+    room = nb_requests - 1 - current
+    if room >= 0:
+        # 0 <= room < previous here.
+        wait = (period - elapsed) - room * period / float(previous)
+    else:
+        wait = (period - elapsed) + period * (
+            1 - (nb_requests - 1) / float(current))
+    return max(int(math.ceil(wait)), 1)
+
+
+class ScopedRateThrottle(BaseThrottle):
+    """
+    Throttles requests to API views according to the budget
+    of their ``throttle_scope`` in ``ANSWERS['THROTTLE_RATES']``.
+
+    Safe methods (``GET``, ``HEAD``, ``OPTIONS``) are not throttled.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None or request.method in self.safe_methods:
+            return True
+        self.wait_seconds = check_rate(scope, get_ident(request))
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,354 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Streaming import and export of Questions with their votes, followers
+and answers (see the ``answers_import`` and ``answers_export`` commands).
+
+Each record is a Question::
+
+    {"slug": "water-use", "title": "...", "text": "...",
+     "created_at": "2017-01-01T00:00:00Z", "user": "alice", "referer": null,
+     "votes": [{"user": "bob", "vote": 1}],
+     "followers": ["alice", "bob"],
+     "answers": [{"user": "bob", "user_name": "Bob", "user_email": "",
+         "comment": "...", "submit_date": "2017-01-02T00:00:00Z",
+         "is_public": true, "is_removed": false}]}
+
+Records are stored one per line (NDJSON), or one per row in CSV files
+where ``votes``, ``followers`` and ``answers`` are JSON-encoded columns.
+Users are referred to by their username.
+"""
+from __future__ import unicode_literals
+
+import csv
+import json
+from collections import OrderedDict
+
+from django.conf import settings as django_settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Case, DateTimeField, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .activity import rebuild_question_rollups
+from .backends import get_search_backend
+from .backends.haystack_search import HaystackSearchBackend
+from .backends.queue import (enqueue_index_updates, iter_chunks,
+    process_index_updates)
+from .cache import bump_questions_version
+from .compat import get_user_model
+from .models import Answer, Follow, Vote, get_question_model
+from .ranking import decay_hot_scores
+from .slugs import allocate_slugs, get_slug_base, is_valid_slug
+from .utils import get_answer_model, update_nb_answers
+
+CSV_COLUMNS = ('slug', 'title', 'text', 'created_at', 'user', 'referer',
+    'votes', 'followers', 'answers')
+CSV_JSON_COLUMNS = ('votes', 'followers', 'answers')
+ANSWER_FIELDS = ('user_name', 'user_email', 'comment', 'submit_date',
+    'is_public', 'is_removed')
+
+
+def read_records(stream, fmt):
+    """
+    Yields the records in *stream* one at a time.
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            for column in CSV_JSON_COLUMNS:
+                row[column] = json.loads(row[column]) if row.get(column) else []
+            yield row
+    else:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_records(batch_size=1000):
+    """
+    Yields all Questions as records, loading *batch_size* Questions
+    and their votes, followers and answers in four queries.
+    """
+    question_model = get_question_model()
+    username_field = 'user__%s' % get_user_model().USERNAME_FIELD
+    content_type = ContentType.objects.get_for_model(question_model)
+    for chunk in iter_chunks(
+            question_model.objects.select_related('user'), batch_size):
+        records = OrderedDict()
+        for question in chunk:
+            records[question.pk] = OrderedDict([
+                ('slug', question.slug),
+                ('title', question.title),
+                ('text', question.text),
+                ('created_at', question.created_at),
+                ('user', question.user.get_username()
+                    if question.user is not None else None),
+                ('referer', question.referer),
+                ('votes', []),
+                ('followers', []),
+                ('answers', [])])
+        for question_pk, username, vote in Vote.objects.filter(
+                question__in=records.keys()).order_by('pk').values_list(
+                'question', username_field, 'vote'):
+            records[question_pk]['votes'] += [
+                OrderedDict([('user', username), ('vote', vote)])]
+        for question_pk, username in Follow.objects.filter(
+                question__in=records.keys()).order_by('pk').values_list(
+                'question', username_field):
+            records[question_pk]['followers'] += [username]
+        # Answers refer to Questions through a text field.
+        question_pks = {str(pk): pk for pk in records.keys()}
+        answers = get_answer_model().objects.filter(content_type=content_type,
+            object_pk__in=question_pks.keys()).order_by('pk').values_list(
+            'object_pk', username_field, *ANSWER_FIELDS)
+        for row in answers:
+            answer = OrderedDict([('user', row[1])])
+            answer.update(zip(ANSWER_FIELDS, row[2:]))
+            records[question_pks[row[0]]]['answers'] += [answer]
+        for record in records.values():
+            yield record
+
+
+def write_records(stream, records, fmt):
+    """
+    Writes *records* to *stream* and returns the number of records written.
+    """
+    nb_records = 0
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(CSV_COLUMNS)
+    for record in records:
+        if fmt == 'csv':
+            writer.writerow([json.dumps(record[column], cls=DjangoJSONEncoder)
+                if column in CSV_JSON_COLUMNS else (
+                    record[column].isoformat()
+                    if hasattr(record[column], 'isoformat')
+                    else record[column]) for column in CSV_COLUMNS])
+        else:
+            stream.write(json.dumps(record, cls=DjangoJSONEncoder))
+            stream.write('\n')
+        nb_records += 1
+    return nb_records
+
+
+def _parse_datetime(value, default):
+    if not value:
+        return default
+    at_time = parse_datetime(value)
+    if at_time is None:
+        raise ValueError("invalid date/time '%s'" % value)
+    if django_settings.USE_TZ and timezone.is_naive(at_time):
+        at_time = timezone.make_aware(at_time, timezone.utc)
+    return at_time
+
+
+class Importer(object):
+    """
+    Imports records in batches of *batch_size* Questions, each batch
+    with a constant number of queries and in its own transaction.
+
+    Slugs must match ``settings.SLUG_RE``. Questions whose slug is already
+    taken are renamed (``on_conflict='rename'``) or skipped
+    (``on_conflict='skip'``). Questions without a slug are given one
+    derived from their title.
+    Votes and followers by unknown users are skipped, answers by unknown
+    users are imported as anonymous answers.
+
+    Search index updates are queued with each batch and applied
+    in batches at the end.
+    """
+
+    def __init__(self, batch_size=1000, on_conflict='rename'):
+        self.batch_size = batch_size
+        self.on_conflict = on_conflict
+        self.question_model = get_question_model()
+        self.answer_model = get_answer_model()
+        self.content_type = ContentType.objects.get_for_model(
+            self.question_model)
+        self.site_id = django_settings.SITE_ID
+        # Other search backends index Questions within the database.
+        self.reindex = isinstance(
+            get_search_backend(), HaystackSearchBackend)
+        self.nb_imported = 0
+        self.nb_skipped = 0
+        self.nb_unknown_users = 0
+
+    def run(self, records):
+        batch = []
+        for record in records:
+            batch += [record]
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        self.finalize()
+
+    def _get_users(self, batch):
+        user_model = get_user_model()
+        usernames = set([])
+        for record in batch:
+            usernames |= set([record.get('user')] + [
+                vote['user'] for vote in record.get('votes', [])]
+                + list(record.get('followers', [])) + [
+                answer.get('user') for answer in record.get('answers', [])])
+        usernames.discard(None)
+        usernames.discard('')
+        return {user.get_username(): user.pk
+            for user in user_model.objects.filter(**{
+                '%s__in' % user_model.USERNAME_FIELD: usernames})}
+
+    def _get_user_pk(self, users, username):
+        if not username:
+            return None
+        user_pk = users.get(username, None)
+        if user_pk is None:
+            self.nb_unknown_users += 1
+        return user_pk
+
+    def import_batch(self, batch):
+        #pylint:disable=too-many-locals
+        now = timezone.now()
+        given = [record for record in batch if record.get('slug')]
+        for record in given:
+            if not is_valid_slug(record['slug']):
+                raise ValueError("invalid slug '%s'" % record['slug'])
+        # Records without a slug get one derived from their title.
+        derived = [record for record in batch if not record.get('slug')]
+        if self.on_conflict == 'skip':
+            taken = set(self.question_model.objects.filter(
+                slug__in=[record['slug'] for record in given]).values_list(
+                'slug', flat=True))
+            seen = set([])
+            kept = []
+            for record in batch:
+                if record.get('slug'):
+                    if record['slug'] in taken or record['slug'] in seen:
+                        self.nb_skipped += 1
+                        continue
+                    seen.add(record['slug'])
+                kept += [record]
+            batch = kept
+            if not batch:
+                return
+            for record, slug in zip(derived, allocate_slugs([
+                    get_slug_base(record['title'], model=self.question_model)
+                    for record in derived], reserved=seen)):
+                record['slug'] = slug
+        else:
+            for record, slug in zip(batch, allocate_slugs([
+                    record.get('slug') or get_slug_base(record['title'],
+                        model=self.question_model)
+                    for record in batch])):
+                record['slug'] = slug
+        users = self._get_users(batch)
+
+        questions = []
+        for record in batch:
+            votes = {}
+            for vote in record.get('votes', []):
+                user_pk = self._get_user_pk(users, vote['user'])
+                if user_pk is not None:
+                    votes[user_pk] = (Vote.UP_VOTE if int(vote['vote']) > 0
+                        else Vote.DOWN_VOTE)
+            followers = set([])
+            for username in record.get('followers', []):
+                user_pk = self._get_user_pk(users, username)
+                if user_pk is not None:
+                    followers.add(user_pk)
+            record['_votes'] = votes
+            record['_followers'] = followers
+            record['_created_at'] = _parse_datetime(
+                record.get('created_at'), now)
+            questions += [self.question_model(slug=record['slug'],
+                title=record['title'], text=record.get('text') or '',
+                referer=record.get('referer') or None,
+                user_id=self._get_user_pk(users, record.get('user')),
+                votes_score=sum(votes.values()),
+                nb_upvotes=len([vote for vote in votes.values()
+                    if vote == Vote.UP_VOTE]),
+                nb_downvotes=len([vote for vote in votes.values()
+                    if vote == Vote.DOWN_VOTE]),
+                nb_followers=len(followers))]
+
+        with transaction.atomic():
+            self.question_model.objects.bulk_create(questions)
+            # Not all databases return the primary keys from bulk_create.
+            question_pks = dict(self.question_model.objects.filter(
+                slug__in=[record['slug'] for record in batch]).values_list(
+                'slug', 'pk'))
+            # `created_at` is overridden by `auto_now_add` on insert.
+            self.question_model.objects.filter(
+                pk__in=question_pks.values()).update(created_at=Case(
+                *[When(pk=question_pks[record['slug']],
+                    then=record['_created_at']) for record in batch],
+                output_field=DateTimeField()))
+            Vote.objects.bulk_create([Vote(question_id=question_pks[
+                record['slug']], user_id=user_pk, vote=vote)
+                for record in batch
+                for user_pk, vote in record['_votes'].items()])
+            Follow.objects.bulk_create([Follow(question_id=question_pks[
+                record['slug']], user_id=user_pk)
+                for record in batch for user_pk in record['_followers']])
+            self.answer_model.objects.bulk_create([
+                self._make_answer(question_pks[record['slug']], answer,
+                    users, record['_created_at'])
+                for record in batch for answer in record.get('answers', [])])
+            # Signals are not sent by bulk_create.
+            Answer.objects.create_missing(question_pks=question_pks.values())
+            update_nb_answers(self.question_model, question_pks.values())
+            # Only the buckets of the imported Questions are built,
+            # the activity history of other Questions is kept as is.
+            rebuild_question_rollups(list(question_pks.values()))
+            if self.reindex:
+                enqueue_index_updates(self.question_model.objects.filter(
+                    pk__in=question_pks.values()).only('pk'))
+        self.nb_imported += len(batch)
+
+    def _make_answer(self, question_pk, answer, users, default_date):
+        return self.answer_model(content_type=self.content_type,
+            object_pk=str(question_pk), site_id=self.site_id,
+            user_id=self._get_user_pk(users, answer.get('user')),
+            user_name=answer.get('user_name') or '',
+            user_email=answer.get('user_email') or '',
+            comment=answer.get('comment') or '',
+            submit_date=_parse_datetime(
+                answer.get('submit_date'), default_date),
+            is_public=answer.get('is_public', True),
+            is_removed=answer.get('is_removed', False))
+
+    def finalize(self):
+        """
+        Brings the search index and hot scores up to date with
+        the imported Questions.
+        """
+        if self.reindex:
+            while process_index_updates(batch_size=self.batch_size):
+                pass
+        decay_hot_scores(batch_size=self.batch_size)
+        bump_questions_version()
@@ -26,6 +26,7 @@ from django.conf.urls import include, url
 
 urlpatterns = [
     url(r'^api/', include('answers.urls.api')),
-    url(r'^', include('answers.urls.query')),
+    # 'ask/' would otherwise match the slug of a question.
     url(r'^', include('answers.urls.update')),
+    url(r'^', include('answers.urls.query')),
 ]
@@ -28,6 +28,32 @@ from .. import settings
 from .. import api
 
 urlpatterns = [
+    url(r'^$', api.QuestionListAPIView.as_view(), name='answers_api_list'),
+    url(r'^search/$',
+        api.QuestionSearchAPIView.as_view(), name='answers_api_search'),
+    url(r'^bulk/$', api.BulkActionAPIView.as_view(), name='answers_api_bulk'),
+    url(r'^activity/$',
+        api.ActivityAPIView.as_view(), name='answers_api_activity'),
+
+    url(r'^(?P<slug>%s)/activity/$' % settings.SLUG_RE,
+        api.QuestionActivityAPIView.as_view(),
+        name='answers_api_question_activity'),
+
+    url(r'^(?P<slug>%s)/answers/$' % settings.SLUG_RE,
+        api.AnswerListAPIView.as_view(), name='answers_api_answers'),
+    url(r'^(?P<slug>%s)/answers/(?P<answer>[0-9]+)/upvote/$'
+        % settings.SLUG_RE, api.AnswerUpvoteAPIView.as_view(),
+        name='answers_api_answer_upvote'),
+    url(r'^(?P<slug>%s)/answers/(?P<answer>[0-9]+)/downvote/$'
+        % settings.SLUG_RE, api.AnswerDownvoteAPIView.as_view(),
+        name='answers_api_answer_downvote'),
+    url(r'^(?P<slug>%s)/answers/(?P<answer>[0-9]+)/accept/$'
+        % settings.SLUG_RE, api.AcceptAnswerAPIView.as_view(),
+        name='answers_api_answer_accept'),
+    url(r'^(?P<slug>%s)/answers/(?P<answer>[0-9]+)/unaccept/$'
+        % settings.SLUG_RE, api.UnacceptAnswerAPIView.as_view(),
+        name='answers_api_answer_unaccept'),
+
     # Following
     url(r'^(?P<slug>%s)/follow/' % settings.SLUG_RE,
         api.FollowAPIView.as_view(), name='answers_api_follow'),
@@ -0,0 +1,55 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+URLs of the async API views (see `answers.async_views`), to be included
+by projects served through ASGI, for example under ``api/async/``.
+"""
+# `django.conf.urls.url` was removed in Django 4.0. Async views
+# require Django 3.1+ so `re_path` is always available here.
+from django.urls import re_path
+
+from .. import settings
+from .. import async_views
+
+urlpatterns = [
+    re_path(r'^search/$', async_views.AsyncQuestionSearchView.as_view(),
+        name='answers_async_api_search'),
+
+    # Following
+    re_path(r'^(?P<slug>%s)/follow/' % settings.SLUG_RE,
+        async_views.AsyncFollowView.as_view(),
+        name='answers_async_api_follow'),
+    re_path(r'^(?P<slug>%s)/unfollow/' % settings.SLUG_RE,
+        async_views.AsyncUnfollowView.as_view(),
+        name='answers_async_api_unfollow'),
+
+    # Votes
+    re_path(r'^(?P<slug>%s)/upvote/' % settings.SLUG_RE,
+        async_views.AsyncUpvoteView.as_view(),
+        name='answers_async_api_upvote'),
+    re_path(r'^(?P<slug>%s)/downvote/' % settings.SLUG_RE,
+        async_views.AsyncDownvoteView.as_view(),
+        name='answers_async_api_downvote'),
+]
@@ -0,0 +1,99 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from __future__ import unicode_literals
+
+import django_comments
+from django.conf import settings as django_settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import (BooleanField, CharField, Count, Exists,
+    IntegerField, OuterRef, SmallIntegerField, Subquery, Value)
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Follow, Vote
+
+
+def get_answer_model():
+    """
+    Returns the model used to store answers (i.e. comments) on a Question.
+    """
+    return django_comments.get_model()
+
+
+def get_answers(question_model, **kwargs):
+    """
+    Returns the answers visible on the site for questions of type
+    *question_model*, filtered by *kwargs*.
+
+    This mirrors the filters applied by the ``get_comment_list``
+    and ``get_comment_count`` template tags.
+    """
+    answer_model = get_answer_model()
+    queryset = answer_model.objects.filter(
+        content_type=ContentType.objects.get_for_model(question_model),
+        site__pk=django_settings.SITE_ID, **kwargs)
+    field_names = [field.name for field in answer_model._meta.fields]
+    if 'is_public' in field_names:
+        queryset = queryset.filter(is_public=True)
+    if (getattr(django_settings, 'COMMENTS_HIDE_REMOVED', True)
+        and 'is_removed' in field_names):
+        queryset = queryset.filter(is_removed=False)
+    return queryset
+
+
+def count_answers(question_model):
+    """
+    Returns an expression that counts the answers to the Question
+    in the outer query, to be used in annotations and updates.
+    """
+    answers = get_answers(question_model,
+        object_pk=Cast(OuterRef('pk'), CharField())).order_by().values(
+        'object_pk').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(answers, output_field=IntegerField()), 0)
+
+
+def update_nb_answers(question_model, question_pks):
+    """
+    Recounts the answers to *question_pks* in a single UPDATE.
+    """
+    question_model.objects.filter(pk__in=question_pks).update(
+        nb_answers=count_answers(question_model))
+
+
+def annotate_user_state(queryset, user):
+    """
+    Annotates each Question in *queryset* with whether *user* follows it
+    (``is_following``) and the vote *user* cast on it (``user_vote``,
+    ``None`` if *user* did not vote), such that the state is retrieved
+    in the same query.
+    """
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_following=Value(False, output_field=BooleanField()),
+            user_vote=Value(None, output_field=SmallIntegerField()))
+    return queryset.annotate(
+        is_following=Exists(Follow.objects.filter(
+            question=OuterRef('pk'), user=user)),
+        user_vote=Subquery(Vote.objects.filter(
+            question=OuterRef('pk'), user=user).values('vote')[:1],
+            output_field=SmallIntegerField()))
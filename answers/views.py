@@ -25,40 +25,131 @@
 import logging
 
 from django.contrib import messages
+from django.urls import reverse
 from django.utils.translation import ugettext as _
 from django.views.generic import (CreateView, ListView, TemplateView)
 from django.views.generic.detail import DetailView
-from haystack.query import SearchQuerySet
 
 from . import signals
-from .models import Follow, get_question_model
-from .mixins import QuestionMixin
+from .cache import (attach_question_versions, get_cache_context,
+    get_question_version)
+from .models import Follow, RelatedQuestion, get_question_model
+from .mixins import (AnswerListMixin, ConditionalGetMixin,
+    PrimaryDatabaseMixin, QuestionListMixin, QuestionMixin,
+    QuestionSearchMixin, ThrottleMixin)
 from .forms import QuestionCreateForm
+from .instrumentation import timed
+from .pagination import KeysetPage, KeysetPaginator
+from .utils import annotate_user_state
 
 LOGGER = logging.getLogger(__name__)
 
 
-class QuestionDetailView(QuestionMixin, DetailView):
+class QuestionDetailView(ConditionalGetMixin, AnswerListMixin, QuestionMixin,
+                         DetailView):
     """
     Generic view for a single Question.
+
+    The Question, its number of answers and the follow/vote state
+    of the request user are retrieved in a single query, unless
+    the client already has the latest version of the page.
+
+    Pages rendering the form to post an answer are never answered with
+    ``304 Not Modified`` since the form carries a timestamp and a security
+    hash that expire after ``COMMENTS_TIMEOUT``.
+
+    Only the first page of answers is rendered. The following pages
+    are loaded on demand through the answers API. Related questions
+    are precomputed (see `answers.related`). The Question is touched
+    when one of its related questions is renamed or deleted, such that
+    its ETag and cached sidebar do not go stale.
     """
 
     model = get_question_model()
+    answers_page_size = 25
+
+    def get_question_state(self):
+        """
+        Returns ``(pk, updated_at)`` for the Question, or ``None``.
+        """
+        if not hasattr(self, '_question_state'):
+            self._question_state = self.model.objects.filter(
+                slug=self.kwargs.get(self.slug_url_kwarg)).values_list(
+                'pk', 'updated_at').first()
+        return self._question_state
+
+    def renders_answer_form(self):
+        """
+        Returns `True` when the page contains the form to post an answer.
+        """
+        return self.request.user.is_authenticated
+
+    def get_etag_parts(self):
+        if self.renders_answer_form():
+            return None
+        state = self.get_question_state()
+        if state is None:
+            return None
+        return [state[0], state[1].isoformat()]
+
+    def get_last_modified(self, request, *args, **kwargs):
+        if self.renders_answer_form():
+            return None
+        state = self.get_question_state()
+        return state[1] if state is not None else None
+
+    def get_queryset(self):
+        return annotate_user_state(
+            super(QuestionDetailView, self).get_queryset().select_related(
+            'user'), self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super(QuestionDetailView, self).get_context_data(**kwargs)
+        context.update(get_cache_context())
+        context.update({
+            'question_version': get_question_version(self.object.pk),
+            'answer_page': KeysetPage(KeysetPaginator(
+                self.get_answers(self.object.pk), self.get_ordering(),
+                self.answers_page_size)),
+            # Only evaluated when the sidebar is not cached.
+            'related_questions': RelatedQuestion.objects.filter(
+                question=self.object).select_related('related').order_by(
+                '-score')
+        })
+        return context
 
 
-class QuestionListView(ListView):
+class QuestionListView(ConditionalGetMixin, QuestionListMixin, ListView):
     """
     Generic view of a list of Questions.
+
+    Questions are paginated with a keyset cursor (``?cursor=``) such that
+    a page costs a constant number of queries regardless of its position
+    in the list.
     """
 
     model = get_question_model()
+    context_object_name = 'question_list'
+    page_size = 25
 
     def get_context_data(self, **kwargs):
+        paginator = KeysetPaginator(
+            self.object_list, self.get_ordering(), self.page_size)
+        object_list, next_cursor = paginator.paginate(
+            self.request.GET.get('cursor'))
+        kwargs.update({'object_list': attach_question_versions(object_list)})
         context = super(QuestionListView, self).get_context_data(**kwargs)
+        context.update(get_cache_context())
+        context.update({
+            'ordering': self.get_ordering_name(),
+            'orderings': sorted(self.orderings.keys()),
+            'next_cursor': next_cursor
+        })
         return context
 
 
-class QuestionSearchView(TemplateView):
+class QuestionSearchView(ConditionalGetMixin, QuestionSearchMixin,
+                         TemplateView):
     """
     Search for Questions matching 'q'.
     """
@@ -66,34 +157,33 @@ class QuestionSearchView(TemplateView):
     model = get_question_model()
     template_name = 'answers/question_search.html'
 
+    @timed('answers.search.context')
     def get_context_data(self, **kwargs):
         context = super(QuestionSearchView, self).get_context_data(**kwargs)
-        query = self.request.GET.get('q', None)
+        query = self.get_search_query()
         results = None
         if query:
-            # XXX search broken until new release of haystack compatible with
-            # Django 1.6:
-            #   https://github.com/toastdriven/django-haystack/issues/908
-            results = SearchQuerySet().models(self.model).filter_or(
-                content=query)
-            if self.limit:
-                results = results[:int(self.limit)]
+            results = attach_question_versions(list(
+                self.get_queryset().order_by(*self.get_ordering())))
+        context.update(get_cache_context())
         context.update({'results': results, 'query': query})
         return context
 
 
-class QuestionCreateView(CreateView):
+class QuestionCreateView(ThrottleMixin, PrimaryDatabaseMixin,
+                         CreateView):
     """
     Create a new question.
     """
 
     model = get_question_model()
+    throttle_scope = 'ask'
     form_class = QuestionCreateForm
     template_name = 'answers/question_new.html'
     prefix = 'question'
 
     def form_valid(self, form):
-        if not self.request.user.is_authenticated():
+        if not self.request.user.is_authenticated:
             return self.form_invalid(form)
         result = super(QuestionCreateView, self).form_valid(form)
         messages.success(self.request, _("Thank you for your question !"))
@@ -103,9 +193,12 @@ class QuestionCreateView(CreateView):
         Follow.objects.subscribe(self.object, user=self.request.user)
         return result
 
+    def get_success_url(self):
+        return reverse('answers_detail', args=(self.object.slug,))
+
     def get_initial(self):
         kwargs = super(QuestionCreateView, self).get_initial()
         kwargs.update({'referer': self.request.GET.get("referer", None)})
-        if self.request.user.is_authenticated():
+        if self.request.user.is_authenticated:
             kwargs.update({'user': self.request.user})
         return kwargs
@@ -39,9 +39,13 @@ setup(
     author='DjaoDjin inc.',
     author_email='support@djaodjin.com',
     install_requires=requirements,
-    packages=['answers', 'answers.urls'],
+    # answers.async_views and answers.urls.async_api
+    extras_require={'async': ['Django>=3.1']},
+    packages=['answers', 'answers.backends', 'answers.management',
+        'answers.management.commands', 'answers.migrations', 'answers.urls'],
     package_data={'answers': ['static/css/*', 'static/js/*',
-        'templates/answers/*']},
+        'templates/answers/*', 'templates/answers/notifications/*',
+        'templates/search/indexes/answers/*']},
     url='https://github.com/djaodjin/djaodjin-answers/',
     download_url='https://github.com/djaodjin/djaodjin-answers/tarball/%s' \
         % __version__,
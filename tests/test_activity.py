@@ -0,0 +1,187 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Activity rollups maintained from votes, follows and new questions.
+"""
+from __future__ import unicode_literals
+
+import datetime
+import io
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_comments.models import Comment
+
+from answers.activity import get_activity
+from answers.models import ActivityRollup, Follow, Vote, get_question_model
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+DAY1 = datetime.datetime(2020, 3, 1, 10, 30, tzinfo=timezone.utc)
+DAY2 = datetime.datetime(2020, 3, 2, 23, 59, tzinfo=timezone.utc)
+
+
+class ActivityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [get_user_model().objects.create_user(username)
+            for username in ('alice', 'bob', 'carol')]
+
+    def at_time(self, at_time):
+        #pylint:disable=no-self-use
+        return mock.patch('django.utils.timezone.now', return_value=at_time)
+
+    def create_activity(self):
+        alice, bob, carol = self.users
+        with self.at_time(DAY1):
+            question = get_question_model().objects.create(
+                slug='water-use', title="How to reduce water usage?",
+                text="Any ideas?")
+            Vote.objects.vote_up(question, alice)
+            Vote.objects.vote_down(question, bob)
+            Follow.objects.subscribe(question, user=alice)
+        with self.at_time(DAY2):
+            Vote.objects.vote_up(question, carol)
+            Follow.objects.subscribe(question, user=bob)
+            Follow.objects.subscribe(question, user=carol)
+            Follow.objects.unsubscribe(question, user=carol)
+            other = get_question_model().objects.create(
+                slug='energy-use', title="How to reduce energy usage?",
+                text="Any ideas?")
+            Vote.objects.vote_down(other, alice)
+        return question, other
+
+    @staticmethod
+    def get_daily(question=None):
+        return [tuple([row['bucket'].day] + [row[field_name]
+            for field_name in ActivityRollup.COUNTERS])
+            for row in get_activity(ActivityRollup.DAILY,
+                DAY1 - datetime.timedelta(days=1),
+                DAY2 + datetime.timedelta(days=1), question=question)]
+
+    def assertDailyActivity(self, question, other):
+        #pylint:disable=invalid-name
+        # (day, votes_score, nb_upvotes, nb_downvotes, nb_followers,
+        #  nb_questions)
+        self.assertEqual(self.get_daily(question), [
+            (1, 0, 1, 1, 1, 1),
+            (2, 1, 1, 0, 1, 0)])
+        self.assertEqual(self.get_daily(other), [(2, -1, 0, 1, 0, 1)])
+        self.assertEqual(self.get_daily(), [
+            (1, 0, 1, 1, 1, 1),
+            (2, 0, 1, 1, 1, 1)])
+
+    def test_increment(self):
+        question, other = self.create_activity()
+        self.assertDailyActivity(question, other)
+        hourly = get_activity(ActivityRollup.HOURLY, DAY1.replace(minute=0),
+            DAY2, question=question)
+        self.assertEqual([row['bucket'] for row in hourly],
+            [DAY1.replace(minute=0), DAY2.replace(minute=0)])
+
+    def test_vote_flipped(self):
+        question, _ = self.create_activity()
+        with self.at_time(DAY2):
+            Vote.objects.vote_down(question, self.users[0])
+        self.assertEqual(self.get_daily(question)[1], (2, -1, 0, 1, 1, 0))
+
+    def test_answers_not_rolled_up(self):
+        question, other = self.create_activity()
+        with self.at_time(DAY2):
+            Comment.objects.create(content_object=question,
+                site=Site.objects.get_current(), user=self.users[1],
+                comment="Take shorter showers.")
+        question.refresh_from_db()
+        self.assertEqual(question.nb_answers, 1)
+        self.assertDailyActivity(question, other)
+
+    def test_rebuild(self):
+        question, other = self.create_activity()
+        ActivityRollup.objects.all().delete()
+        stdout = io.StringIO()
+        call_command('answers_rebuild_activity', batch_size=1, stdout=stdout)
+        # 3 hourly and 3 daily buckets.
+        self.assertEqual(stdout.getvalue(), "6 bucket(s) created.\n")
+        # Carol is no longer following and the votes are counted
+        # at the time they were cast.
+        self.assertEqual(self.get_daily(question), [
+            (1, 0, 1, 1, 1, 1),
+            (2, 1, 1, 0, 1, 0)])
+        self.assertEqual(self.get_daily(other), [(2, -1, 0, 1, 0, 1)])
+
+    def test_rebuild_drifted(self):
+        question, other = self.create_activity()
+        ActivityRollup.objects.filter(question=question).update(
+            votes_score=10)
+        call_command('answers_rebuild_activity', stdout=io.StringIO())
+        self.assertDailyActivity(question, other)
+
+    def test_api(self):
+        question, _ = self.create_activity()
+        response = self.client.get(reverse('answers_api_activity'), {
+            'start_at': '2020-03-01', 'ends_at': '2020-03-03'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['period'], 'daily')
+        self.assertEqual(parse_datetime(data['start_at']),
+            DAY1.replace(hour=0, minute=0))
+        self.assertEqual([(parse_datetime(row.pop('bucket')), row)
+            for row in data['results']], [(bucket, {'votes_score': 0,
+                'nb_upvotes': 1, 'nb_downvotes': 1, 'nb_followers': 1,
+                'nb_questions': 1}) for bucket in (
+                DAY1.replace(hour=0, minute=0),
+                DAY2.replace(hour=0, minute=0))])
+        response = self.client.get(reverse('answers_api_question_activity',
+            args=(question.slug,)), {'period': 'hourly',
+            'start_at': '2020-03-02T00:00:00', 'ends_at': '2020-03-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(parse_datetime(row['bucket']), row['votes_score'])
+            for row in response.json()['results']],
+            [(DAY2.replace(minute=0), 1)])
+
+    def test_api_invalid(self):
+        url = reverse('answers_api_activity')
+        self.assertEqual(self.client.get(url, {
+            'period': 'weekly'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {
+            'start_at': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'period': 'hourly',
+            'start_at': '2000-01-01', 'ends_at': '2020-01-01'}).status_code,
+            400)
+        # Without ends_at, the range runs to now.
+        response = self.client.get(url, {'start_at': '2017-01-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(),
+            ["cannot return more than 1000 buckets"])
@@ -0,0 +1,292 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Accepted answers and the recount of the denormalized counters.
+"""
+from __future__ import unicode_literals
+
+import datetime
+import io
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_comments.models import Comment
+
+from answers.cache import get_cache
+from answers.models import (Answer, AnswerVote, Follow, Vote,
+    get_question_model)
+from answers.pagination import KeysetPagination
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+class AnswerTestMixin(object):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = get_user_model().objects.create_user('alice')
+        cls.bob = get_user_model().objects.create_user('bob')
+        cls.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?", user=cls.alice)
+        site = Site.objects.get_current()
+        cls.answers = [Answer.objects.get(comment=Comment.objects.create(
+            content_object=cls.question, site=site, user=cls.bob,
+            comment=text)) for text in (
+            "Take shorter showers.", "Fix the leaks.")]
+
+    def setUp(self):
+        get_cache().clear()
+
+    def get_accepted(self):
+        return list(Answer.objects.filter(
+            question=self.question, is_accepted=True).values_list(
+            'pk', flat=True))
+
+
+class AcceptAnswerTests(AnswerTestMixin, TestCase):
+
+    def post(self, answer, action='accept'):
+        return self.client.post(reverse('answers_api_answer_%s' % action,
+            args=(self.question.slug, answer.comment_id)))
+
+    def test_accept(self):
+        self.client.force_login(self.alice)
+        response = self.post(self.answers[1])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_accepted'])
+        self.assertEqual(self.get_accepted(), [self.answers[1].pk])
+        # The accepted answer is listed first.
+        response = self.client.get(reverse('answers_api_answers',
+            args=(self.question.slug,)))
+        self.assertEqual([answer['is_accepted']
+            for answer in response.json()['results']], [True, False])
+        self.assertEqual(response.json()['results'][0]['comment'],
+            "Fix the leaks.")
+
+    def test_accept_exclusive(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.post(self.answers[0]).status_code, 200)
+        self.assertEqual(self.post(self.answers[1]).status_code, 200)
+        self.assertEqual(self.get_accepted(), [self.answers[1].pk])
+        # Accepting the same answer again is a no-op.
+        self.assertEqual(self.post(self.answers[1]).status_code, 200)
+        self.assertEqual(self.get_accepted(), [self.answers[1].pk])
+
+    def test_unaccept(self):
+        self.client.force_login(self.alice)
+        self.post(self.answers[0])
+        response = self.post(self.answers[0], action='unaccept')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['is_accepted'])
+        self.assertEqual(self.get_accepted(), [])
+        # Unaccepting an answer that is not accepted is a no-op.
+        self.assertEqual(
+            self.post(self.answers[1], action='unaccept').status_code, 200)
+        self.assertEqual(self.get_accepted(), [])
+
+    def test_not_author(self):
+        self.client.force_login(self.bob)
+        self.assertEqual(self.post(self.answers[0]).status_code, 403)
+        self.assertEqual(self.get_accepted(), [])
+        Answer.objects.accept(self.answers[0])
+        self.assertEqual(
+            self.post(self.answers[0], action='unaccept').status_code, 403)
+        self.assertEqual(self.get_accepted(), [self.answers[0].pk])
+
+    def test_anonymous(self):
+        self.assertEqual(self.post(self.answers[0]).status_code, 403)
+        self.assertEqual(self.get_accepted(), [])
+
+    def test_not_found(self):
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('answers_api_answer_accept',
+            args=(self.question.slug, self.answers[-1].comment_id + 1)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_touch_question(self):
+        updated_at = self.question.updated_at
+        Answer.objects.accept(self.answers[0])
+        self.question.refresh_from_db()
+        self.assertGreater(self.question.updated_at, updated_at)
+
+
+class AnswerThreadTests(TestCase):
+    """
+    Pages of answers fetched through the "More answers" button.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = get_user_model().objects.create_user('alice')
+        cls.bob = get_user_model().objects.create_user('bob')
+        cls.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?", user=cls.alice)
+        site = Site.objects.get_current()
+        submit_date = timezone.now()
+        cls.answers = []
+        # Ties on votes_score, and on submit_date within a score.
+        for idx, votes_score in enumerate((1, 3, 1, 0, 3, 1, 0)):
+            answer = Answer.objects.get(comment=Comment.objects.create(
+                content_object=cls.question, site=site, user=cls.bob,
+                comment="Answer %d" % idx))
+            Answer.objects.filter(pk=answer.pk).update(
+                votes_score=votes_score,
+                submit_date=submit_date + datetime.timedelta(
+                    minutes=idx % 2))
+            cls.answers += [answer]
+
+    def setUp(self):
+        get_cache().clear()
+        patcher = mock.patch.object(KeysetPagination, 'page_size', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_expected(self):
+        return [answer.comment_id for answer in sorted(
+            Answer.objects.filter(question=self.question),
+            key=lambda answer: (not answer.is_accepted, -answer.votes_score,
+                answer.submit_date, answer.pk))]
+
+    def get_page(self, url=None):
+        response = self.client.get(url or reverse('answers_api_answers',
+            args=(self.question.slug,)))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, url=None, between_pages=None):
+        results = []
+        while True:
+            page = self.get_page(url)
+            results += page['results']
+            url = page['next']
+            if not url:
+                break
+            if between_pages:
+                between_pages()
+                between_pages = None
+        return results
+
+    def post(self, answer, action='accept'):
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('answers_api_answer_%s' % action,
+            args=(self.question.slug, answer.comment_id)))
+        self.assertEqual(response.status_code, 200)
+        self.client.logout()
+
+    def assertResumed(self, results, first_page):
+        # The following pages resume the current order of the thread
+        # after the last answer of the first page.
+        expected = self.get_expected()
+        self.assertEqual([answer['id'] for answer in results],
+            first_page + expected[expected.index(first_page[-1]) + 1:])
+
+    def test_order(self):
+        Answer.objects.accept(self.answers[3])
+        expected = self.get_expected()
+        self.assertEqual(expected[0], self.answers[3].comment_id)
+        self.assertEqual([answer['id'] for answer in self.walk()], expected)
+
+    def test_accept_between_pages(self):
+        Answer.objects.accept(self.answers[0])
+        expected = self.get_expected()
+        newly_accepted = Answer.objects.get(comment_id=expected[-1])
+        results = self.walk(
+            between_pages=lambda: self.post(newly_accepted))
+        # The newly accepted answer moved before the cursor. It is not
+        # served again while the previously accepted one is, unpinned.
+        self.assertResumed(results, expected[:2])
+        self.assertNotIn(newly_accepted.comment_id,
+            [answer['id'] for answer in results])
+        self.assertEqual([answer['is_accepted'] for answer in results
+            if answer['id'] == self.answers[0].comment_id], [True, False])
+        # Reloading the thread pins the newly accepted answer first.
+        results = self.walk()
+        self.assertEqual([answer['id'] for answer in results],
+            self.get_expected())
+        self.assertEqual(results[0]['id'], newly_accepted.comment_id)
+        self.assertEqual([answer['is_accepted'] for answer in results],
+            [True] + [False] * (len(results) - 1))
+
+    def test_unaccept_between_pages(self):
+        pinned = self.answers[6]
+        Answer.objects.accept(pinned)
+        expected = self.get_expected()
+        self.assertEqual(expected[0], pinned.comment_id)
+        results = self.walk(
+            between_pages=lambda: self.post(pinned, action='unaccept'))
+        self.assertResumed(results, expected[:2])
+        # The unpinned answer sorts after the cursor and is served again,
+        # with its new state.
+        self.assertTrue(results[0]['is_accepted'])
+        self.assertEqual([answer['is_accepted'] for answer in results
+            if answer['id'] == pinned.comment_id], [True, False])
+        self.assertEqual([answer['id'] for answer in self.walk()],
+            self.get_expected())
+
+
+class RecountTests(AnswerTestMixin, TestCase):
+
+    def recount(self):
+        stdout = io.StringIO()
+        call_command('answers_recount', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_recount(self):
+        Vote.objects.vote_up(self.question, self.bob)
+        Follow.objects.subscribe(self.question, user=self.bob)
+        AnswerVote.objects.vote_down(self.answers[0], self.alice)
+        Answer.objects.accept(self.answers[0])
+        get_question_model().objects.update(votes_score=5, nb_upvotes=0,
+            nb_followers=3, nb_answers=0)
+        Answer.objects.update(votes_score=2, nb_downvotes=0)
+        self.assertEqual(self.recount(), "1 question(s) updated.\n"\
+            "0 answer(s) created, 2 answer(s) updated.\n")
+        self.question.refresh_from_db()
+        self.assertEqual((self.question.votes_score, self.question.nb_upvotes,
+            self.question.nb_downvotes, self.question.nb_followers,
+            self.question.nb_answers), (1, 1, 0, 1, 2))
+        self.assertEqual(list(Answer.objects.order_by('pk').values_list(
+            'votes_score', 'nb_upvotes', 'nb_downvotes', 'is_accepted')), [
+            (-1, 0, 1, True), (0, 0, 0, False)])
+        self.assertEqual(self.recount(), "0 question(s) updated.\n"\
+            "0 answer(s) created, 0 answer(s) updated.\n")
+
+    def test_create_missing(self):
+        Answer.objects.accept(self.answers[1])
+        Answer.objects.filter(pk=self.answers[0].pk).delete()
+        self.assertEqual(self.recount(), "0 question(s) updated.\n"\
+            "1 answer(s) created, 0 answer(s) updated.\n")
+        self.assertEqual(Answer.objects.filter(
+            question=self.question).count(), 2)
+        self.assertEqual(self.get_accepted(), [self.answers[1].pk])
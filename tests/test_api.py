@@ -0,0 +1,132 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Conditional GETs on the JSON API.
+"""
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django_comments.models import Comment
+
+from answers.cache import get_cache
+from answers.models import Answer, AnswerVote, get_question_model
+
+
+class AnswerListConditionalTests(TransactionTestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user('alice')
+        self.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+        Comment.objects.create(content_object=self.question,
+            site=Site.objects.get_current(), user=self.user,
+            comment="Take shorter showers.")
+        self.url = reverse('answers_api_answers', args=(self.question.slug,))
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response['ETag'])
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url,
+                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_cursor(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'cursor': 'WzEsIDFd'},
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response.status_code, 304)
+
+    def test_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        AnswerVote.objects.vote_up(Answer.objects.get(), user=self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['votes_score'], 1)
+
+    def test_not_found(self):
+        response = self.client.get(
+            reverse('answers_api_answers', args=('unknown',)))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class QuestionListAPITests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for idx in range(30):
+            get_question_model().objects.create(slug='question-%d' % idx,
+                title="Question %d" % idx, text="Text %d" % idx)
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('answers_api_list'),
+                {'fields': 'slug'})
+        self.assertEqual(response.status_code, 200)
+        for question in response.json()['results']:
+            self.assertEqual(list(question.keys()), ['slug'])
+        text_column = connection.ops.quote_name('text')
+        selects = [query['sql'] for query in queries.captured_queries
+            if 'answers_question' in query['sql']]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNotIn(text_column, sql)
+
+    def test_all_fields(self):
+        response = self.client.get(reverse('answers_api_list'))
+        self.assertEqual(response.json()['results'][0]['text'], "Text 29")
+
+    def test_walk_pages(self):
+        for ordering in ('newest', 'top', 'hot', 'answered'):
+            slugs = []
+            url = '%s?ordering=%s&fields=slug' % (
+                reverse('answers_api_list'), ordering)
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                slugs += [question['slug']
+                    for question in response.json()['results']]
+                url = response.json()['next']
+            self.assertEqual(len(slugs), 30, ordering)
+            self.assertEqual(len(set(slugs)), 30, ordering)
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'WzEsIDFd'):
+            response = self.client.get(reverse('answers_api_list'),
+                {'ordering': 'top', 'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'cursor': ["Invalid cursor"]})
@@ -0,0 +1,183 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Async variants of the follow, vote and search API views.
+"""
+from __future__ import unicode_literals
+
+import asyncio
+import base64
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipIf
+
+import django
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TransactionTestCase, override_settings
+
+from answers import settings
+from answers.cache import get_cache
+from answers.models import Follow, Vote, get_question_model
+from answers.routers import PIN_COOKIE_NAME
+
+if django.VERSION >= (3, 1):
+    from django.test import AsyncClient
+    from answers import async_views
+
+
+@skipIf(django.VERSION < (3, 1), "async views require Django 3.1+")
+@override_settings(
+    DATABASE_ROUTERS=['answers.routers.ReplicaRouter'],
+    MIDDLEWARE=list(django_settings.MIDDLEWARE) + [
+        'answers.routers.ReplicaPinningMiddleware'])
+class AsyncViewsTests(TransactionTestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'alice', password='alice')
+        self.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="How much water should I drink?")
+        # SQLite does not support concurrent writes.
+        patcher = mock.patch.object(async_views, 'EXECUTOR',
+            ThreadPoolExecutor(max_workers=1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.login(username='alice', password='alice')
+        self.async_client = AsyncClient()
+        self.async_client.cookies = self.client.cookies
+
+    def post(self, action, slug=None):
+        return asyncio.run(self.async_client.post('/api/async/%s/%s/' % (
+            slug or self.question.slug, action)))
+
+    def test_follow(self):
+        response = self.post('follow')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {
+            'slug': self.question.slug, 'title': self.question.title})
+        self.assertTrue(Follow.objects.filter(
+            user=self.user, question=self.question).exists())
+        self.assertEqual(self.post('unfollow').status_code, 201)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.nb_followers, 0)
+
+    def test_vote(self):
+        self.assertEqual(self.post('upvote').status_code, 201)
+        self.assertEqual(self.post('downvote').status_code, 201)
+        self.assertEqual(Vote.objects.get().vote, Vote.DOWN_VOTE)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.votes_score, -1)
+
+    def test_pinned_after_write(self):
+        response = self.post('upvote')
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_not_found(self):
+        self.assertEqual(self.post('follow', slug='unknown').status_code, 404)
+
+    def test_anonymous(self):
+        response = asyncio.run(AsyncClient().post(
+            '/api/async/%s/follow/' % self.question.slug))
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_basic_authentication(self):
+        # Clients that do not rely on the session are not subject to CSRF.
+        client = AsyncClient(enforce_csrf_checks=True)
+        response = asyncio.run(client.post(
+            '/api/async/%s/follow/' % self.question.slug,
+            AUTHORIZATION='Basic %s' % base64.b64encode(
+            b'alice:alice').decode('ascii')))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Follow.objects.filter(
+            user=self.user, question=self.question).exists())
+
+    def test_session_csrf(self):
+        client = AsyncClient(enforce_csrf_checks=True)
+        client.cookies = self.client.cookies
+        response = asyncio.run(client.post(
+            '/api/async/%s/follow/' % self.question.slug))
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("CSRF", response.json()['detail'])
+        self.assertFalse(Follow.objects.exists())
+
+    def test_throttled(self):
+        with mock.patch.object(settings, 'THROTTLE_RATES', {'vote': '1/min'}):
+            self.assertEqual(self.post('upvote').status_code, 201)
+            response = self.post('upvote')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_search(self):
+        call_command('answers_update_index', rebuild=True,
+            stdout=io.StringIO())
+        response = asyncio.run(self.async_client.get(
+            '/api/async/search/?q=water&fields=slug'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            {'slug': self.question.slug}])
+
+    def test_search_invalid_cursor(self):
+        response = asyncio.run(self.async_client.get(
+            '/api/async/search/?q=water&cursor=garbage'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'cursor': ["Invalid cursor"]})
+
+    def test_missing_action(self):
+        view = async_views.AsyncQuestionActionView()
+        with self.assertRaises(ImproperlyConfigured):
+            view.perform(self.question, self.user)
+
+    @staticmethod
+    def get_wrapper_class():
+        return connections[DEFAULT_DB_ALIAS].__class__
+
+    def test_connections_kept(self):
+        # Tests run with CONN_MAX_AGE=0.
+        def query():
+            return get_question_model().objects.count()
+        with mock.patch.object(self.get_wrapper_class(), 'close') as close:
+            for _ in range(3):
+                self.assertEqual(
+                    asyncio.run(async_views.run_in_pool(query)), 1)
+            self.assertEqual(self.post('upvote').status_code, 201)
+        self.assertFalse(close.called)
+
+    def test_unusable_connection_closed(self):
+        def break_connection():
+            connection.ensure_connection()
+            connection.errors_occurred = True
+        asyncio.run(async_views.run_in_pool(break_connection))
+        with mock.patch.object(self.get_wrapper_class(), 'is_usable',
+                return_value=False):
+            with mock.patch.object(self.get_wrapper_class(), 'close') as close:
+                asyncio.run(async_views.run_in_pool(lambda: None))
+        self.assertEqual(close.call_count, 1)
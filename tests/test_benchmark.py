@@ -0,0 +1,86 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Latency of the answers endpoints, measured with pytest-benchmark
+against the data seeded by the ``answers_benchmark`` command.
+
+The benchmarks are deselected by default (see setup.cfg). Run them
+with ``python -m pytest -m benchmark tests/test_benchmark.py``. Results
+can be compared between runs with ``--benchmark-autosave``
+and ``--benchmark-compare``.
+"""
+from __future__ import unicode_literals
+
+import io
+import itertools
+
+import pytest
+from django.db import transaction
+from django.test import Client
+
+from answers import settings
+from answers.management.commands.answers_benchmark import Command, ENDPOINTS
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+NB_QUESTIONS = 200
+NB_USERS = 20
+
+
+@pytest.fixture(scope='module')
+def seeded(django_db_setup, django_db_blocker):
+    #pylint:disable=redefined-outer-name,unused-argument
+    command = Command(stdout=io.StringIO(), stderr=io.StringIO())
+    options = vars(command.create_parser('manage.py', 'answers_benchmark')
+        .parse_args(['--questions', str(NB_QUESTIONS),
+        '--users', str(NB_USERS)]))
+    with django_db_blocker.unblock():
+        # The seeded data is rolled back once the tests of the module ran.
+        with transaction.atomic():
+            command.seed(options)
+            yield command
+            transaction.set_rollback(True)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('endpoint', ENDPOINTS,
+    ids=[endpoint[0] for endpoint in ENDPOINTS])
+def test_endpoint(benchmark, monkeypatch, seeded, endpoint):
+    #pylint:disable=redefined-outer-name
+    # Each endpoint is requested more times than the budgets allow.
+    monkeypatch.setattr(settings, 'THROTTLE_RATES', {})
+    client = Client()
+    if endpoint[5]:
+        client.force_login(seeded.user)
+    counter = itertools.count()
+
+    def run():
+        method, url, payload = seeded.get_request(endpoint, next(counter))
+        return seeded.request(client, method, url, payload)
+
+    response = benchmark(run)
+    assert response.status_code < 400
@@ -0,0 +1,148 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Scoring and index updates of the BM25 search engine.
+"""
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from haystack import connections
+
+from answers.backends.bm25 import tokenize
+from answers.cache import get_cache
+from answers.models import IndexedDocument, IndexedPosting, get_question_model
+
+
+class BM25Tests(TestCase):
+
+    def setUp(self):
+        # Corpus statistics are cached.
+        get_cache().clear()
+        self.backend = connections['default'].get_backend()
+        self.index = connections['default'].get_unified_index().get_index(
+            get_question_model())
+        self.backend.clear()
+
+    def create(self, slug, text, title="Question"):
+        question = get_question_model().objects.create(
+            slug=slug, title=title, text=text)
+        self.backend.update(self.index, [question])
+        return question
+
+    def search(self, query):
+        return [result.pk
+            for result in self.backend.search(query)['results']]
+
+    def get_postings(self, question):
+        return dict(IndexedPosting.objects.filter(
+            object_pk=question.pk).values_list('term', 'frequency'))
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("How to save THE water, at home?"),
+            ['how', 'save', 'water', 'home'])
+        self.assertEqual(tokenize("x" * 65), [])
+
+    def test_postings(self):
+        question = self.create('water', "Water, water and soap.")
+        self.assertEqual(self.get_postings(question),
+            {'question': 1, 'water': 2, 'soap': 1})
+        self.assertEqual(IndexedDocument.objects.get(
+            object_pk=question.pk).length, 4)
+
+    def test_not_escaped(self):
+        question = self.create('soap', "Soap & \"water\" won't do.",
+            title="Tom's <b>tip</b>")
+        self.assertEqual(self.get_postings(question), {'tom': 1, 's': 1,
+            'b': 2, 'tip': 1, 'soap': 1, 'water': 1, 'won': 1, 't': 1,
+            'do': 1})
+
+    def test_term_frequency(self):
+        once = self.create('once', "water soap rinse dry")
+        twice = self.create('twice', "water water rinse dry")
+        self.create('other', "energy bill")
+        self.assertEqual(self.search('water'), [twice.pk, once.pk])
+
+    def test_document_length(self):
+        long_doc = self.create('long', "water " + "soap " * 20)
+        short_doc = self.create('short', "water soap")
+        self.create('other', "energy bill")
+        self.assertEqual(self.search('water'),
+            [short_doc.pk, long_doc.pk])
+
+    def test_idf(self):
+        # A rare term weighs more than a common one.
+        common = self.create('common', "water soap")
+        rare = self.create('rare', "water bucket")
+        other = self.create('other', "soap bar")
+        results = self.search('soap bucket')
+        self.assertEqual(results[0], rare.pk)
+        self.assertEqual(set(results[1:]), set([common.pk, other.pk]))
+
+    def test_scores(self):
+        self.create('water', "water")
+        self.create('other', "energy")
+        results = self.backend.search('water')
+        self.assertEqual(results['hits'], 1)
+        # idf = log(1 + (2 - 1 + 0.5) / (1 + 0.5)), tf = 1
+        # and length = 2 (with the title) = average length.
+        self.assertAlmostEqual(results['results'][0].score, 0.693147, 5)
+
+    def test_update(self):
+        question = self.create('water', "water soap")
+        question.text = "energy bill"
+        question.save()
+        self.backend.update(self.index, [question])
+        self.assertEqual(self.get_postings(question),
+            {'question': 1, 'energy': 1, 'bill': 1})
+        self.assertEqual(self.search('water'), [])
+        self.assertEqual(self.search('energy'), [question.pk])
+
+    def test_remove(self):
+        question = self.create('water', "water soap")
+        kept = self.create('other', "water bucket")
+        self.backend.remove(question)
+        self.assertEqual(self.get_postings(question), {})
+        self.assertFalse(IndexedDocument.objects.filter(
+            object_pk=question.pk).exists())
+        self.assertEqual(self.search('water'), [kept.pk])
+        self.backend.bulk_remove(['answers.question.%d' % kept.pk])
+        self.assertEqual(self.search('water'), [])
+        self.assertFalse(IndexedPosting.objects.exists())
+
+    def test_corpus_stats(self):
+        self.create('water', "water soap")
+        self.create('other', "energy")
+        self.assertEqual(self.backend.get_corpus_stats('answers.question'),
+            (2, 2.5))
+        # The statistics are invalidated when the index changes.
+        self.create('third', "bill")
+        self.assertEqual(self.backend.get_corpus_stats('answers.question'),
+            (3, 2.3333333333333335))
+
+    def test_no_terms(self):
+        self.create('water', "water soap")
+        self.assertEqual(self.backend.search('the and'),
+            {'results': [], 'hits': 0})
+        self.assertEqual(self.backend.search('*'), {'results': [], 'hits': 0})
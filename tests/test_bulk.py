@@ -0,0 +1,177 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Bulk follow, unfollow and vote actions.
+"""
+from __future__ import unicode_literals
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from answers.models import Follow, Vote, get_question_model
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+class BulkActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            'alice', password='alice')
+        cls.water = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+        cls.energy = get_question_model().objects.create(
+            slug='energy-use', title="How to reduce energy usage?",
+            text="Any ideas?")
+
+    def setUp(self):
+        self.client.login(username='alice', password='alice')
+
+    def post(self, items):
+        response = self.client.post(reverse('answers_api_bulk'),
+            json.dumps(items), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return [(item['slug'], item['action'], item['status'])
+            for item in response.json()]
+
+    def assertCounters(self, question, **counters):
+        #pylint:disable=invalid-name
+        question.refresh_from_db()
+        for field_name, value in counters.items():
+            self.assertEqual(getattr(question, field_name), value, field_name)
+
+    def test_applied(self):
+        self.assertEqual(self.post([
+            {'slug': 'water-use', 'action': 'follow'},
+            {'slug': 'water-use', 'action': 'upvote'},
+            {'slug': 'energy-use', 'action': 'downvote'}]), [
+            ('water-use', 'follow', 'applied'),
+            ('water-use', 'upvote', 'applied'),
+            ('energy-use', 'downvote', 'applied')])
+        self.assertCounters(self.water, nb_followers=1, votes_score=1,
+            nb_upvotes=1, nb_downvotes=0)
+        self.assertCounters(self.energy, nb_followers=0, votes_score=-1,
+            nb_upvotes=0, nb_downvotes=1)
+
+    def test_unchanged(self):
+        Follow.objects.subscribe(self.water, user=self.user)
+        Vote.objects.vote_up(self.water, user=self.user)
+        self.assertEqual(self.post([
+            {'slug': 'water-use', 'action': 'follow'},
+            {'slug': 'water-use', 'action': 'upvote'},
+            {'slug': 'energy-use', 'action': 'unfollow'}]), [
+            ('water-use', 'follow', 'unchanged'),
+            ('water-use', 'upvote', 'unchanged'),
+            ('energy-use', 'unfollow', 'unchanged')])
+        self.assertCounters(self.water, nb_followers=1, votes_score=1)
+        self.assertCounters(self.energy, nb_followers=0, votes_score=0)
+
+    def test_last_action_wins(self):
+        Follow.objects.subscribe(self.water, user=self.user)
+        Vote.objects.vote_up(self.water, user=self.user)
+        self.assertEqual(self.post([
+            {'slug': 'water-use', 'action': 'follow'},
+            {'slug': 'water-use', 'action': 'unfollow'},
+            {'slug': 'water-use', 'action': 'downvote'}]), [
+            ('water-use', 'follow', 'unchanged'),
+            ('water-use', 'unfollow', 'applied'),
+            ('water-use', 'downvote', 'applied')])
+        self.assertCounters(self.water, nb_followers=0, votes_score=-1,
+            nb_upvotes=0, nb_downvotes=1)
+
+    def test_not_found(self):
+        self.assertEqual(self.post([
+            {'slug': 'unknown', 'action': 'follow'},
+            {'slug': 'water-use', 'action': 'follow'}]), [
+            ('unknown', 'follow', 'not-found'),
+            ('water-use', 'follow', 'applied')])
+        self.assertCounters(self.water, nb_followers=1)
+
+    def test_invalid(self):
+        response = self.client.post(reverse('answers_api_bulk'),
+            json.dumps([{'slug': 'water-use', 'action': 'star'}]),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_anonymous(self):
+        self.client.logout()
+        response = self.client.post(reverse('answers_api_bulk'),
+            json.dumps([{'slug': 'water-use', 'action': 'follow'}]),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+
+class BulkFollowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('alice')
+        cls.questions = [get_question_model().objects.create(
+            slug='question-%d' % idx, title="Question %d" % idx, text="?")
+            for idx in range(3)]
+
+    def test_subscribe_retried(self):
+        # A concurrent request follows the first question and commits
+        # after the existing follows were read.
+        Follow.objects.subscribe(self.questions[0], user=self.user)
+        select_for_update = Follow.objects.select_for_update
+        reads = []
+
+        def racing_select_for_update():
+            reads.append(True)
+            if len(reads) == 1:
+                return Follow.objects.none()
+            return select_for_update()
+
+        with mock.patch.object(Follow.objects, 'select_for_update',
+                side_effect=racing_select_for_update):
+            with mock.patch.object(Follow.objects, 'bulk_create',
+                    wraps=Follow.objects.bulk_create) as bulk_create:
+                subscribed = Follow.objects.bulk_subscribe(
+                    self.questions, user=self.user)
+        self.assertEqual([len(call[0][0])
+            for call in bulk_create.call_args_list], [3, 2])
+        self.assertEqual(subscribed, set([question.pk
+            for question in self.questions[1:]]))
+        for question in self.questions:
+            question.refresh_from_db()
+            self.assertEqual(question.nb_followers, 1)
+
+    def test_unsubscribe(self):
+        Follow.objects.subscribe(self.questions[0], user=self.user)
+        self.assertEqual(Follow.objects.bulk_unsubscribe(
+            self.questions, user=self.user), set([self.questions[0].pk]))
+        self.assertEqual(Follow.objects.bulk_unsubscribe(
+            self.questions, user=self.user), set([]))
+        self.questions[0].refresh_from_db()
+        self.assertEqual(self.questions[0].nb_followers, 0)
@@ -0,0 +1,96 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Invalidation of the fragments cached for a Question.
+"""
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils.translation import get_language
+from django_comments.models import Comment
+
+from answers.cache import get_cache, get_question_version
+from answers.models import Vote, get_question_model
+
+
+class InvalidationTests(TransactionTestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user('alice')
+        self.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+
+    def assertBumpedOnCommit(self, func):
+        #pylint:disable=invalid-name
+        version = get_question_version(self.question.pk)
+        with transaction.atomic():
+            func()
+            self.assertEqual(
+                get_question_version(self.question.pk), version)
+        self.assertNotEqual(get_question_version(self.question.pk), version)
+
+    def test_answer(self):
+        updated_at = self.question.updated_at
+        self.assertBumpedOnCommit(lambda: Comment.objects.create(
+            content_object=self.question, site=Site.objects.get_current(),
+            user=self.user, comment="Take shorter showers."))
+        self.question.refresh_from_db()
+        self.assertGreater(self.question.updated_at, updated_at)
+        self.assertEqual(self.question.nb_answers, 1)
+
+    def test_question(self):
+        self.question.title = "How to use less water?"
+        self.assertBumpedOnCommit(self.question.save)
+
+    def test_vote(self):
+        self.assertBumpedOnCommit(
+            lambda: Vote.objects.vote_up(self.question, user=self.user))
+
+    def test_vote_deleted(self):
+        Vote.objects.vote_up(self.question, user=self.user)
+        self.assertBumpedOnCommit(self.user.delete)
+
+
+class FragmentKeyTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_language(self):
+        question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+        self.client.get(reverse('answers_detail', args=(question.slug,)))
+        version = get_question_version(question.pk)
+        for fragment_name in ('answers_detail', 'answers_sidebar'):
+            self.assertIsNotNone(get_cache().get(make_template_fragment_key(
+                fragment_name, [question.pk, version, get_language()])))
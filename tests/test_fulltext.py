@@ -0,0 +1,155 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Full-text search through the index of the database (FTS5 on SQLite,
+tsvector on PostgreSQL).
+"""
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.conf import settings as django_settings
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.models.signals import post_migrate
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from answers.backends import get_search_backend
+from answers.backends.fulltext import FullTextSearchBackend
+from answers.cache import get_cache
+from answers.models import get_question_model
+
+
+@override_settings(ANSWERS=dict(django_settings.ANSWERS,
+    SEARCH_BACKEND='answers.backends.fulltext.FullTextSearchBackend'))
+class FullTextSearchTests(TransactionTestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        # Created before the index such that it is indexed by `setup`.
+        self.create('water-use', "How to reduce water usage?",
+            "Any ideas to save water at home?")
+        post_migrate.send(sender=apps.get_app_config('answers'),
+            app_config=apps.get_app_config('answers'), verbosity=0,
+            interactive=False, using=DEFAULT_DB_ALIAS, apps=apps, plan=[])
+        self.addCleanup(self.drop_index)
+
+    @staticmethod
+    def drop_index():
+        # Other tests run with the BM25 engine.
+        table = get_question_model()._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("DROP TRIGGER %(table)s_search_vector_update"
+                    " ON %(table)s" % {'table': table})
+                cursor.execute("ALTER TABLE %(table)s"
+                    " DROP COLUMN search_vector" % {'table': table})
+            else:
+                for trigger in ('insert', 'delete', 'update'):
+                    cursor.execute("DROP TRIGGER %s_fts_%s" % (
+                        table, trigger))
+                cursor.execute("DROP TABLE %s_fts" % table)
+
+    @staticmethod
+    def create(slug, title, text):
+        return get_question_model().objects.create(
+            slug=slug, title=title, text=text)
+
+    @staticmethod
+    def search(query, limit=None):
+        return get_search_backend().search(
+            get_question_model(), query, limit=limit)
+
+    def get_slugs(self, query):
+        pks = [pk for pk, _, _ in self.search(query)]
+        slugs = dict(get_question_model().objects.filter(
+            pk__in=pks).values_list('pk', 'slug'))
+        return [slugs[pk] for pk in pks]
+
+    def test_backend(self):
+        self.assertIsInstance(get_search_backend(), FullTextSearchBackend)
+
+    def test_setup(self):
+        self.assertEqual(self.get_slugs('water'), ['water-use'])
+        # The setup is idempotent.
+        get_search_backend().setup(get_question_model())
+        self.assertEqual(self.get_slugs('water'), ['water-use'])
+
+    def test_create(self):
+        self.create('energy-use', "How to reduce energy usage?",
+            "Turn off the lights.")
+        self.assertEqual(self.get_slugs('lights'), ['energy-use'])
+        self.assertEqual(sorted(self.get_slugs('reduce')),
+            ['energy-use', 'water-use'])
+
+    def test_update(self):
+        question = get_question_model().objects.get(slug='water-use')
+        question.title = "How to reduce energy usage?"
+        question.text = "Turn off the lights."
+        question.save()
+        self.assertEqual(self.get_slugs('water'), [])
+        self.assertEqual(self.get_slugs('lights'), ['water-use'])
+
+    def test_delete(self):
+        get_question_model().objects.filter(slug='water-use').delete()
+        self.assertEqual(self.get_slugs('water'), [])
+
+    def test_ranking(self):
+        self.create('water-bill', "Water bill", "Water water water.")
+        self.create('energy-use', "How to reduce energy usage?",
+            "Is a cold water wash enough to save energy and other"
+            " resources in a typical household appliance?")
+        self.assertEqual(self.get_slugs('water'),
+            ['water-bill', 'water-use', 'energy-use'])
+        scores = [score for _, score, _ in self.search('water')]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(len(self.search('water', limit=2)), 2)
+
+    def test_snippet(self):
+        self.create('markup', "Markup", "Is <b>water</b> & soap enough?")
+        results = dict((pk, snippet)
+            for pk, _, snippet in self.search('soap'))
+        snippet = results[get_question_model().objects.get(slug='markup').pk]
+        self.assertIn('<b>soap</b>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+        self.assertIn('&amp;', snippet)
+
+    def test_malformed(self):
+        # Operators of the query syntax are searched as plain terms.
+        self.assertEqual(self.get_slugs('water "at'), ['water-use'])
+        self.assertEqual(self.get_slugs('(water'), ['water-use'])
+        self.assertEqual(self.get_slugs('water*'), ['water-use'])
+        self.assertEqual(self.get_slugs('title:water'), [])
+        self.assertEqual(self.get_slugs('"*'), [])
+        # 'or' is a stop word on PostgreSQL but not on SQLite.
+        self.assertIn(self.get_slugs('water "OR'), ([], ['water-use']))
+
+    def test_search_view(self):
+        response = self.client.get(reverse('answers_search'),
+            {'q': 'water "at'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([question.slug
+            for question in response.context['results']], ['water-use'])
+        if connection.vendor == 'sqlite':
+            self.assertContains(response, '<b>water</b>')
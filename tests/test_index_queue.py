@@ -0,0 +1,164 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Queued updates of the search index (see `answers.backends.queue`).
+"""
+from __future__ import unicode_literals
+
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from haystack import connection_router, connections
+
+from answers.backends.bm25 import BM25SearchBackend
+from answers.backends.queue import QueuedSignalProcessor
+from answers.models import (IndexedDocument, IndexedPosting,
+    PendingIndexUpdate, get_question_model)
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+class QueuedSignalProcessorTests(TestCase):
+
+    def setUp(self):
+        # The tests settings use haystack's default, no-op, processor.
+        processor = QueuedSignalProcessor(connections, connection_router)
+        self.addCleanup(processor.teardown)
+
+    @staticmethod
+    def create(slug='water-use', title="How to reduce water usage?"):
+        return get_question_model().objects.create(
+            slug=slug, title=title, text="Any ideas?")
+
+    @staticmethod
+    def get_pending():
+        return list(PendingIndexUpdate.objects.order_by('pk').values_list(
+            'identifier', 'removed', 'using'))
+
+    @staticmethod
+    def update_index(*args, **kwargs):
+        stdout = io.StringIO()
+        call_command('answers_update_index', *args, stdout=stdout, **kwargs)
+        return stdout.getvalue()
+
+    @staticmethod
+    def get_indexed_terms(question):
+        return set(IndexedPosting.objects.filter(
+            object_pk=question.pk).values_list('term', flat=True))
+
+    def test_save(self):
+        question = self.create()
+        # Models without a search index are not queued.
+        get_user_model().objects.create_user('alice')
+        identifier = 'answers.question.%d' % question.pk
+        self.assertEqual(self.get_pending(), [(identifier, False, 'default')])
+        # The search index is not updated in the request.
+        self.assertFalse(IndexedDocument.objects.exists())
+        self.assertEqual(self.update_index(),
+            "1 pending update(s) processed.\n")
+        self.assertEqual(self.get_pending(), [])
+        self.assertEqual(self.get_indexed_terms(question),
+            set(['how', 'reduce', 'water', 'usage', 'any', 'ideas']))
+        # Nothing left to process.
+        self.assertEqual(self.update_index(), "")
+
+    def test_merge(self):
+        question = self.create()
+        question.title = "How to reduce energy usage?"
+        question.save()
+        question.title = "How to reduce waste?"
+        question.save()
+        self.assertEqual(len(self.get_pending()), 3)
+        with mock.patch.object(BM25SearchBackend, 'update',
+                autospec=True) as update:
+            self.assertEqual(self.update_index(),
+                "3 pending update(s) processed.\n")
+        # The backend is called once with the question.
+        self.assertEqual(update.call_count, 1)
+        self.assertEqual(list(update.call_args[0][2]), [question])
+        self.update_index()
+        self.assertFalse(PendingIndexUpdate.objects.exists())
+
+    def test_delete(self):
+        question = self.create()
+        self.update_index()
+        pk = question.pk
+        question.delete()
+        self.assertEqual(self.get_pending(),
+            [('answers.question.%d' % pk, True, 'default')])
+        self.assertEqual(self.update_index(),
+            "1 pending update(s) processed.\n")
+        self.assertFalse(IndexedDocument.objects.filter(object_pk=pk).exists())
+        self.assertFalse(IndexedPosting.objects.filter(object_pk=pk).exists())
+
+    def test_save_then_delete(self):
+        question = self.create()
+        question.delete()
+        with mock.patch.object(BM25SearchBackend, 'update',
+                autospec=True) as update:
+            self.assertEqual(self.update_index(),
+                "2 pending update(s) processed.\n")
+        self.assertFalse(update.called)
+        self.assertFalse(IndexedDocument.objects.exists())
+
+    def test_deleted_before_processing(self):
+        # The entry is an update but the question no longer exists.
+        question = self.create()
+        self.update_index()
+        question.title = "How to reduce energy usage?"
+        question.save()
+        get_question_model().objects.filter(pk=question.pk).delete()
+        self.update_index()
+        self.assertFalse(IndexedDocument.objects.exists())
+
+    def test_batch_size(self):
+        questions = [self.create(slug='question-%d' % idx)
+            for idx in range(5)]
+        batches = []
+        update = BM25SearchBackend.update
+
+        def record_batch(backend, index, iterable, commit=True):
+            batches.append(len(iterable))
+            return update(backend, index, iterable, commit=commit)
+
+        with mock.patch.object(BM25SearchBackend, 'update', record_batch):
+            self.assertEqual(self.update_index(batch_size=2),
+                "5 pending update(s) processed.\n")
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertEqual(set(IndexedDocument.objects.values_list(
+            'object_pk', flat=True)), set([question.pk
+            for question in questions]))
+
+    def test_rebuild(self):
+        self.create()
+        self.create(slug='energy-use', title="How to reduce energy usage?")
+        self.assertEqual(self.update_index(rebuild=True),
+            "2 object(s) indexed.\n")
+        self.assertEqual(IndexedDocument.objects.count(), 2)
@@ -0,0 +1,218 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Timers, counters, sinks and the metrics endpoint.
+"""
+from __future__ import unicode_literals
+
+import logging
+import socket
+
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from answers import instrumentation, settings
+from answers.instrumentation import (LoggingSink, PrometheusSink, StatsdSink,
+    increment, timed)
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+def allow_all(request):
+    #pylint:disable=unused-argument
+    return True
+
+
+class SinkTestMixin(object):
+
+    sink_path = 'answers.instrumentation.PrometheusSink'
+
+    def setUp(self):
+        super(SinkTestMixin, self).setUp()
+        for patcher in (
+                mock.patch.object(settings, 'METRICS_SINK', self.sink_path),
+                mock.patch.object(settings, 'METRICS_OPTIONS', {}),
+                mock.patch.object(instrumentation, '_SINK', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.sink = instrumentation.get_sink()
+
+
+class DisabledTests(TestCase):
+
+    def test_noop(self):
+        def func():
+            return 1
+        self.assertIs(timed('answers.test')(func), func)
+        increment('answers.test')
+        self.assertIsNone(instrumentation.get_sink())
+
+
+class TimedTests(SinkTestMixin, TestCase):
+
+    def test_timed(self):
+        @timed('answers.test')
+        def func(value):
+            return value + 1
+        self.assertEqual(func(1), 2)
+        self.assertEqual(func(2), 3)
+        count, total = self.sink.timings[('answers_test', ())]
+        self.assertEqual(count, 2)
+        self.assertGreaterEqual(total, 0)
+
+    def test_timed_exception(self):
+        @timed('answers.test')
+        def func():
+            raise ValueError()
+        with self.assertRaises(ValueError):
+            func()
+        self.assertEqual(self.sink.timings[('answers_test', ())][0], 1)
+
+    def test_increment(self):
+        increment('answers.test')
+        increment('answers.test', 2)
+        increment('answers.test', tags={'view': 'list'})
+        self.assertEqual(self.sink.counters, {
+            ('answers_test', ()): 3,
+            ('answers_test', (('view', 'list'),)): 1})
+        self.assertEqual(self.sink.render().splitlines(), [
+            'answers_test_total 3',
+            'answers_test_total{view="list"} 1'])
+
+
+class SinkTests(TestCase):
+
+    def test_logging(self):
+        sink = LoggingSink()
+        with self.assertLogs('answers.instrumentation', level='INFO') as logs:
+            sink.increment('answers.test', 2, tags={'view': 'list'})
+            sink.timing('answers.test', 1.5)
+        self.assertEqual(logs.output, [
+            'INFO:answers.instrumentation:answers.test 2 view=list',
+            'INFO:answers.instrumentation:answers.test 1.500ms'])
+
+    def test_logging_level(self):
+        with self.assertLogs('answers.instrumentation', level='DEBUG') as logs:
+            LoggingSink(level=logging.DEBUG).increment('answers.test', 1)
+        self.assertEqual(logs.records[0].levelno, logging.DEBUG)
+
+    def test_statsd(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        sink = StatsdSink(host='127.0.0.1', port=server.getsockname()[1],
+            prefix='qa.')
+        self.addCleanup(sink.socket.close)
+        sink.increment('answers.test', 2, tags={'view': 'list'})
+        self.assertEqual(server.recv(1024), b'qa.answers.test.list:2|c')
+        sink.timing('answers.test', 1.5)
+        self.assertEqual(server.recv(1024), b'qa.answers.test:1.500|ms')
+
+    def test_statsd_unreachable(self):
+        sink = StatsdSink(host='127.0.0.1', port=9)
+        sink.socket.close()
+        sink.socket = mock.Mock(sendto=mock.Mock(side_effect=OSError))
+        # Metrics are best-effort.
+        sink.increment('answers.test', 1)
+        self.assertEqual(sink.socket.sendto.call_count, 1)
+
+    def test_prometheus_timing(self):
+        sink = PrometheusSink()
+        sink.timing('answers.test', 1.5, tags={'view': 'list'})
+        sink.timing('answers.test', 2, tags={'view': 'list'})
+        self.assertEqual(sink.render().splitlines(), [
+            'answers_test_ms_count{view="list"} 2',
+            'answers_test_ms_sum{view="list"} 3.500'])
+
+
+@override_settings(MIDDLEWARE=[
+    'answers.instrumentation.MetricsMiddleware'] + list(
+    django_settings.MIDDLEWARE))
+class MetricsMiddlewareTests(SinkTestMixin, TestCase):
+
+    def test_request(self):
+        response = self.client.get(reverse('answers_list'))
+        self.assertEqual(response.status_code, 200)
+        tags = (('view', 'answers_list'),)
+        self.assertEqual(self.sink.timings[('answers_request', tags)][0], 1)
+        self.assertEqual(self.sink.timings[('answers_queries', tags)][0], 1)
+        self.assertGreater(self.sink.counters[('answers_queries', tags)], 0)
+
+    def test_other_views(self):
+        self.client.get(reverse('auth_login'))
+        self.assertEqual(self.sink.counters, {})
+        self.assertEqual(self.sink.timings, {})
+
+    def test_disabled(self):
+        with mock.patch.object(instrumentation, 'get_sink',
+                return_value=None):
+            response = self.client.get(reverse('answers_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sink.timings, {})
+
+
+class MetricsViewTests(SinkTestMixin, TestCase):
+
+    def setUp(self):
+        super(MetricsViewTests, self).setUp()
+        self.url = reverse('answers_metrics')
+        increment('answers.test')
+
+    def test_anonymous(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_not_staff(self):
+        self.client.force_login(get_user_model().objects.create_user('alice'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_staff(self):
+        self.client.force_login(get_user_model().objects.create_user(
+            'alice', is_staff=True))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'answers_test_total 1\n')
+
+    def test_permission(self):
+        with mock.patch.object(settings, 'METRICS_PERMISSION',
+                'tests.test_instrumentation.allow_all'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+
+class MetricsViewNotAggregatedTests(SinkTestMixin, TestCase):
+
+    sink_path = 'answers.instrumentation.LoggingSink'
+
+    def test_not_found(self):
+        self.client.force_login(get_user_model().objects.create_user(
+            'alice', is_staff=True))
+        self.assertEqual(
+            self.client.get(reverse('answers_metrics')).status_code, 404)
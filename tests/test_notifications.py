@@ -0,0 +1,226 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Notifications of new questions and answers, and their digests.
+"""
+from __future__ import unicode_literals
+
+import datetime, io
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_comments.models import Comment
+from django_comments.signals import comment_was_posted
+
+from answers import notifications, settings
+from answers.models import (Follow, NotificationPreference,
+    PendingNotification, get_question_model)
+from answers.notifications import ANSWER_NEW, notify, send_digests
+from answers.utils import get_answer_model
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+class NotificationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user_model = get_user_model()
+        cls.alice = user_model.objects.create_user(
+            'alice', email='alice@example.com')
+        cls.bob = user_model.objects.create_user(
+            'bob', email='bob@example.com')
+        cls.carol = user_model.objects.create_user(
+            'carol', email='carol@example.com')
+        cls.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+
+    def answer(self, user, comment):
+        answer = Comment.objects.create(content_object=self.question,
+            site=Site.objects.get_current(), user=user,
+            user_name=user.username, comment=comment)
+        notify(ANSWER_NEW, self.question.pk,
+            actor_pk=user.pk, answer_pk=answer.pk)
+        return answer
+
+
+class DigestTests(NotificationTestCase):
+
+    def setUp(self):
+        for user in (self.alice, self.bob, self.carol):
+            Follow.objects.subscribe(self.question, user)
+        NotificationPreference.objects.create(
+            user=self.bob, frequency=NotificationPreference.HOURLY)
+        NotificationPreference.objects.create(
+            user=self.carol, frequency=NotificationPreference.DAILY)
+
+    def test_immediate(self):
+        self.answer(self.alice, "Take shorter showers.")
+        self.assertEqual([message.to for message in mail.outbox], [])
+        self.answer(self.bob, "Fix leaks.")
+        self.assertEqual([message.to for message in mail.outbox],
+            [['alice@example.com']])
+        self.assertEqual(mail.outbox[0].subject,
+            'New answer to "How to reduce water usage?"')
+        self.assertIn("Fix leaks.", mail.outbox[0].body)
+        self.assertIn("https://example.com/water-use/", mail.outbox[0].body)
+        self.assertEqual(sorted(PendingNotification.objects.values_list(
+            'user__username', flat=True)), ['bob', 'carol', 'carol'])
+
+    def test_windows(self):
+        self.answer(self.alice, "Take shorter showers.")
+        self.answer(self.alice, "Fix leaks.")
+        now = timezone.now()
+        self.assertEqual(send_digests(at_time=now), 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+            ['bob@example.com', 'carol@example.com'])
+        self.assertFalse(PendingNotification.objects.exists())
+
+        # Within the window, events are held until the next digest.
+        mail.outbox = []
+        self.answer(self.alice, "Collect rain water.")
+        self.assertEqual(send_digests(
+            at_time=now + datetime.timedelta(minutes=30)), 0)
+        self.assertEqual(send_digests(
+            at_time=now + datetime.timedelta(hours=1)), 1)
+        self.assertEqual([message.to for message in mail.outbox],
+            [['bob@example.com']])
+        self.assertEqual(send_digests(
+            at_time=now + datetime.timedelta(days=1)), 1)
+        self.assertEqual([message.to for message in mail.outbox],
+            [['bob@example.com'], ['carol@example.com']])
+
+    def test_contents(self):
+        self.answer(self.alice, "Take shorter showers.")
+        self.answer(self.alice, "Fix leaks.")
+        send_digests()
+        message = [message for message in mail.outbox
+            if message.to == ['bob@example.com']][0]
+        self.assertEqual(message.subject, "2 updates since your last digest")
+        self.assertEqual(message.body.count(
+            'alice answered "How to reduce water usage?"'), 2)
+        self.assertIn("https://example.com/water-use/", message.body)
+
+    def test_deleted_answer(self):
+        self.answer(self.alice, "Take shorter showers.")
+        self.answer(self.alice, "Fix leaks.").delete()
+        send_digests()
+        self.assertEqual([message.subject for message in mail.outbox],
+            ["1 update since your last digest"] * 2)
+
+    def test_recorded_while_sending(self):
+        self.answer(self.alice, "Take shorter showers.")
+        deliver_digests = notifications.EmailNotificationBackend\
+            .deliver_digests
+        answered = []
+
+        def answer_then_deliver(backend, digests):
+            # Only on the first batch of digests (i.e. bob's).
+            if not answered:
+                answered.append(self.answer(self.alice, "Fix leaks."))
+            deliver_digests(backend, digests)
+
+        with mock.patch.object(notifications.EmailNotificationBackend,
+                'deliver_digests', autospec=True,
+                side_effect=answer_then_deliver):
+            self.assertEqual(send_digests(
+                at_time=timezone.now() + datetime.timedelta(days=1)), 2)
+        message = [message for message in mail.outbox
+            if message.to == ['bob@example.com']][0]
+        self.assertNotIn("Fix leaks.", message.body)
+        # The answer posted while bob's digest was sent is kept
+        # for the next one.
+        self.assertEqual(list(PendingNotification.objects.values_list(
+            'user__username', 'answer_pk')), [('bob', str(answered[0].pk))])
+
+    def test_command(self):
+        self.answer(self.alice, "Take shorter showers.")
+        out = io.StringIO()
+        call_command('answers_send_digests', stdout=out)
+        self.assertEqual(out.getvalue().strip(), "2 digest(s) sent.")
+        self.assertEqual(len(mail.outbox), 2)
+        out = io.StringIO()
+        call_command('answers_send_digests', stdout=out)
+        self.assertEqual(out.getvalue().strip(), "0 digest(s) sent.")
+
+
+class FanoutTests(NotificationTestCase):
+
+    def test_followers(self):
+        for user in (self.alice, self.bob, self.carol):
+            Follow.objects.subscribe(self.question, user)
+        self.answer(self.alice, "Take shorter showers.")
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+            ['bob@example.com', 'carol@example.com'])
+
+    def test_comment_posted(self):
+        Follow.objects.subscribe(self.question, self.bob)
+        answer = Comment.objects.create(content_object=self.question,
+            site=Site.objects.get_current(), user=self.alice,
+            user_name='alice', comment="Take shorter showers.")
+        comment_was_posted.send(sender=get_answer_model(),
+            comment=answer, request=None)
+        self.assertEqual([message.to for message in mail.outbox],
+            [['bob@example.com']])
+
+    def test_chunks(self):
+        for user in (self.alice, self.bob, self.carol):
+            Follow.objects.subscribe(self.question, user)
+        with mock.patch.object(settings, 'NOTIFICATION_BATCH_SIZE', 1):
+            with mock.patch('answers.notifications.deliver',
+                    wraps=notifications.deliver) as deliver:
+                notify(ANSWER_NEW, self.question.pk)
+        self.assertEqual(deliver.call_count, 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_staff(self):
+        user_model = get_user_model()
+        user_model.objects.create_user('dave',
+            email='dave@example.com', is_staff=True)
+        user_model.objects.create_user('erin',
+            email='erin@example.com', is_staff=True, is_active=False)
+        self.bob.is_staff = True
+        self.bob.save()
+        self.client.force_login(self.bob)
+        response = self.client.post(reverse('answers_new'), {
+            'question-title': "How to compost?",
+            'question-text': "In a flat."})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual([message.to for message in mail.outbox],
+            [['dave@example.com']])
+        self.assertEqual(mail.outbox[0].subject,
+            'New question "How to compost?"')
+        self.assertIn("bob asked", mail.outbox[0].body)
+        self.assertIn("https://example.com/how-to-compost/",
+            mail.outbox[0].body)
@@ -0,0 +1,141 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Rendering of the list of questions and of a question.
+"""
+
+from __future__ import unicode_literals
+
+import datetime
+
+from django.http import Http404
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from answers.cache import get_cache
+from answers.mixins import QuestionListMixin
+from answers.models import get_question_model
+from answers.pagination import KeysetPaginator, decode_cursor, encode_cursor
+
+
+class KeysetPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Few distinct values in every sort key such that pages break
+        # in the middle of ties.
+        created_at = timezone.now()
+        for idx in range(11):
+            question = get_question_model().objects.create(
+                slug='question-%d' % idx, title="Question %d" % idx,
+                text="?")
+            get_question_model().objects.filter(pk=question.pk).update(
+                created_at=created_at - datetime.timedelta(days=idx % 3),
+                votes_score=idx % 2, hot_score=float(idx % 4) / 2,
+                nb_answers=idx % 3)
+
+    def walk(self, ordering, page_size):
+        paginator = KeysetPaginator(
+            get_question_model().objects.all(), ordering, page_size)
+        pages = []
+        cursor = None
+        while True:
+            items, cursor = paginator.paginate(cursor)
+            pages += [[item.pk for item in items]]
+            if not cursor:
+                break
+        return pages
+
+    def test_orderings(self):
+        for name, ordering in QuestionListMixin.orderings.items():
+            expected = list(get_question_model().objects.order_by(
+                *ordering).values_list('pk', flat=True))
+            for page_size in (1, 2, 3, 4):
+                pages = self.walk(ordering, page_size)
+                self.assertEqual(sum(pages, []), expected,
+                    "%s, page_size=%d" % (name, page_size))
+                self.assertTrue(all(pages), "empty page in %s" % name)
+
+    def test_last_page(self):
+        paginator = KeysetPaginator(get_question_model().objects.all(),
+            QuestionListMixin.orderings['newest'], 11)
+        items, cursor = paginator.paginate()
+        self.assertEqual(len(items), 11)
+        self.assertIsNone(cursor)
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(get_question_model().objects.all(),
+            QuestionListMixin.orderings['top'], 3)
+        for cursor in ('not-base64!', encode_cursor([1, 2]),
+                encode_cursor(['a', 'b', 'c']), 'eyJhIjogMX0='):
+            with self.assertRaises(Http404):
+                paginator.paginate(cursor)
+
+    def test_cursor_round_trip(self):
+        now = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor([1, now, 'a'])),
+            [1, now.isoformat(), 'a'])
+
+
+class QuestionListPaginationTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        created_at = timezone.now()
+        for idx in range(30):
+            question = get_question_model().objects.create(
+                slug='question-%d' % idx, title="Question %d" % idx,
+                text="?")
+            get_question_model().objects.filter(pk=question.pk).update(
+                created_at=created_at - datetime.timedelta(days=idx % 2),
+                votes_score=idx % 3)
+
+    def test_walk_pages(self):
+        for ordering in QuestionListMixin.orderings:
+            slugs = []
+            params = {'ordering': ordering}
+            while True:
+                response = self.client.get(reverse('answers_list'), params)
+                self.assertEqual(response.status_code, 200)
+                slugs += [question.slug
+                    for question in response.context['question_list']]
+                next_cursor = response.context['next_cursor']
+                if not next_cursor:
+                    break
+                self.assertContains(response, 'cursor=%s' % next_cursor)
+                params = {'ordering': ordering, 'cursor': next_cursor}
+            self.assertEqual(len(slugs), 30, ordering)
+            self.assertEqual(len(set(slugs)), 30, ordering)
+        # The last page has no "More questions" link.
+        self.assertNotContains(response, 'cursor=')
+
+    def test_tampered_cursor(self):
+        response = self.client.get(reverse('answers_list'),
+            {'ordering': 'top', 'cursor': encode_cursor([1, 'x'])})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('answers_list'),
+            {'ordering': 'top', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,128 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Number of queries to render the list, detail and search pages.
+
+The number of queries must not depend on the number of questions,
+answers, votes or followers shown on a page.
+"""
+from __future__ import unicode_literals
+
+import io
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django_comments.models import Comment
+
+from answers.cache import get_cache
+from answers.models import Follow, Vote, get_question_model
+
+
+class PageQueriesTests(TestCase):
+
+    nb_questions = 30
+    nb_answers = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            'alice', password='alice')
+        voter = get_user_model().objects.create_user('bob')
+        site = Site.objects.get_current()
+        for idx in range(cls.nb_questions):
+            question = get_question_model().objects.create(
+                slug='question-%d' % idx, title="Water question %d" % idx,
+                text="How much water should I drink?", user=cls.user)
+            Vote.objects.vote_up(question, user=voter)
+            Follow.objects.subscribe(question, user=voter)
+            for _ in range(cls.nb_answers):
+                Comment.objects.create(content_object=question, site=site,
+                    user=voter, comment="Drink more water.")
+        cls.question = question
+        call_command('answers_update_index', rebuild=True, stdout=io.StringIO())
+
+    def setUp(self):
+        # Pages are built from cached fragments when available.
+        get_cache().clear()
+
+    def login(self):
+        self.client.login(username='alice', password='alice')
+        Vote.objects.vote_down(self.question, user=self.user)
+
+    def test_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('answers_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['question_list']), 25)
+
+    def test_list_authenticated(self):
+        self.login()
+        # session and user
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('answers_list'),
+                {'ordering': 'answered'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail(self):
+        url = reverse('answers_detail', args=(self.question.slug,))
+        # version, question, answers and related questions
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['answer_page'].object_list),
+            self.nb_answers)
+        self.assertEqual(response.context['votes_score'], 1)
+        self.assertEqual(response.context['nb_followers'], 1)
+
+    def test_detail_authenticated(self):
+        self.login()
+        url = reverse('answers_detail', args=(self.question.slug,))
+        # No version lookup since pages with the answer form are not
+        # answered with 304.
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['is_following'])
+        self.assertEqual(response.context['user_vote'], Vote.DOWN_VOTE)
+        self.assertEqual(response.context['votes_score'], 0)
+
+    def test_detail_not_modified(self):
+        url = reverse('answers_detail', args=(self.question.slug,))
+        response = self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url,
+                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_search(self):
+        # postings, documents and questions
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('answers_search'),
+                {'q': 'water'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['results']), 10)
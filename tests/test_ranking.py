@@ -0,0 +1,131 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Materialized "hot" ranking of Questions.
+"""
+from __future__ import unicode_literals
+
+import datetime
+import io
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_comments.models import Comment
+
+from answers import settings
+from answers.cache import get_cache, get_questions_version
+from answers.models import Vote, get_question_model
+from answers.ranking import decay_hot_scores, get_hot_score
+
+
+class HotScoreTests(TestCase):
+
+    def test_get_hot_score(self):
+        now = timezone.now()
+        self.assertAlmostEqual(get_hot_score(4, now, at_time=now),
+            4 / 2 ** settings.HOT_GRAVITY)
+        self.assertAlmostEqual(get_hot_score(4, now - datetime.timedelta(
+            hours=2), at_time=now), 4 / 4 ** settings.HOT_GRAVITY)
+        # Clocks may drift between the web and database servers.
+        self.assertAlmostEqual(get_hot_score(4, now + datetime.timedelta(
+            hours=1), at_time=now), 4 / 2 ** settings.HOT_GRAVITY)
+        self.assertEqual(get_hot_score(4, now - datetime.timedelta(
+            days=settings.HOT_HORIZON + 1), at_time=now), 0)
+
+
+class HotRankingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = get_user_model().objects.create_user('alice')
+        cls.bob = get_user_model().objects.create_user('bob')
+        question_model = get_question_model()
+        cls.now = timezone.now()
+        cls.fresh = question_model.objects.create(slug='fresh',
+            title="Fresh", text="?")
+        cls.older = question_model.objects.create(slug='older',
+            title="Older", text="?")
+        cls.stale = question_model.objects.create(slug='stale',
+            title="Stale", text="?")
+        for slug, age in (('fresh', datetime.timedelta(hours=1)),
+                          ('older', datetime.timedelta(days=2)),
+                          ('stale', datetime.timedelta(
+                              days=settings.HOT_HORIZON + 1))):
+            question_model.objects.filter(slug=slug).update(
+                created_at=cls.now - age)
+        # The older question has more points than the fresh one.
+        for question in (cls.older, cls.stale):
+            Vote.objects.vote_up(question, cls.alice)
+            Vote.objects.vote_up(question, cls.bob)
+        Vote.objects.vote_up(cls.fresh, cls.alice)
+
+    def setUp(self):
+        get_cache().clear()
+
+    def get_hot_slugs(self):
+        response = self.client.get(reverse('answers_api_list'),
+            {'ordering': 'hot', 'fields': 'slug'})
+        self.assertEqual(response.status_code, 200)
+        return [question['slug'] for question in response.data['results']]
+
+    def test_increments(self):
+        question = get_question_model().objects.create(slug='water-use',
+            title="How to reduce water usage?", text="Any ideas?")
+        Vote.objects.vote_up(question, self.alice)
+        question.refresh_from_db()
+        expected = get_hot_score(1, question.created_at)
+        self.assertAlmostEqual(question.hot_score, expected, places=3)
+        Comment.objects.create(content_object=question,
+            site=Site.objects.get_current(), user=self.bob,
+            comment="Take shorter showers.")
+        question.refresh_from_db()
+        self.assertAlmostEqual(question.hot_score, expected + get_hot_score(
+            settings.HOT_ANSWER_WEIGHT, question.created_at), places=3)
+
+    def test_decay(self):
+        # Votes were scored as if the questions had just been created.
+        self.assertEqual(self.get_hot_slugs()[-1], 'fresh')
+        self.assertEqual(decay_hot_scores(batch_size=1, at_time=self.now), 3)
+        scores = dict(get_question_model().objects.values_list(
+            'slug', 'hot_score'))
+        self.assertAlmostEqual(scores['fresh'],
+            1 / 3 ** settings.HOT_GRAVITY)
+        self.assertAlmostEqual(scores['older'],
+            2 / 50 ** settings.HOT_GRAVITY)
+        self.assertEqual(scores['stale'], 0)
+        self.assertEqual(self.get_hot_slugs(), ['fresh', 'older', 'stale'])
+        # Questions past the horizon are only reset once.
+        self.assertEqual(decay_hot_scores(at_time=self.now), 2)
+
+    def test_command(self):
+        version = get_questions_version()
+        out = io.StringIO()
+        call_command('answers_decay_hot', stdout=out)
+        self.assertEqual(out.getvalue().strip(), "3 question(s) updated.")
+        self.assertNotEqual(get_questions_version(), version)
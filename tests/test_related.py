@@ -0,0 +1,154 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Precomputed related Questions.
+"""
+from __future__ import unicode_literals
+
+import io
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from answers.cache import get_cache
+from answers.models import RelatedQuestion, Vote, get_question_model
+from answers.related import build_related
+
+try:
+    import numpy, scipy #pylint:disable=unused-import,multiple-imports
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+@unittest.skipIf(not HAS_NUMPY, "requires numpy and scipy")
+class RelatedTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        question_model = get_question_model()
+        self.water_use = question_model.objects.create(slug='water-use',
+            title="How to reduce water usage?",
+            text="Our water bill doubled this summer.")
+        self.water_bill = question_model.objects.create(slug='water-bill',
+            title="Why is my water bill so high?",
+            text="Water usage seems normal.")
+        self.compost = question_model.objects.create(slug='compost',
+            title="Composting in a flat?", text="Kitchen scraps.")
+
+    def get_related(self):
+        related = {}
+        for question, other in RelatedQuestion.objects.order_by(
+                'question', '-score').values_list(
+                'question__slug', 'related__slug'):
+            related.setdefault(question, []).append(other)
+        return related
+
+    def test_neighbours(self):
+        self.assertEqual(build_related(), 3)
+        self.assertEqual(self.get_related(), {
+            'water-use': ['water-bill'], 'water-bill': ['water-use']})
+        scores = RelatedQuestion.objects.values_list('score', flat=True)
+        self.assertAlmostEqual(scores[0], scores[1])
+        self.assertTrue(0 < scores[0] < 1)
+
+    def test_incremental(self):
+        build_related()
+        # Votes do not change the content of a Question.
+        Vote.objects.vote_up(self.compost,
+            get_user_model().objects.create_user('alice'))
+        self.assertEqual(build_related(), 0)
+
+        self.water_use.refresh_from_db()
+        self.water_bill.refresh_from_db()
+        self.compost.text = "Can I compost with grey water?"
+        self.compost.save()
+        # The compost question and the questions it is now related to.
+        self.assertEqual(build_related(), 3)
+        self.assertEqual(self.get_related()['compost'],
+            ['water-use', 'water-bill'])
+        self.assertEqual(self.get_related()['water-use'],
+            ['water-bill', 'compost'])
+        # Their sidebars changed.
+        for question in (self.water_use, self.water_bill):
+            self.assertGreater(get_question_model().objects.get(
+                pk=question.pk).updated_at, question.updated_at)
+        self.assertEqual(build_related(), 0)
+        self.assertEqual(build_related(rebuild=True), 3)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('answers_build_related', top_k=1, stdout=out)
+        self.assertEqual(out.getvalue().strip(), "3 question(s) refreshed.")
+        self.assertEqual(self.get_related(), {
+            'water-use': ['water-bill'], 'water-bill': ['water-use']})
+
+
+class ListingInvalidationTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        question_model = get_question_model()
+        self.water_use = question_model.objects.create(slug='water-use',
+            title="How to reduce water usage?", text="?")
+        self.water_bill = question_model.objects.create(slug='water-bill',
+            title="Why is my water bill so high?", text="?")
+        self.compost = question_model.objects.create(slug='compost',
+            title="Composting in a flat?", text="?")
+        RelatedQuestion.objects.create(question=self.water_use,
+            related=self.water_bill, score=0.5, computed_at=timezone.now())
+
+    def get_updated_at(self, question):
+        return get_question_model().objects.get(pk=question.pk).updated_at
+
+    def test_title_changed(self):
+        updated_at = self.get_updated_at(self.water_use)
+        self.water_bill.title = "Why is my water bill so high in summer?"
+        self.water_bill.save()
+        self.assertGreater(self.get_updated_at(self.water_use), updated_at)
+
+    def test_other_fields(self):
+        updated_at = self.get_updated_at(self.water_use)
+        self.water_bill.text = "Water usage seems normal."
+        self.water_bill.save(update_fields=['text'])
+        self.assertEqual(self.get_updated_at(self.water_use), updated_at)
+        self.water_bill.slug = 'water-bill-high'
+        self.water_bill.save(update_fields=['slug'])
+        self.assertGreater(self.get_updated_at(self.water_use), updated_at)
+
+    def test_not_listed(self):
+        updated_at = self.get_updated_at(self.water_bill)
+        self.water_use.title = "How to reduce water usage at home?"
+        self.water_use.save()
+        self.assertEqual(self.get_updated_at(self.water_bill), updated_at)
+
+    def test_deleted(self):
+        updated_at = self.get_updated_at(self.water_use)
+        self.water_bill.delete()
+        self.assertGreater(self.get_updated_at(self.water_use), updated_at)
+        self.assertFalse(RelatedQuestion.objects.exists())
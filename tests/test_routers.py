@@ -0,0 +1,152 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Routing of reads to ``ANSWERS['READ_DATABASE']`` in the sync views.
+"""
+from __future__ import unicode_literals
+
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.views.generic import View
+
+from answers import settings
+from answers.cache import get_cache
+from answers.mixins import PrimaryDatabaseMixin
+from answers.models import Vote, get_question_model
+from answers.routers import (PIN_COOKIE_NAME, ReplicaPinningMiddleware,
+    ReplicaRouter, primary)
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+@override_settings(
+    DATABASE_ROUTERS=['answers.routers.ReplicaRouter'],
+    MIDDLEWARE=list(django_settings.MIDDLEWARE) + [
+        'answers.routers.ReplicaPinningMiddleware'])
+class ReplicaRouterTests(TransactionTestCase):
+
+    databases = {DEFAULT_DB_ALIAS, 'replica'}
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'alice', password='alice')
+        self.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="How much water should I drink?")
+        patcher = mock.patch.object(settings, 'READ_DATABASE', 'replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upvote(self):
+        return self.client.post(
+            reverse('answers_api_upvote', args=(self.question.slug,)),
+            {'slug': self.question.slug, 'title': self.question.title})
+
+    def get_detail(self):
+        return self.client.get(
+            reverse('answers_detail', args=(self.question.slug,)))
+
+    @staticmethod
+    def request(func):
+        """
+        Returns the response of *func* and the number of queries
+        on the primary and replica databases.
+        """
+        primary_db = connections[DEFAULT_DB_ALIAS]
+        with CaptureQueriesContext(primary_db) as on_primary:
+            with CaptureQueriesContext(connections['replica']) as on_replica:
+                response = func()
+        # Sessions and users are not routed.
+        nb_primary = len([query for query in on_primary.captured_queries
+            if 'answers_' in query['sql']])
+        return response, nb_primary, len(on_replica.captured_queries)
+
+    def test_read(self):
+        response, nb_primary, nb_replica = self.request(self.get_detail)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(nb_primary, 0)
+        self.assertGreater(nb_replica, 0)
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_write(self):
+        self.client.login(username='alice', password='alice')
+        response, nb_primary, nb_replica = self.request(self.upvote)
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(nb_primary, 0)
+        self.assertEqual(nb_replica, 0)
+        self.assertEqual(Vote.objects.get().vote, Vote.UP_VOTE)
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE_NAME]['max-age'],
+            settings.REPLICA_PIN_SECONDS)
+
+    def test_pinned_after_write(self):
+        self.client.login(username='alice', password='alice')
+        self.upvote()
+        response, nb_primary, nb_replica = self.request(self.get_detail)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user_vote'], Vote.UP_VOTE)
+        self.assertGreater(nb_primary, 0)
+        self.assertEqual(nb_replica, 0)
+
+    def test_primary_view(self):
+        class ReadBackView(PrimaryDatabaseMixin, View):
+            def get(self, request, *args, **kwargs):
+                #pylint:disable=unused-argument
+                return HttpResponse(
+                    ReplicaRouter.db_for_read(get_question_model()))
+        request = RequestFactory().get('/')
+        response = ReplicaPinningMiddleware(ReadBackView.as_view())(request)
+        self.assertEqual(response.content.decode('utf-8'), DEFAULT_DB_ALIAS)
+
+    def test_primary(self):
+        request = RequestFactory().get('/')
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse())
+        middleware.process_request(request)
+        try:
+            model = get_question_model()
+            self.assertEqual(ReplicaRouter.db_for_read(model), 'replica')
+            with primary():
+                self.assertEqual(
+                    ReplicaRouter.db_for_read(model), DEFAULT_DB_ALIAS)
+                with primary():
+                    self.assertEqual(
+                        ReplicaRouter.db_for_read(model), DEFAULT_DB_ALIAS)
+                self.assertEqual(
+                    ReplicaRouter.db_for_read(model), DEFAULT_DB_ALIAS)
+            self.assertEqual(ReplicaRouter.db_for_read(model), 'replica')
+            # Models of other apps are not routed.
+            self.assertIsNone(ReplicaRouter.db_for_read(get_user_model()))
+        finally:
+            middleware.process_response(request, HttpResponse())
+        self.assertEqual(ReplicaRouter.db_for_read(model), DEFAULT_DB_ALIAS)
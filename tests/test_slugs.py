@@ -0,0 +1,138 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Allocation of unique slugs for Questions.
+"""
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import resolve, reverse
+
+from answers import slugs
+from answers.models import get_question_model
+from answers.slugs import (allocate_slug, allocate_slugs, get_reserved_slugs,
+    get_slug_base, is_valid_slug, save_with_unique_slug)
+from answers.views import QuestionCreateView, QuestionDetailView
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+class SlugBaseTests(TestCase):
+
+    def test_get_slug_base(self):
+        self.assertEqual(get_slug_base("How to reduce water usage?"),
+            'how-to-reduce-water-usage')
+        self.assertEqual(get_slug_base("snake_case -- title"),
+            'snake-case-title')
+        self.assertEqual(get_slug_base("???"), 'question')
+        self.assertTrue(is_valid_slug(get_slug_base("x" * 300)))
+        self.assertFalse(is_valid_slug('snake_case'))
+
+    def test_reserved_slugs(self):
+        self.assertEqual(get_reserved_slugs(),
+            frozenset(['api', 'ask', 'search']))
+        self.assertFalse(is_valid_slug('search'))
+        self.assertTrue(is_valid_slug('search-2'))
+
+
+class AllocateSlugTests(TestCase):
+
+    def create(self, *values):
+        for slug in values:
+            get_question_model().objects.create(
+                slug=slug, title=slug, text=slug)
+
+    def test_free(self):
+        self.create('water-use-2', 'water')
+        self.assertEqual(allocate_slug('water-use'), 'water-use')
+
+    def test_taken(self):
+        self.create('water', 'water-2', 'water-10', 'water-level')
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug('water'), 'water-11')
+
+    def test_base_free_with_suffixes(self):
+        self.create(*['q-%d' % idx for idx in range(1, 60)])
+        self.assertEqual(allocate_slug('q'), 'q')
+        self.assertEqual(allocate_slugs(['q', 'q']), ['q', 'q-60'])
+
+    def test_allocate_slugs(self):
+        self.create('water', 'water-2', 'energy')
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slugs(
+                ['water', 'energy', 'water', 'waste', 'waste']),
+                ['water-3', 'energy-2', 'water-4', 'waste', 'waste-2'])
+
+    def test_allocate_slugs_batches(self):
+        self.create('a', 'b', 'c')
+        bases = ['a', 'b', 'c', 'd', 'e']
+        with mock.patch.object(slugs, 'BATCH_SIZE', 2):
+            with self.assertNumQueries(3):
+                self.assertEqual(sorted(allocate_slugs(bases)),
+                    ['a-2', 'b-2', 'c-2', 'd', 'e'])
+
+    def test_allocate_slugs_collision(self):
+        # A generated suffix does not collide with a base in the list.
+        self.create('water')
+        self.assertEqual(allocate_slugs(['water-2', 'water']),
+            ['water-2', 'water-3'])
+
+    def test_reserved(self):
+        self.create('water')
+        self.assertEqual(allocate_slugs(['water', 'energy', 'waste'],
+            reserved=['energy', 'water-2']), ['water-3', 'energy-2', 'waste'])
+
+    def test_url_reserved(self):
+        self.assertEqual(allocate_slug('search'), 'search-2')
+        self.create('ask-2', 'ask-5')
+        self.assertEqual(allocate_slug('ask'), 'ask-6')
+        self.assertEqual(allocate_slugs(['api', 'search', 'api']),
+            ['api-2', 'search-2', 'api-3'])
+
+    def test_ask_reserved(self):
+        self.client.force_login(
+            get_user_model().objects.create_user('alice'))
+        response = self.client.post(reverse('answers_new'), {
+            'question-title': "Search", 'question-text': "?"})
+        self.assertRedirects(response, '/search-2/',
+            fetch_redirect_response=False)
+        response = self.client.get('/search-2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['question'].title, "Search")
+
+    def test_ask_resolves_to_create(self):
+        # `update` urls are included before the `<slug>/` catch-all.
+        self.assertIs(resolve('/ask/').func.view_class, QuestionCreateView)
+        self.assertIs(resolve('/ask-2/').func.view_class, QuestionDetailView)
+
+    def test_save_with_unique_slug(self):
+        self.create('water-use')
+        question = get_question_model()(title="Water use?", text="?")
+        save_with_unique_slug(question)
+        self.assertEqual(question.slug, 'water-use-2')
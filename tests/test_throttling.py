@@ -0,0 +1,158 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Rate limiting of the vote, follow, bulk and ask endpoints.
+"""
+from __future__ import unicode_literals
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from answers import settings
+from answers.cache import get_cache
+from answers.models import get_question_model
+from answers.throttling import check_rate, parse_rate
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+class ParseRateTests(TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_rate('30/min'), (30, 60))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
+        self.assertEqual(parse_rate('10/hour'), (10, 3600))
+        self.assertEqual(parse_rate('0/day'), (0, 86400))
+        self.assertIsNone(parse_rate(None))
+
+    def test_invalid(self):
+        for rate in ('30', '30/year', 'many/min', '30/'):
+            with self.assertRaises(ValueError):
+                parse_rate(rate)
+
+
+@mock.patch.object(settings, 'THROTTLE_RATES', {'vote': '2/min'})
+class CheckRateTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_current_window(self):
+        self.assertIsNone(check_rate('vote', 'user:1', at_time=60))
+        self.assertIsNone(check_rate('vote', 'user:1', at_time=60))
+        # The 2 requests weigh 1 once half of the sliding window moved
+        # past the window they were counted in.
+        self.assertEqual(check_rate('vote', 'user:1', at_time=60), 90)
+        self.assertEqual(check_rate('vote', 'user:1', at_time=149), 1)
+        self.assertIsNone(check_rate('vote', 'user:1', at_time=150))
+
+    def test_previous_window(self):
+        self.assertIsNone(check_rate('vote', 'user:1', at_time=0))
+        self.assertIsNone(check_rate('vote', 'user:1', at_time=0))
+        self.assertEqual(check_rate('vote', 'user:1', at_time=60), 30)
+        self.assertIsNone(check_rate('vote', 'user:1', at_time=90))
+
+    def test_rejected_not_counted(self):
+        check_rate('vote', 'user:1', at_time=0)
+        check_rate('vote', 'user:1', at_time=0)
+        for _ in range(5):
+            self.assertIsNotNone(check_rate('vote', 'user:1', at_time=59))
+        self.assertIsNone(check_rate('vote', 'user:1', at_time=120))
+
+    def test_per_ident(self):
+        check_rate('vote', 'user:1', at_time=0)
+        check_rate('vote', 'user:1', at_time=0)
+        self.assertIsNone(check_rate('vote', 'user:2', at_time=0))
+
+    def test_unknown_scope(self):
+        for _ in range(5):
+            self.assertIsNone(check_rate('follow', 'user:1', at_time=0))
+
+    def test_closed(self):
+        with mock.patch.object(settings, 'THROTTLE_RATES', {'vote': '0/min'}):
+            self.assertEqual(check_rate('vote', 'user:1', at_time=30), 60)
+
+
+@mock.patch.object(settings, 'THROTTLE_RATES', {
+    'ask': '1/hour', 'bulk': '1/min', 'follow': '1/min', 'vote': '1/min'})
+class ThrottledEndpointsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            'alice', password='alice')
+        cls.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?", user=cls.user)
+
+    def setUp(self):
+        get_cache().clear()
+        self.client.login(username='alice', password='alice')
+
+    def assertThrottled(self, post, status=200):
+        #pylint:disable=invalid-name
+        self.assertEqual(post().status_code, status)
+        response = post()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def post_json(self, url, data):
+        return self.client.post(url, json.dumps(data),
+            content_type='application/json')
+
+    def test_vote(self):
+        url = reverse('answers_api_upvote', args=(self.question.slug,))
+        self.assertThrottled(lambda: self.post_json(url, {
+            'slug': self.question.slug, 'title': self.question.title}), 201)
+
+    def test_follow(self):
+        url = reverse('answers_api_follow', args=(self.question.slug,))
+        self.assertThrottled(lambda: self.post_json(url, {
+            'slug': self.question.slug, 'title': self.question.title}), 201)
+
+    def test_bulk(self):
+        url = reverse('answers_api_bulk')
+        self.assertThrottled(lambda: self.post_json(url, [{
+            'slug': self.question.slug, 'action': 'follow'}]))
+
+    def test_ask(self):
+        url = reverse('answers_new')
+        self.assertThrottled(lambda: self.client.post(url, {
+            'question-title': "How to reduce energy usage?",
+            'question-text': "Any ideas?"}), 302)
+
+    def test_vote_closed(self):
+        with mock.patch.object(settings, 'THROTTLE_RATES', {'vote': '0/min'}):
+            response = self.post_json(
+                reverse('answers_api_upvote', args=(self.question.slug,)),
+                {'slug': self.question.slug, 'title': self.question.title})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
@@ -0,0 +1,163 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Export and import of Questions with their votes, followers and answers.
+"""
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase
+from django_comments.models import Comment
+
+from answers.models import Follow, Vote, get_question_model
+
+
+class TransferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user_model = get_user_model()
+        cls.alice = user_model.objects.create_user('alice')
+        cls.bob = user_model.objects.create_user('bob')
+        question_model = get_question_model()
+        question = question_model.objects.create(slug='water-use',
+            title="How to reduce water usage?", text="Any ideas?",
+            user=cls.alice, referer='https://example.com/')
+        Vote.objects.vote_up(question, cls.bob)
+        Vote.objects.vote_down(question, cls.alice)
+        Follow.objects.subscribe(question, cls.alice)
+        Follow.objects.subscribe(question, cls.bob)
+        Comment.objects.create(content_object=question,
+            site=Site.objects.get_current(), user=cls.bob, user_name='bob',
+            comment="Take shorter showers.")
+        Comment.objects.create(content_object=question,
+            site=Site.objects.get_current(), user_name='Guest',
+            comment="Collect rain water.", is_public=False)
+        question_model.objects.create(slug='compost',
+            title="How to compost?", text="In a flat.")
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def export(self, filename, *args):
+        path = os.path.join(self.tmpdir, filename)
+        call_command('answers_export', path, *args, stderr=io.StringIO())
+        with io.open(path, encoding='utf-8') as stream:
+            return stream.read()
+
+    def load(self, filename, *args):
+        out = io.StringIO()
+        call_command('answers_import', os.path.join(self.tmpdir, filename),
+            *args, stdout=out)
+        return out.getvalue().strip()
+
+    def write(self, filename, records):
+        with io.open(os.path.join(self.tmpdir, filename), 'w',
+                encoding='utf-8') as stream:
+            for record in records:
+                stream.write(json.dumps(record))
+                stream.write('\n')
+
+    @staticmethod
+    def clear():
+        get_question_model().objects.all().delete()
+        Comment.objects.all().delete()
+
+    def assertRoundTrip(self, filename):
+        #pylint:disable=invalid-name
+        exported = self.export(filename)
+        self.clear()
+        self.assertEqual(self.load(filename), "2 question(s) imported,"\
+            " 0 skipped, 0 reference(s) to unknown users.")
+        self.assertEqual(self.export('again-%s' % filename), exported)
+        question = get_question_model().objects.get(slug='water-use')
+        self.assertEqual((question.votes_score, question.nb_upvotes,
+            question.nb_downvotes, question.nb_followers, question.nb_answers),
+            (0, 1, 1, 2, 1))
+
+    def test_ndjson(self):
+        self.assertRoundTrip('questions.ndjson')
+        records = [json.loads(line) for line in self.export(
+            'questions.ndjson').splitlines()]
+        self.assertEqual([record['slug'] for record in records],
+            ['water-use', 'compost'])
+        self.assertEqual(records[0]['user'], 'alice')
+        self.assertEqual(records[0]['votes'], [{'user': 'bob', 'vote': 1},
+            {'user': 'alice', 'vote': -1}])
+        self.assertEqual(records[0]['followers'], ['alice', 'bob'])
+        self.assertEqual([(answer['user'], answer['comment'])
+            for answer in records[0]['answers']], [
+            ('bob', "Take shorter showers."), (None, "Collect rain water.")])
+
+    def test_csv(self):
+        self.assertRoundTrip('questions.csv')
+
+    def test_rename(self):
+        self.export('questions.ndjson')
+        self.assertEqual(self.load('questions.ndjson'), "2 question(s)"\
+            " imported, 0 skipped, 0 reference(s) to unknown users.")
+        self.assertEqual(sorted(get_question_model().objects.values_list(
+            'slug', flat=True)),
+            ['compost', 'compost-2', 'water-use', 'water-use-2'])
+        self.assertEqual(Vote.objects.filter(
+            question__slug='water-use-2').count(), 2)
+
+    def test_skip(self):
+        self.export('questions.ndjson')
+        get_question_model().objects.filter(slug='compost').delete()
+        self.assertEqual(self.load('questions.ndjson', '--on-conflict=skip'),
+            "1 question(s) imported, 1 skipped, 0 reference(s) to unknown"\
+            " users.")
+        self.assertEqual(sorted(get_question_model().objects.values_list(
+            'slug', flat=True)), ['compost', 'water-use'])
+        self.assertEqual(Vote.objects.count(), 2)
+
+    def test_derived_slugs(self):
+        self.write('questions.ndjson', [
+            {'title': "How to reduce water usage?", 'user': 'carol'},
+            {'title': "Solar panels?"},
+            {'title': "Solar panels?", 'slug': ''},
+            {'title': "Solar", 'slug': 'solar-panels'}])
+        self.assertEqual(self.load('questions.ndjson', '--on-conflict=skip'),
+            "4 question(s) imported, 0 skipped, 1 reference(s) to unknown"\
+            " users.")
+        # Derived slugs do not collide with the slugs given in the file.
+        self.assertEqual(dict(get_question_model().objects.values_list(
+            'slug', 'title')), {'compost': "How to compost?",
+            'water-use': "How to reduce water usage?",
+            'how-to-reduce-water-usage': "How to reduce water usage?",
+            'solar-panels': "Solar", 'solar-panels-2': "Solar panels?",
+            'solar-panels-3': "Solar panels?"})
@@ -0,0 +1,134 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Rendering of the list of questions and of a question.
+"""
+from __future__ import unicode_literals
+
+import re
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from django.urls import reverse
+
+from answers.cache import get_cache
+from answers.models import RelatedQuestion, Vote, get_question_model
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+class QuestionListTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_number_of_votes(self):
+        question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+        Vote.objects.vote_up(question,
+            user=get_user_model().objects.create_user('alice'))
+        for username in ('bob', 'carol'):
+            Vote.objects.vote_down(question,
+                user=get_user_model().objects.create_user(username))
+        response = self.client.get(reverse('answers_list'))
+        self.assertContains(response, "<li>3 votes</li>")
+        self.assertNotContains(response, "-1 vote")
+
+
+class QuestionDetailTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+        self.url = reverse('answers_detail', args=('water-use',))
+
+    @staticmethod
+    def get_timestamp(response):
+        return re.search(r'name="timestamp" value="([0-9]+)"',
+            response.content.decode('utf-8')).group(1)
+
+    def test_answer_form_refreshed(self):
+        self.client.force_login(get_user_model().objects.create_user('alice'))
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        timestamp = self.get_timestamp(response)
+        # The form expires after ``COMMENTS_TIMEOUT`` (2 hours).
+        later = time.time() + 3 * 3600
+        with mock.patch('time.time', return_value=later):
+            response = self.client.get(self.url,
+                HTTP_IF_NONE_MATCH='"%s"' % timestamp,
+                HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_timestamp(response), str(int(later)))
+
+    def test_anonymous_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'name="timestamp"')
+        response = self.client.get(self.url,
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class RelatedSidebarTests(TransactionTestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+        self.related = get_question_model().objects.create(
+            slug='water-bill', title="Why is my water bill so high?",
+            text="?")
+        RelatedQuestion.objects.create(question=question,
+            related=self.related, score=0.5, computed_at=timezone.now())
+        self.url = reverse('answers_detail', args=('water-use',))
+
+    def test_related_renamed(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, "Why is my water bill so high?")
+        etag = response['ETag']
+        self.related.title = "Why did my water bill double?"
+        self.related.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, "Why did my water bill double?")
+
+    def test_related_deleted(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.related.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "water-bill")
@@ -0,0 +1,171 @@
+# Copyright (c) 2020, DjaoDjin inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+# OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Votes on questions and answers.
+
+Votes go through `VoteManager._upsert_postgresql` on PostgreSQL
+and `VoteManager._upsert` on other databases.
+"""
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django_comments.models import Comment
+
+from answers.models import Answer, AnswerVote, Vote, get_question_model
+
+try:
+    from unittest import mock
+except ImportError: # python2
+    import mock
+
+
+def racing_select_for_update():
+    """
+    Returns a replacement for `QuerySet.select_for_update` whose first
+    read misses the votes, as if they were committed by a concurrent
+    request right after it.
+    """
+    select_for_update = QuerySet.select_for_update
+    reads = []
+
+    def wrapper(queryset, *args, **kwargs):
+        reads.append(True)
+        if len(reads) == 1:
+            return queryset.none()
+        return select_for_update(queryset, *args, **kwargs)
+    return wrapper
+
+
+class VoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = get_user_model().objects.create_user('alice')
+        cls.bob = get_user_model().objects.create_user('bob')
+        cls.question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+
+    def assertCounters(self, votes_score, nb_upvotes, nb_downvotes):
+        #pylint:disable=invalid-name
+        self.question.refresh_from_db()
+        self.assertEqual((self.question.votes_score, self.question.nb_upvotes,
+            self.question.nb_downvotes), (votes_score, nb_upvotes,
+            nb_downvotes))
+
+    def test_insert(self):
+        self.assertEqual(Vote.objects.vote_up(self.question, self.alice), 1)
+        self.assertEqual(Vote.objects.vote_down(self.question, self.bob), -1)
+        self.assertCounters(0, 1, 1)
+        self.assertEqual(Vote.objects.count(), 2)
+
+    def test_unchanged(self):
+        Vote.objects.vote_up(self.question, self.alice)
+        self.question.refresh_from_db()
+        updated_at = self.question.updated_at
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(
+                Vote.objects.vote_up(self.question, self.alice), 0)
+        self.assertFalse([query for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE'))])
+        self.assertCounters(1, 1, 0)
+        self.assertEqual(self.question.updated_at, updated_at)
+
+    def test_flip(self):
+        Vote.objects.vote_up(self.question, self.alice)
+        self.assertEqual(Vote.objects.vote_down(self.question, self.alice), -2)
+        self.assertCounters(-1, 0, 1)
+        self.assertEqual(Vote.objects.vote_up(self.question, self.alice), 2)
+        self.assertCounters(1, 1, 0)
+        self.assertEqual(Vote.objects.get().vote, Vote.UP_VOTE)
+
+    def test_retry(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest("votes are upserted in a single statement")
+        # A concurrent request records the same vote, and increments
+        # the counters, right after the previous vote was read.
+        Vote.objects.vote_down(self.question, self.alice)
+        with mock.patch.object(QuerySet, 'select_for_update',
+                racing_select_for_update()):
+            self.assertEqual(
+                Vote.objects.vote_up(self.question, self.alice), 2)
+        self.assertCounters(1, 1, 0)
+        self.assertEqual(Vote.objects.get().vote, Vote.UP_VOTE)
+
+    def test_bulk(self):
+        other = get_question_model().objects.create(
+            slug='energy-use', title="How to reduce energy usage?",
+            text="Any ideas?")
+        Vote.objects.vote_up(self.question, self.alice)
+        self.assertEqual(Vote.objects.bulk_vote({
+            self.question: Vote.DOWN_VOTE, other: Vote.UP_VOTE},
+            self.alice), {self.question.pk: -2, other.pk: 1})
+        self.assertEqual(Vote.objects.bulk_vote({
+            self.question: Vote.DOWN_VOTE, other: Vote.UP_VOTE},
+            self.alice), {self.question.pk: 0, other.pk: 0})
+        self.assertCounters(-1, 0, 1)
+        other.refresh_from_db()
+        self.assertEqual((other.votes_score, other.nb_upvotes), (1, 1))
+
+    def test_bulk_retry(self):
+        # A concurrent request records the same vote first.
+        Vote.objects.vote_up(self.question, self.alice)
+        with mock.patch.object(QuerySet, 'select_for_update',
+                racing_select_for_update()):
+            self.assertEqual(Vote.objects.bulk_vote({
+                self.question: Vote.DOWN_VOTE}, self.alice),
+                {self.question.pk: -2})
+        self.assertCounters(-1, 0, 1)
+        self.assertEqual(Vote.objects.get().vote, Vote.DOWN_VOTE)
+
+
+class AnswerVoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = get_user_model().objects.create_user('alice')
+        question = get_question_model().objects.create(
+            slug='water-use', title="How to reduce water usage?",
+            text="Any ideas?")
+        comment = Comment.objects.create(content_object=question,
+            site=Site.objects.get_current(), user=cls.alice,
+            comment="Take shorter showers.")
+        cls.answer = Answer.objects.get(comment=comment)
+
+    def test_flip(self):
+        self.assertEqual(
+            AnswerVote.objects.vote_up(self.answer, self.alice), 1)
+        self.assertEqual(
+            AnswerVote.objects.vote_up(self.answer, self.alice), 0)
+        self.assertEqual(
+            AnswerVote.objects.vote_down(self.answer, self.alice), -2)
+        self.answer.refresh_from_db()
+        self.assertEqual((self.answer.votes_score, self.answer.nb_upvotes,
+            self.answer.nb_downvotes), (-1, 0, 1))
@@ -0,0 +1,16 @@
+"""
+ASGI config for testsite project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+for example to serve the async views (see ``answers.urls.async_api``)
+with ``uvicorn testsite.asgi:application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+"""
+
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "testsite.settings")
+
+from django.core.asgi import get_asgi_application
+application = get_asgi_application() #pylint: disable=invalid-name
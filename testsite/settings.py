@@ -72,13 +72,16 @@ INSTALLED_APPS = (
     'testsite'
 )
 
-MIDDLEWARE_CLASSES = (
+MIDDLEWARE = (
+    # As early as possible such that the timings include other middlewares.
+    'answers.instrumentation.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'answers.routers.ReplicaPinningMiddleware',
 )
 
 ROOT_URLCONF = 'testsite.urls'
@@ -101,12 +104,21 @@ DATABASES = {
     }
 }
 
+# Reads are sent to ANSWERS['READ_DATABASE'] when it is defined.
+DATABASE_ROUTERS = ['answers.routers.ReplicaRouter']
+
 # Haystack v1.2+
 HAYSTACK_CONNECTIONS = {
     'default': {
-        'ENGINE': 'haystack.backends.simple_backend.SimpleEngine',
+        'ENGINE': 'answers.backends.bm25.BM25Engine',
     },
 }
+HAYSTACK_SIGNAL_PROCESSOR = 'answers.backends.queue.QueuedSignalProcessor'
+
+ANSWERS = {
+    # Metrics are readable by staff users at /api/metrics/.
+    'METRICS_SINK': 'answers.instrumentation.PrometheusSink',
+}
 
 # Internationalization
 # https://docs.djangoproject.com/en/1.6/topics/i18n/
@@ -22,6 +22,7 @@
 # OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
 # ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import django
 from urldecorators import include, url
 from django.contrib import admin
 
@@ -30,9 +31,15 @@ admin.autodiscover()
 urlpatterns = [
     url(r'^admin/', include(admin.site.urls)),
     url(r'^accounts/login/$', 'django.contrib.auth.views.login'),
+    url(r'^api/metrics/', include('answers.urls.metrics')),
     url(r'^api/', include('answers.urls.api')),
     url(r'^comments/', include('django_comments.urls')),
-    url(r'^', include('answers.urls.query')),
     url(r'^', include('answers.urls.update'),
         decorators=['django.contrib.auth.decorators.login_required']),
+    url(r'^', include('answers.urls.query')),
 ]
+
+if django.VERSION >= (3, 1):
+    # Served through ASGI (see testsite/asgi.py).
+    urlpatterns.insert(2,
+        url(r'^api/async/', include('answers.urls.async_api')))